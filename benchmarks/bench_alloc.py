@@ -0,0 +1,141 @@
+"""Memory allocated by the parsers while parsing a generated Luca program.
+
+The tokens are materialized up front, and the peak traced memory during the
+parse, over the memory in use before it, is reported by tracemalloc. For
+LucaParser the result is a single value, so the peak is the parser's own
+working memory: its stacks and symbols. LucaAstParser's peak also includes
+the syntax tree.
+
+Garbage that is freed straight away doesn't raise the peak, but tracemalloc
+does work on every allocation and free. So the parse is also timed without
+tracing, and the slowdown from tracing tracks how much each parse allocates.
+
+The memory held by the materialized tokens is reported too, both as a list of
+Token objects and as a sly.TokenList.
+
+Running the program is mostly arithmetic on LucaNumbers. The size of one
+LucaNumber is reported, and each compiled engine's run is timed without and
+with tracing, as for the parsers.
+
+Usage: python benchmarks/bench_alloc.py [--statements N]
+"""
+
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+
+from bench_parse import generate_program
+from luca import closures, luca, sly, syntax, vm
+
+PARSERS = {
+    "parser": luca.LucaParser,
+    "ast": syntax.LucaAstParser,
+}
+
+
+def measure(parser_class, tokens: list) -> tuple[int, float, float]:
+    """Return the peak bytes allocated by one parse, and the seconds it took
+    without and with tracing."""
+    parser = parser_class()
+    # Load the tables outside the measurement.
+    parser.parse(iter(tokens))
+    start = time.perf_counter()
+    parser.parse(iter(tokens))
+    untraced = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    result = parser.parse(iter(tokens))
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    return peak - before, untraced, elapsed
+
+
+def token_memory(source: str, container) -> tuple[int, int]:
+    """Return the number of tokens in source and the bytes held by them when
+    collected into container."""
+    gc.collect()
+    tracemalloc.start()
+    tokens = container(luca.LucaLexer().tokenize(source))
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return len(tokens), size
+
+
+def run_vm(tree):
+    code = vm.compile_tree(tree)
+    return lambda: vm.VirtualMachine().run(code)
+
+
+def run_closure(tree):
+    program = closures.compile_tree(tree)
+    return lambda: program(luca.LucaObject())
+
+
+ENGINES = {"vm": run_vm, "closure": run_closure}
+
+
+def value_size(count: int = 10000) -> float:
+    """Return the bytes held by each of count LucaNumbers."""
+    raw = [float(n) for n in range(count)]
+    gc.collect()
+    tracemalloc.start()
+    values = [luca.LucaNumber(n) for n in raw]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # Not counting the list.
+    return (size - sys.getsizeof(values)) / len(values)
+
+
+def measure_run(run) -> tuple[float, float]:
+    """Return the seconds that one run took without and with tracing."""
+    run()
+    start = time.perf_counter()
+    run()
+    untraced = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+    return untraced, elapsed
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--statements", type=int, default=5000)
+    args = argparser.parse_args()
+
+    source = generate_program(args.statements)
+    for name, container in [("list", list), ("TokenList", sly.TokenList)]:
+        count, size = token_memory(source, container)
+        print(f"{name:>9}: {size / 1024:,.0f} KiB, {size / count:.1f} bytes/token")
+
+    tokens = list(luca.LucaLexer().tokenize(source))
+    for name, parser_class in PARSERS.items():
+        peak, untraced, traced = measure(parser_class, tokens)
+        print(
+            f"{name:>7}: peak {peak / 1024:,.0f} KiB, "
+            f"{peak / len(tokens):.1f} bytes/token, "
+            f"{untraced * 1000:.0f} ms, {traced * 1000:.0f} ms traced "
+            f"({traced / untraced:.1f}x)"
+        )
+
+    print(f"LucaNumber: {value_size():.1f} bytes")
+    tree = syntax.LucaAstParser().parse(iter(tokens))
+    for name, engine in ENGINES.items():
+        untraced, traced = measure_run(engine(tree))
+        print(
+            f"{name:>7}: {untraced * 1000:.0f} ms, {traced * 1000:.0f} ms traced "
+            f"({traced / untraced:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
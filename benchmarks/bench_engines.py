@@ -0,0 +1,84 @@
+"""Compare the Luca execution engines on repeated runs of the same program.
+
+The "parser" engine lexes, parses and evaluates the source on every run,
+which is what LucaParser does today. The other engines compile the program
+once and only the run is timed.
+
+Usage: python benchmarks/bench_engines.py [--statements N] [--repeat R]
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+from bench_parse import generate_program
+from luca import closures, luca, syntax, transpile, vm
+from luca.evaluator import Evaluator
+
+
+def parse_tree(source):
+    return syntax.LucaAstParser().parse(luca.LucaLexer().tokenize(source))
+
+
+def run_parser(source):
+    return lambda: luca.LucaParser().parse(luca.LucaLexer().tokenize(source))
+
+
+def run_evaluator(source):
+    tree = parse_tree(source)
+    return lambda: Evaluator().evaluate(tree)
+
+
+def run_vm(source):
+    code = vm.compile_source(source)
+    return lambda: vm.VirtualMachine().run(code)
+
+
+def run_closure(source):
+    program = closures.compile_source(source)
+    return lambda: program(luca.LucaObject())
+
+
+def run_python(source):
+    program = transpile.load(transpile.compile_source(source))
+    return lambda: program(luca.LucaObject())
+
+
+ENGINES = {
+    "parser": run_parser,
+    "evaluator": run_evaluator,
+    "vm": run_vm,
+    "closure": run_closure,
+    "python": run_python,
+}
+
+
+def bench(run, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--statements", type=int, default=2000)
+    argparser.add_argument("--repeat", type=int, default=10)
+    argparser.add_argument("engines", nargs="*", default=list(ENGINES))
+    args = argparser.parse_args()
+
+    source = generate_program(args.statements)
+    baseline = None
+    for name in args.engines:
+        run = ENGINES[name](source)
+        with contextlib.redirect_stdout(io.StringIO()):
+            best = bench(run, args.repeat)
+        baseline = baseline or best
+        print(f"{name:>10}: {best * 1000:8.2f} ms/run  {baseline / best:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
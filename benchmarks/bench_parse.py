@@ -0,0 +1,123 @@
+"""Parse throughput on large generated Luca programs.
+
+Usage: python benchmarks/bench_parse.py [--statements N] [--repeat R]
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+
+from luca import luca
+
+
+def generate_program(statements: int, seed: int = 0) -> str:
+    """Generate a program of simple assignments, arithmetic, and blocks."""
+    rng = random.Random(seed)
+    names = [f"v{i}" for i in range(32)]
+    lines = [f"{name} = {i}" for i, name in enumerate(names)]
+    for _ in range(statements):
+        a, b, c = rng.sample(names, 3)
+        kind = rng.randrange(4)
+        if kind == 0:
+            lines.append(f"{a} = {b} + {c} * {rng.randint(1, 9)} - {b} % 7")
+        elif kind == 1:
+            lines.append(f"{a} == {b} and not ({c} == {a}) or {b} == {b}")
+        elif kind == 2:
+            lines.append(f"o = {{ x = {b} + 1 \n y = (x - {c}) / 2 }}\n{a} = o.x")
+        else:
+            lines.append(f'-({a} + {rng.random():.3f}) * ({b} - {c})')
+    return "\n".join(lines) + "\n"
+
+
+def bench(program: str, repeat: int, prelex: bool) -> float:
+    """Return the best time, in seconds, to parse the program.
+
+    With prelex, the tokens are materialized up front and only the parser is
+    timed. Otherwise lexing is included.
+    """
+    best = float("inf")
+    tokens = list(luca.LucaLexer().tokenize(program)) if prelex else None
+    for _ in range(repeat):
+        parser = luca.LucaParser()
+        start = time.perf_counter()
+        if prelex:
+            parser.parse(iter(tokens))
+        else:
+            parser.parse(luca.LucaLexer().tokenize(program))
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_lex(program: str, repeat: int, batch: bool = False) -> float:
+    """Return the best time, in seconds, to lex the program, either token by
+    token or into a TokenBatch."""
+    best = float("inf")
+    for _ in range(repeat):
+        lexer = luca.LucaLexer()
+        start = time.perf_counter()
+        if batch:
+            lexer.tokenize_batch(program)
+        else:
+            for _ in lexer.tokenize(program):
+                pass
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def lex_memory(program: str, batch: bool = False) -> int:
+    """Return the peak memory, in bytes, used to lex the program, either into
+    a list of Tokens or into a TokenBatch."""
+    lexer = luca.LucaLexer()
+    tracemalloc.start()
+    if batch:
+        tokens = lexer.tokenize_batch(program)
+    else:
+        tokens = list(lexer.tokenize(program))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del tokens
+    return peak
+
+
+def bench_relex(program: str, repeat: int) -> float:
+    """Return the best time, in seconds, to update the program's TokenBatch
+    for a one character insertion in the middle."""
+    lexer = luca.LucaLexer()
+    batch = lexer.tokenize_batch(program)
+    offset = program.index("\n", len(program) // 2)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        lexer.relex(batch, offset, 0, "x")
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--statements", type=int, default=20000)
+    argparser.add_argument("--repeat", type=int, default=5)
+    args = argparser.parse_args()
+
+    program = generate_program(args.statements)
+    ntokens = sum(1 for _ in luca.LucaLexer().tokenize(program))
+    timings = [
+        ("lex", bench_lex(program, args.repeat)),
+        ("lex batch", bench_lex(program, args.repeat, True)),
+        ("relex", bench_relex(program, args.repeat)),
+        ("lex+parse", bench(program, args.repeat, False)),
+        ("parse", bench(program, args.repeat, True)),
+    ]
+    for label, best in timings:
+        print(
+            f"{label:>10}: {ntokens} tokens in {best * 1000:.1f} ms, "
+            f"{ntokens / best:,.0f} tokens/s"
+        )
+    for label, batch in [("lex list", False), ("lex batch", True)]:
+        peak = lex_memory(program, batch)
+        print(f"{label:>10}: {peak / ntokens:.0f} bytes/token at peak")
+
+
+if __name__ == "__main__":
+    main()
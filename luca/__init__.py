@@ -1,15 +1,63 @@
 """Luca: An easy to write and implement programming language.
 """
 
-from . import luca
+from . import closures, luca, sly, syntax, transpile, vm
+import argparse
+import itertools
 import sys
 
+ENGINES = ("parser", "vm", "closure", "python")
 
-def main():
-    lexer = luca.LucaLexer()
-    parser = luca.LucaParser()
-    for line in sys.stdin:
-        parser.parse(lexer.tokenize(line.strip()))
+
+def parse_stream(stream) -> syntax.Block | None:
+    """Parse a whole program read from stream, which is tokenized in chunks.
+    Raises SyntaxError if it can't be parsed."""
+    return syntax.parse_program(luca.LucaLexer().tokenize_stream(stream))
+
+
+def run_stream(stream, engine: str = "parser"):
+    """Run a whole program read from stream with one of ENGINES.
+    Raises SyntaxError or sly.lex.LexError if it can't be parsed, and
+    TypeError or ValueError if it fails while running."""
+    if engine == "parser":
+        tokens = luca.LucaLexer().tokenize_stream(stream)
+        first = next(tokens, None)
+        if first is None:
+            return
+        ctx = luca.LucaParser().parse_context(itertools.chain([first], tokens))
+        if ctx.errors:
+            raise luca.syntax_error(ctx.errors)
+        return
+
+    tree = parse_stream(stream)
+    if tree is None:
+        return
+    if engine == "vm":
+        vm.VirtualMachine().run(vm.compile_tree(tree))
+    elif engine == "closure":
+        closures.compile_tree(tree)(luca.LucaObject())
+    elif engine == "python":
+        transpile.load(transpile.compile_tree(tree))(luca.LucaObject())
+
+
+def main(argv=None):
+    argparser = argparse.ArgumentParser(
+        prog="luca", description="Run a Luca program read from stdin."
+    )
+    argparser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="parser",
+        help=(
+            "evaluate while parsing, compile to bytecode and run it on the VM, "
+            "compile to Python closures, or transpile to Python code objects"
+        ),
+    )
+    args = argparser.parse_args(argv)
+    try:
+        run_stream(sys.stdin, args.engine)
+    except (SyntaxError, sly.lex.LexError, TypeError, ValueError) as error:
+        sys.exit(f"luca: {error}")
 
 
 if __name__ == "__main__":
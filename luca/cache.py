@@ -0,0 +1,123 @@
+"""Process-wide cache of compiled Luca programs.
+
+Programs are keyed by a hash of their source and evicted least recently used
+first, once the cache holds more than max_entries programs or their
+estimated size exceeds max_bytes. Luca.compile goes through the module-level
+`programs` cache, so running the same source again skips lexing, parsing and
+compiling. Programs are immutable, so a cached Program can be handed to any
+number of callers and threads.
+"""
+
+import collections
+import hashlib
+import sys
+import threading
+
+from .program import Program
+
+# Estimated memory held by a compiled program per character of source: its
+# syntax tree, name resolution and closures. Measured with tracemalloc on the
+# programs generated by benchmarks/bench_parse.py, which come to about 140.
+BYTES_PER_CHAR = 150
+
+CacheInfo = collections.namedtuple(
+    "CacheInfo",
+    ["hits", "misses", "evictions", "entries", "bytes", "max_entries", "max_bytes"],
+)
+
+
+def source_key(source: str) -> bytes:
+    return hashlib.blake2b(source.encode(), digest_size=16).digest()
+
+
+def estimate_size(program: Program) -> int:
+    return sys.getsizeof(program.source) + BYTES_PER_CHAR * len(program.source)
+
+
+class ProgramCache:
+    """An LRU cache of compiled programs, bounded by count and size."""
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 2**20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._bytes = 0
+        # key -> (program, size), least recently used first.
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def compile(self, source: str) -> Program:
+        """Return the compiled program for source, compiling it on a miss.
+
+        Raises SyntaxError if source can't be parsed; failures aren't cached.
+        """
+        key = source_key(source)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0].source == source:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        # Compile outside the lock, so that other threads can use the cache
+        # meanwhile. Two threads may compile the same source; either result
+        # is correct, and the later one is kept.
+        program = Program.from_source(source)
+        self._add(key, program)
+        return program
+
+    def _add(self, key: bytes, program: Program):
+        size = estimate_size(program)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if size > self.max_bytes or self.max_entries <= 0:
+                return
+            self._entries[key] = (program, size)
+            self._bytes += size
+            self._evict()
+
+    def configure(self, max_entries: int | None = None, max_bytes: int | None = None):
+        """Change the limits, evicting programs if the cache is now too big."""
+        with self._lock:
+            if max_entries is not None:
+                self.max_entries = max_entries
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            self._evict()
+
+    def _evict(self):
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            _, (_, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+
+    def clear(self):
+        """Remove all programs and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def cache_info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(
+                self.hits,
+                self.misses,
+                self.evictions,
+                len(self._entries),
+                self._bytes,
+                self.max_entries,
+                self.max_bytes,
+            )
+
+    def __len__(self):
+        return len(self._entries)
+
+
+programs = ProgramCache()
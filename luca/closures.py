@@ -0,0 +1,202 @@
+"""Closure compilation backend for Luca.
+
+Each node of a syntax tree is compiled to a Python closure that takes the
+current scope and returns the node's value. Sub-expressions and constants are
+bound when the closure is created, so running a program is a single tree of
+Python calls with no tokens, parser symbols or dispatch on node types.
+
+Bare names are resolved at compile time (see resolver.py). Braced blocks run
+in a LucaFrame, and names in them are read and written by slot index.
+"""
+
+from typing import Callable
+
+from . import resolver, syntax
+from .luca import (
+    BINARY_OPS,
+    NULL,
+    UNARY_OPS,
+    LucaFrame,
+    LucaObject,
+    LucaValue,
+)
+
+Compiled = Callable[[LucaObject], LucaValue]
+
+
+def _binary(op: str, left: Compiled, right: Compiled) -> Compiled:
+    def run(scope):
+        a = left(scope)
+        b = right(scope)
+        return BINARY_OPS[op, a.__class__, b.__class__](a, b)
+
+    return run
+
+
+def _chain(first: Compiled, rest: tuple) -> Compiled:
+    # A chain of binary operators, folded in a loop. rest holds each
+    # operator and its right operand.
+    def run(scope):
+        a = first(scope)
+        for op, operand in rest:
+            b = operand(scope)
+            a = BINARY_OPS[op, a.__class__, b.__class__](a, b)
+        return a
+
+    return run
+
+
+def _unary(op: str, operand: Compiled) -> Compiled:
+    def run(scope):
+        a = operand(scope)
+        return UNARY_OPS[op, a.__class__](a)
+
+    return run
+
+
+def _load(name: str, depth: int, slot: int | None) -> Compiled:
+    if slot is None:
+        if depth == 0:
+            return lambda scope: scope.get(name)
+
+        def run(scope):
+            for _ in range(depth):
+                scope = scope.parent
+            return scope.get(name)
+
+    elif depth == 0:
+        return lambda scope: scope.slots[slot]
+    elif depth == 1:
+        return lambda scope: scope.parent.slots[slot]
+    else:
+
+        def run(scope):
+            for _ in range(depth):
+                scope = scope.parent
+            return scope.slots[slot]
+
+    return run
+
+
+def _store(name: str, slot: int | None, value: Compiled) -> Compiled:
+    if slot is None:
+
+        def run(scope):
+            result = value(scope)
+            scope.set(name, result)
+            return result
+
+    else:
+
+        def run(scope):
+            result = value(scope)
+            scope.slots[slot] = result
+            return result
+
+    return run
+
+
+class Compiler:
+    """Compiles a syntax tree to a callable taking the scope to run in."""
+
+    def __init__(self, resolution: resolver.Resolution):
+        self.resolution = resolution
+        self._dispatch = {
+            syntax.Block: lambda node: self._statements(node.statements),
+            syntax.Scope: self._scope,
+            syntax.Print: self._print,
+            syntax.Constant: self._constant,
+            syntax.BinOp: self._binop,
+            syntax.UnaryOp: lambda node: _unary(node.op, self.compile(node.operand)),
+            syntax.Name: self._name,
+            syntax.Attribute: self._attribute,
+            syntax.Assign: self._assign,
+        }
+
+    def compile(self, node: syntax.Node) -> Compiled:
+        return self._dispatch[type(node)](node)
+
+    def _statements(self, statements: tuple) -> Compiled:
+        *init, last = [self.compile(stmt) for stmt in statements]
+        if not init:
+            return last
+
+        def run(scope):
+            for stmt in init:
+                stmt(scope)
+            return last(scope)
+
+        return run
+
+    def _scope(self, node: syntax.Scope) -> Compiled:
+        statements = tuple(self.compile(stmt) for stmt in node.statements)
+        layout = self.resolution.layouts[node]
+
+        def run(scope):
+            obj = LucaFrame(scope, layout)
+            for stmt in statements:
+                stmt(obj)
+            return obj
+
+        return run
+
+    def _print(self, node: syntax.Print) -> Compiled:
+        expr = self.compile(node.expr)
+
+        def run(scope):
+            print(str(expr(scope)))
+            return NULL
+
+        return run
+
+    def _constant(self, node: syntax.Constant) -> Compiled:
+        value = node.value
+        return lambda scope: value
+
+    def _binop(self, node: syntax.BinOp) -> Compiled:
+        first, chain = syntax.binop_chain(node)
+        if len(chain) == 1:
+            return _binary(node.op, self.compile(first), self.compile(node.right))
+        rest = tuple((binop.op, self.compile(binop.right)) for binop in chain)
+        return _chain(self.compile(first), rest)
+
+    def _name(self, node: syntax.Name) -> Compiled:
+        return _load(node.name, *self.resolution.names[node])
+
+    def _attribute(self, node: syntax.Attribute) -> Compiled:
+        # Assumes that obj evaluates to an object.
+        obj = self.compile(node.obj)
+        name = node.name
+        return lambda scope: obj(scope).get(name)
+
+    def _assign(self, node: syntax.Assign) -> Compiled:
+        value = self.compile(node.value)
+        name = node.target.name
+        if not isinstance(node.target, syntax.Attribute):
+            depth, slot = self.resolution.names[node]
+            return _store(name, slot, value)
+
+        target = self.compile(node.target.obj)
+
+        def run(scope):
+            # The target object is resolved before the value, as in LucaParser.
+            obj = target(scope)
+            result = value(scope)
+            obj.set(name, result)
+            return result
+
+        return run
+
+
+def compile_tree(tree: syntax.Block) -> Compiled:
+    """Compile a program's syntax tree to a callable taking its top level scope."""
+    return Compiler(resolver.resolve(tree)).compile(tree)
+
+
+def compile_source(source: str) -> Compiled | None:
+    """Compile a program, returning None if it is empty.
+    Raises SyntaxError if it can't be parsed."""
+    tree = syntax.parse_source(source)
+    if tree is None:
+        return None
+    return compile_tree(tree)
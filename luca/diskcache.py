@@ -0,0 +1,159 @@
+"""On-disk cache of compiled Luca scripts, like CPython's __pycache__.
+
+The syntax tree of a script `dir/name.luca` is stored in
+`dir/__lucacache__/name.luca.lc`. If a cache prefix is set, with the
+LUCA_CACHE_PREFIX environment variable or the cache_dir argument, the file
+is stored under that directory instead, at the script's absolute path. So
+loading a script that hasn't changed reads the source and the cache file,
+but doesn't lex or parse.
+
+A cache file starts with a fixed-size header:
+
+    magic        4 bytes, b"LUCA"
+    version      uint16, FORMAT_VERSION
+    flags        uint16, FLAG_HASH if written with check="hash"
+    mtime_ns     int64, the source's modification time
+    size         int64, the source's size in bytes
+    hash         16 bytes, blake2b of the source
+
+followed by the pickled syntax tree. An entry is valid if its magic and
+version match and either the source's mtime and size match (the default),
+or, with check="hash", the hash of the source matches. Invalid or
+unreadable entries are ignored and rewritten. The tree is only unpickled
+once the header is valid, but cache files must still be trusted as much as
+the scripts themselves.
+"""
+
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+
+from . import syntax
+from .program import Program
+
+# Bump when the syntax tree or the header changes.
+FORMAT_VERSION = 2
+MAGIC = b"LUCA"
+FLAG_HASH = 1
+CACHE_DIRNAME = "__lucacache__"
+SUFFIX = ".lc"
+
+_HEADER = struct.Struct("<4sHHqq16s")
+
+prefix = os.environ.get("LUCA_CACHE_PREFIX") or None
+
+
+def source_hash(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def cache_path(path: str, cache_dir: str | None = None) -> str:
+    """Return the path of the cache file for the script at path."""
+    cache_dir = prefix if cache_dir is None else cache_dir
+    path = os.path.abspath(path)
+    if cache_dir is None:
+        head, tail = os.path.split(path)
+        return os.path.join(head, CACHE_DIRNAME, tail + SUFFIX)
+    drive, rest = os.path.splitdrive(path)
+    return os.path.join(cache_dir, drive.strip(":\\/"), rest.lstrip(os.sep) + SUFFIX)
+
+
+# What pickle.loads can raise for a corrupt pickle.
+_UNPICKLING_ERRORS = (
+    pickle.UnpicklingError,
+    EOFError,
+    AttributeError,
+    ImportError,
+    IndexError,
+    TypeError,
+    ValueError,
+)
+
+
+def _read(filename: str, valid) -> syntax.Block | None:
+    """Return the syntax tree in a cache file, or None if the file is
+    missing or unreadable. valid is called with the header fields, and the
+    tree is only unpickled if it returns true."""
+    try:
+        with open(filename, "rb") as f:
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                # Empty files and some filesystems can't be mapped.
+                data = f.read()
+    except OSError:
+        return None
+    try:
+        if len(data) < _HEADER.size or not valid(*_HEADER.unpack_from(data)):
+            return None
+        with memoryview(data) as view:
+            try:
+                tree = pickle.loads(view[_HEADER.size :])
+            except _UNPICKLING_ERRORS:
+                return None
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
+    return tree if isinstance(tree, syntax.Block) else None
+
+
+def _write(filename: str, header: bytes, tree) -> bool:
+    temp = f"{filename}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(temp, "wb") as f:
+            f.write(header)
+            pickle.dump(tree, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp, filename)
+    except (OSError, RecursionError):
+        # pickle recurses once per level of the tree, so a deeply nested
+        # program is run without a cache file.
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+        return False
+    return True
+
+
+def load(path: str, cache_dir: str | None = None, check: str = "mtime") -> Program:
+    """Compile the script at path, using and updating its cache file.
+
+    check is "mtime" to validate the cache by the source's modification time
+    and size, or "hash" to validate it by the source's contents. Raises
+    SyntaxError if the script can't be parsed.
+    """
+    if check not in ("mtime", "hash"):
+        raise ValueError(f"check must be 'mtime' or 'hash', not {check!r}.")
+    with open(path, "rb") as f:
+        stat = os.fstat(f.fileno())
+        data = f.read()
+    source = data.decode()
+    filename = cache_path(path, cache_dir)
+    digest = source_hash(data) if check == "hash" else None
+
+    def valid(magic, version, flags, mtime_ns, size, stored_hash):
+        if magic != MAGIC or version != FORMAT_VERSION:
+            return False
+        if check == "hash":
+            return stored_hash == digest
+        return mtime_ns == stat.st_mtime_ns and size == stat.st_size
+
+    tree = _read(filename, valid)
+    if tree is not None:
+        return Program(source, tree)
+
+    program = Program.from_source(source)
+    flags = FLAG_HASH if check == "hash" else 0
+    header = _HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        flags,
+        stat.st_mtime_ns,
+        stat.st_size,
+        digest or source_hash(data),
+    )
+    _write(filename, header, program.tree)
+    return program
@@ -0,0 +1,96 @@
+"""Evaluation of Luca syntax trees.
+
+The Evaluator gives a tree produced by LucaAstParser the same semantics that
+LucaParser gives the program while parsing it.
+"""
+
+from . import syntax
+from .luca import BINARY_OPS, NULL, UNARY_OPS, LucaObject, LucaValue
+
+
+class Evaluator:
+    """Runs syntax trees against a scope.
+
+    Names assigned at the top level of a program are stored in the scope, so
+    they remain visible to later calls.
+    """
+
+    def __init__(self, scope: LucaObject | None = None):
+        self.scope_stack = [LucaObject() if scope is None else scope]
+        self._dispatch = {
+            syntax.Block: self._block,
+            syntax.Scope: self._scope,
+            syntax.Print: self._print,
+            syntax.Constant: self._constant,
+            syntax.BinOp: self._binop,
+            syntax.UnaryOp: self._unaryop,
+            syntax.Name: self._name,
+            syntax.Attribute: self._attribute,
+            syntax.Assign: self._assign,
+        }
+
+    def get(self, name: str) -> LucaValue:
+        return self.current_scope().get(name)
+
+    def current_scope(self) -> LucaObject:
+        return self.scope_stack[-1]
+
+    def evaluate(self, node: syntax.Node) -> LucaValue:
+        return self._dispatch[type(node)](node)
+
+    def _block(self, node: syntax.Block) -> LucaValue:
+        value = None
+        for stmt in node.statements:
+            value = self.evaluate(stmt)
+        return value
+
+    def _scope(self, node: syntax.Scope) -> LucaObject:
+        obj = LucaObject(self.current_scope())
+        self.scope_stack.append(obj)
+        try:
+            for stmt in node.statements:
+                self.evaluate(stmt)
+        finally:
+            self.scope_stack.pop()
+        return obj
+
+    def _print(self, node: syntax.Print) -> LucaValue:
+        print(str(self.evaluate(node.expr)))
+        return NULL
+
+    def _constant(self, node: syntax.Constant) -> LucaValue:
+        return node.value
+
+    def _binop(self, node: syntax.BinOp) -> LucaValue:
+        if type(node.left) is not syntax.BinOp:
+            left = self.evaluate(node.left)
+            right = self.evaluate(node.right)
+            return BINARY_OPS[node.op, left.__class__, right.__class__](left, right)
+        first, chain = syntax.binop_chain(node)
+        left = self.evaluate(first)
+        for binop in chain:
+            right = self.evaluate(binop.right)
+            left = BINARY_OPS[binop.op, left.__class__, right.__class__](left, right)
+        return left
+
+    def _unaryop(self, node: syntax.UnaryOp) -> LucaValue:
+        operand = self.evaluate(node.operand)
+        return UNARY_OPS[node.op, operand.__class__](operand)
+
+    def _name(self, node: syntax.Name) -> LucaValue:
+        return self.current_scope().get(node.name)
+
+    def _attribute(self, node: syntax.Attribute) -> LucaValue:
+        # Assumes that obj evaluates to an object.
+        return self.evaluate(node.obj).get(node.name)
+
+    def _assign(self, node: syntax.Assign) -> LucaValue:
+        # The target object is resolved before the value, as in LucaParser.
+        target = node.target
+        if isinstance(target, syntax.Attribute):
+            obj = self.evaluate(target.obj)
+        else:
+            obj = self.current_scope()
+        value = self.evaluate(node.value)
+        obj.set(target.name, value)
+        return value
@@ -1,15 +1,52 @@
 from . import sly
 import enum
-from typing import Any
+import itertools
+import os
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .program import Program
+
+
+def _default_cache_dir() -> str:
+    """Directory for Luca's on-disk caches, overridable with LUCA_CACHE_DIR."""
+    if "LUCA_CACHE_DIR" in os.environ:
+        return os.environ["LUCA_CACHE_DIR"]
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "luca")
 
 
 class Luca:
+    """Runs Luca programs against a scope that persists between calls."""
+
     def __init__(self):
-        self.lexer = LucaLexer()
-        self.parser = LucaParser()
+        self.scope = LucaObject()
+
+    def __call__(self, program: str) -> "LucaValue":
+        return self.compile(program).run(self.scope)
 
-    def __call__(self, program: str):
-        self.parser.parse(program)
+    @staticmethod
+    def compile(source: str) -> "Program":
+        """Lex, parse and compile source, raising SyntaxError if it can't be
+        parsed. The result can be run any number of times.
+
+        Programs are cached by source (see cache.py), so compiling the same
+        source again doesn't lex or parse it.
+        """
+        from .cache import programs
+
+        return programs.compile(source)
+
+    @staticmethod
+    def compile_file(path: str, check: str = "mtime") -> "Program":
+        """Compile the script at path, caching its syntax tree on disk (see
+        diskcache.py). check is "mtime" or "hash", and chooses how the cache
+        is validated against the script."""
+        from .diskcache import load
+
+        return load(path, check=check)
 
 
 class LucaType(enum.Enum):
@@ -20,10 +57,81 @@ class LucaType(enum.Enum):
     OBJECT = 5
 
 
+class OperatorTable(dict):
+    """Operator implementations, keyed by the operator and the classes of its
+    operands: (op, left class, right class) for binary operators and (op,
+    class) for unary ones. Each implementation takes the operands and returns
+    the result.
+
+    A key with no implementation resolves to the implementation for the
+    nearest base classes of its operands, so registering (op, LucaValue,
+    LucaValue) covers every pair. If there is none, it resolves to a function
+    raising TypeError. Either way, the result is cached under the key.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._resolved = []
+
+    def __setitem__(self, key, impl):
+        # Keys resolved before this might now resolve to impl.
+        for resolved in self._resolved:
+            del self[resolved]
+        self._resolved.clear()
+        super().__setitem__(key, impl)
+
+    def __missing__(self, key):
+        op, *classes = key
+        for bases in itertools.product(*(cls.__mro__ for cls in classes)):
+            impl = self.get((op, *bases))
+            if impl is not None:
+                break
+        else:
+            impl = _type_error(op, [cls.luca_type for cls in classes])
+        super().__setitem__(key, impl)
+        self._resolved.append(key)
+        return impl
+
+
+def _type_error(op: str, types: list):
+    if len(types) == 2:
+        message = f"Cannot perform {types[0]} {op} {types[1]}."
+    else:
+        message = f"Cannot perform {op} {types[0]}."
+
+    def error(*operands):
+        raise TypeError(message)
+
+    return error
+
+
+# Implementations of Luca's operators, which are registered below the value
+# classes. The operator methods of LucaValue look up their implementation
+# here, and the engines may too.
+BINARY_OPS = OperatorTable()
+UNARY_OPS = OperatorTable()
+
+
 class LucaValue:
-    def __init__(self, luca_type: LucaType, value: Any):
-        self.luca_type = luca_type
-        self.raw_value = value
+    """A Luca value. Values other than objects are immutable, so they can be
+    shared: see NULL, TRUE, FALSE and the small LucaNumbers.
+
+    Operators are looked up by the classes of their operands in BINARY_OPS
+    and UNARY_OPS.
+    """
+
+    __slots__ = ("raw_value",)
+    luca_type: LucaType
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self):
+        # Unpickle through the constructor, which returns shared values.
+        return type(self), (self.raw_value,)
 
     def __eq__(self, other):
         return self.luca_type == other.luca_type and self.raw_value == other.raw_value
@@ -31,111 +139,235 @@ class LucaValue:
     def __str__(self):
         return f"{self.raw_value}({self.luca_type})"
 
+    def __add__(self, other):
+        return BINARY_OPS["+", self.__class__, other.__class__](self, other)
+
+    def __sub__(self, other):
+        return BINARY_OPS["-", self.__class__, other.__class__](self, other)
+
+    def __mul__(self, other):
+        return BINARY_OPS["*", self.__class__, other.__class__](self, other)
+
+    def __truediv__(self, other):
+        return BINARY_OPS["/", self.__class__, other.__class__](self, other)
+
+    def __mod__(self, other):
+        return BINARY_OPS["%", self.__class__, other.__class__](self, other)
+
+    def logic_and(self, other):
+        return BINARY_OPS["and", self.__class__, other.__class__](self, other)
+
+    def logic_or(self, other):
+        return BINARY_OPS["or", self.__class__, other.__class__](self, other)
+
     def logic_eq(self, other):
-        ValidateSameType("==", self.luca_type, other.luca_type)
-        return LucaBool(self.raw_value == other.raw_value)
+        return BINARY_OPS["==", self.__class__, other.__class__](self, other)
 
+    def __neg__(self):
+        return UNARY_OPS["-", self.__class__](self)
 
-class LucaNull(LucaValue):
-    def __init__(self):
-        super().__init__(LucaType.NULL, None)
+    def logic_not(self):
+        return UNARY_OPS["not", self.__class__](self)
 
-    def __str__(self):
-        return "null"
 
+_new = object.__new__
+_set_raw_value = LucaValue.raw_value.__set__
 
-def ValidateSameType(op: str, a: LucaType, b: LucaType):
-    if a != b:
-        raise TypeError(f"Cannot perform {a} {op} {b}.")
 
+def _new_value(cls, value):
+    self = _new(cls)
+    _set_raw_value(self, value)
+    return self
 
-class LucaString(LucaValue):
-    def __init__(self, value: str):
-        super().__init__(LucaType.STRING, value)
 
-    def __add__(self, other: LucaValue):
-        return LucaString(self.raw_value + str(other))
+class LucaNull(LucaValue):
+    __slots__ = ()
+    luca_type = LucaType.NULL
 
-    def __str__(self):
-        return self.raw_value
+    def __new__(cls):
+        return NULL
 
+    def __reduce__(self):
+        return LucaNull, ()
 
-class LucaNumber(LucaValue):
-    def __init__(self, value: int | float):
-        super().__init__(LucaType.NUMBER, value)
+    def __str__(self):
+        return "null"
 
-    def __add__(self, other: LucaValue):
-        ValidateSameType("+", self.luca_type, other.luca_type)
-        return LucaNumber(self.raw_value + other.raw_value)
 
-    def __sub__(self, other: LucaValue):
-        ValidateSameType("-", self.luca_type, other.luca_type)
-        return LucaNumber(self.raw_value - other.raw_value)
+class LucaString(LucaValue):
+    __slots__ = ()
+    luca_type = LucaType.STRING
 
-    def __mul__(self, other: LucaValue):
-        ValidateSameType("*", self.luca_type, other.luca_type)
-        return LucaNumber(self.raw_value * other.raw_value)
+    def __new__(cls, value: str):
+        self = _new(cls)
+        _set_raw_value(self, value)
+        return self
 
-    def __truediv__(self, other: LucaValue):
-        ValidateSameType("/", self.luca_type, other.luca_type)
-        if other.raw_value == 0:
-            raise ValueError("Cannot divide by zero.")
-        return LucaNumber(self.raw_value / other.raw_value)
+    def __str__(self):
+        return self.raw_value
 
-    def __mod__(self, other: LucaValue):
-        ValidateSameType("%", self.luca_type, other.luca_type)
-        if other.raw_value == 0:
-            raise ValueError("Cannot mod by zero.")
-        return LucaNumber(self.raw_value % other.raw_value)
 
-    def __neg__(self):
-        return LucaNumber(-self.raw_value)
+class LucaNumber(LucaValue):
+    __slots__ = ()
+    luca_type = LucaType.NUMBER
+
+    def __new__(cls, value: int | float):
+        if value.__class__ is int and -5 <= value <= 1024:
+            return _SMALL_INTS[value + 5]
+        self = _new(cls)
+        _set_raw_value(self, value)
+        return self
 
     def __str__(self):
         return str(self.raw_value)
 
 
 class LucaBool(LucaValue):
-    def __init__(self, value: bool):
-        super().__init__(LucaType.BOOLEAN, value)
+    __slots__ = ()
+    luca_type = LucaType.BOOLEAN
+
+    def __new__(cls, value: bool):
+        return TRUE if value else FALSE
 
     def __str__(self):
         return "true" if self.raw_value else "false"
 
-    def logic_and(self, other: LucaValue):
-        ValidateSameType("and", self.luca_type, other.luca_type)
-        return LucaBool(self.raw_value and other.raw_value)
 
-    def logic_or(self, other: LucaValue):
-        ValidateSameType("or", self.luca_type, other.luca_type)
-        return LucaBool(self.raw_value or other.raw_value)
+# The only null, true and false values. LucaNull() and LucaBool() return them.
+NULL = _new_value(LucaNull, None)
+TRUE = _new_value(LucaBool, True)
+FALSE = _new_value(LucaBool, False)
 
-    def logic_not(self):
-        return LucaBool(not self.raw_value)
+# LucaNumber(n) returns one of these for the ints -5 to 1024.
+_SMALL_INTS = tuple(_new_value(LucaNumber, n) for n in range(-5, 1025))
 
 
 class LucaObject(LucaValue):
+    __slots__ = ("names", "parent")
+    luca_type = LucaType.OBJECT
+    raw_value = None
+
+    # Objects are mutable, and are made and pickled as usual.
+    __new__ = object.__new__
+    __setattr__ = object.__setattr__
+    __delattr__ = object.__delattr__
+    __reduce__ = object.__reduce__
+
     def __init__(self, parent=None):
-        super().__init__(LucaType.OBJECT, None)
         self.names = {}
         self.parent = parent
 
+    def __getstate__(self):
+        # raw_value is a class attribute here, so it isn't part of the state.
+        return None, {"names": self.names, "parent": self.parent}
+
     def set(self, name: str, value: LucaValue):
         self.names[name] = value
 
     def get(self, name: str) -> LucaValue:
-        if name not in self.names:
-            if self.parent is None:
-                raise ValueError(f"{name} is not in scope.")
-            return self.parent.get(name)
-        return self.names[name]
+        scope = self
+        while scope is not None:
+            value = scope.lookup(name)
+            if value is not None:
+                return value
+            scope = scope.parent
+        raise ValueError(f"{name} is not in scope.")
+
+    def lookup(self, name: str) -> LucaValue | None:
+        """Returns the value of name in this object only, or None."""
+        return self.names.get(name)
+
+    def items(self):
+        return self.names.items()
 
     def __str__(self):
-        contents = "{" + ",".join(f"{n}:{v}" for n, v in self.names.items()) + "}"
+        contents = "{" + ",".join(f"{n}:{v}" for n, v in self.items()) + "}"
         return f"{contents}({self.luca_type})"
 
 
+class LucaFrame(LucaObject):
+    """An object for a block whose names were resolved at compile time.
+
+    Names assigned directly in the block are stored in slots, numbered by
+    layout, which maps each name to its slot. Names added later with `.`
+    assignment are stored in names as usual.
+    """
+
+    __slots__ = ("layout", "slots")
+
+    def __init__(self, parent: LucaObject, layout: dict[str, int]):
+        super().__init__(parent)
+        self.layout = layout
+        self.slots = [None] * len(layout)
+
+    def __getstate__(self):
+        _, state = super().__getstate__()
+        return None, {**state, "layout": self.layout, "slots": self.slots}
+
+    def set(self, name: str, value: LucaValue):
+        slot = self.layout.get(name)
+        if slot is None:
+            self.names[name] = value
+        else:
+            self.slots[slot] = value
+
+    def lookup(self, name: str) -> LucaValue | None:
+        slot = self.layout.get(name)
+        if slot is not None and self.slots[slot] is not None:
+            return self.slots[slot]
+        return self.names.get(name)
+
+    def items(self):
+        for name, slot in self.layout.items():
+            if self.slots[slot] is not None:
+                yield name, self.slots[slot]
+        yield from self.names.items()
+
+
+def _divide(a: LucaNumber, b: LucaNumber) -> LucaNumber:
+    if b.raw_value == 0:
+        raise ValueError("Cannot divide by zero.")
+    return LucaNumber(a.raw_value / b.raw_value)
+
+
+def _mod(a: LucaNumber, b: LucaNumber) -> LucaNumber:
+    if b.raw_value == 0:
+        raise ValueError("Cannot mod by zero.")
+    return LucaNumber(a.raw_value % b.raw_value)
+
+
+def _equal(a: LucaValue, b: LucaValue) -> LucaBool:
+    return TRUE if a.raw_value == b.raw_value else FALSE
+
+
+BINARY_OPS["+", LucaNumber, LucaNumber] = lambda a, b: LucaNumber(
+    a.raw_value + b.raw_value
+)
+BINARY_OPS["-", LucaNumber, LucaNumber] = lambda a, b: LucaNumber(
+    a.raw_value - b.raw_value
+)
+BINARY_OPS["*", LucaNumber, LucaNumber] = lambda a, b: LucaNumber(
+    a.raw_value * b.raw_value
+)
+BINARY_OPS["/", LucaNumber, LucaNumber] = _divide
+BINARY_OPS["%", LucaNumber, LucaNumber] = _mod
+# Anything can be appended to a string.
+BINARY_OPS["+", LucaString, LucaValue] = lambda a, b: LucaString(
+    a.raw_value + str(b)
+)
+BINARY_OPS["and", LucaBool, LucaBool] = lambda a, b: b if a.raw_value else a
+BINARY_OPS["or", LucaBool, LucaBool] = lambda a, b: a if a.raw_value else b
+# Values of the same type compare their raw values. All objects are equal.
+for _type in (LucaNull, LucaNumber, LucaString, LucaBool, LucaObject):
+    BINARY_OPS["==", _type, _type] = _equal
+del _type
+UNARY_OPS["-", LucaNumber] = lambda a: LucaNumber(-a.raw_value)
+UNARY_OPS["not", LucaBool] = lambda a: FALSE if a.raw_value else TRUE
+
+
 class LucaReference:
+    __slots__ = ("parent_scope", "name")
+
     def __init__(self, name: str, parent_scope: LucaObject):
         self.parent_scope = parent_scope
         self.name = name
@@ -147,6 +379,34 @@ class LucaReference:
         return self.parent_scope.set(self.name, value)
 
 
+class ConstantPool:
+    """The values of the number and string literals in one program.
+
+    Each literal's value is made once, and every occurrence of the same
+    literal gets that value object. Values from the pool are shared, so they
+    must never be modified.
+    """
+
+    def __init__(self):
+        self.numbers = {}
+        self.strings = {}
+
+    def number(self, text: str) -> "LucaNumber":
+        value = self.numbers.get(text)
+        if value is None:
+            # NUMBER tokens are digits with an optional decimal point, so
+            # both conversions always succeed.
+            value = LucaNumber(float(text) if "." in text else int(text))
+            self.numbers[text] = value
+        return value
+
+    def string(self, text: str) -> "LucaString":
+        value = self.strings.get(text)
+        if value is None:
+            value = self.strings[text] = LucaString(text)
+        return value
+
+
 class LucaLexer(sly.Lexer):
     tokens = {
         AND,
@@ -166,6 +426,10 @@ class LucaLexer(sly.Lexer):
         STRING,
     }
     ignore = " \t"
+    # Generate a tokenize() for these rules. See sly.lex._specialize_tokenize.
+    specialize = True
+    # Only make the values of these tokens when the parser reads them.
+    lazy_values = {"NUMBER", "STRING", "BOOLEAN"}
     ignore_comment = r"\#.*"
 
     EQ = r"=="
@@ -191,28 +455,24 @@ class LucaLexer(sly.Lexer):
         ";",
     }
 
+    def reset(self):
+        # Literal values are interned per text, so that a lexer that is
+        # reused doesn't keep every literal it has seen.
+        self.constants = ConstantPool()
+
     @_(r"\"([^\\\"]|\\.)*\"")
     def STRING(self, t):
-        t.value = LucaString(t.value.strip('"'))
+        t.value = self.constants.string(t.value.strip('"'))
         return t
 
     @_(r"(\d*\.)?\d+")
     def NUMBER(self, t):
-        try:
-            t.value = LucaNumber(int(t.value))
-            return t
-        except (ValueError):
-            pass
-        try:
-            t.value = LucaNumber(float(t.value))
-            return t
-        except (ValueError):
-            pass
-        raise ValueError(f"Invalid number token: {t.value}")
+        t.value = self.constants.number(t.value)
+        return t
 
     @_(r"(true|false)")
     def BOOLEAN(self, t):
-        t.value = LucaBool(t.value == "true")
+        t.value = TRUE if t.value == "true" else FALSE
         return t
 
     NAME = r"[a-zA-Z_][a-zA-Z_0-9]*"
@@ -225,19 +485,58 @@ class LucaLexer(sly.Lexer):
     NAME["print"] = PRINT
 
 
+def syntax_error(errors: list) -> SyntaxError:
+    """The SyntaxError for the tokens recorded by a parser's error(). A
+    token of None is the end of the input."""
+    token = errors[0]
+    if token is None:
+        return SyntaxError("Syntax error at end of input.")
+    return SyntaxError(
+        f"Syntax error at index {token.index}: unexpected {token.type}."
+    )
+
+
 class LucaParser(sly.Parser):
-    debugfile = "luca_parser.debug.log"
+    # Set LUCA_PARSER_DEBUG to a filename to get a description of the grammar
+    # and parser states when the tables are built, or call dump_debug().
+    debugfile = os.environ.get("LUCA_PARSER_DEBUG")
+    # Regenerate after changing the grammar with:
+    #   python -c "from luca import luca, sly; sly.yacc.write_table_module(luca.LucaParser, 'luca/parsetab.py')"
+    tablemodule = f"{__package__}.parsetab"
+    tablecache = _default_cache_dir()
+    # Values are evaluated as they are reduced, so positions are never used.
+    track_positions = False
 
     def __init__(self):
         super().__init__()
+        # The top level scope, which persists between calls to parse(). Each
+        # parse pushes its blocks onto its own copy of the stack, so that
+        # one parser can be used from many threads at once.
         self.scope_stack = [LucaObject()]
 
+    def context(self):
+        ctx = super().context()
+        ctx.scope_stack = list(self.scope_stack)
+        ctx.errors = []
+        return ctx
+
+    def error(self, token):
+        # sly recovers by discarding input and carries on, so the result of
+        # a parse is only valid if it recorded no errors.
+        super().error(token)
+        self.errors.append(token)
+
     def get(self, name: str):
         return self.current_scope().get(name)
 
     def add(self, name: str, value: LucaValue):
         return self.current_scope().add(name, value)
 
+    def deref(self, ref: "str | LucaReference") -> LucaValue:
+        if ref.__class__ is str:
+            return self.current_scope().get(ref)
+        return ref.get()
+
     def current_scope(self) -> LucaObject:
         return self.scope_stack[-1]
 
@@ -271,7 +570,7 @@ class LucaParser(sly.Parser):
     @_('PRINT "(" expr ")"')
     def stmt(self, p):
         print(str(p.expr))
-        return LucaNull()
+        return NULL
 
     @_("expr")
     def stmt(self, p):
@@ -336,7 +635,7 @@ class LucaParser(sly.Parser):
 
     @_("NULL")
     def expr(self, p):
-        return LucaNull()
+        return NULL
 
     @_('"{" new_scope block "}"', '"{" new_scope "}"')
     def expr(self, p):
@@ -348,20 +647,26 @@ class LucaParser(sly.Parser):
     def new_scope(self, p):
         self.push_scope()
 
+    # A bare name is left as a str and looked up in the current scope, which
+    # is the same scope when the name is used. Only `.` needs a LucaReference.
     @_('ref "." NAME')
     def ref(self, p):
         # Assumes that 'ref' is a reference to an object.
-        return LucaReference(p.NAME, p.ref.get())
+        return LucaReference(p.NAME, self.deref(p.ref))
 
     @_("NAME")
     def ref(self, p):
-        return LucaReference(p.NAME, self.current_scope())
+        return p.NAME
 
     @_("ref")
     def expr(self, p):
-        return p.ref.get()
+        return self.deref(p.ref)
 
     @_("ref ASSIGN expr")
     def expr(self, p):
-        p.ref.set(p.expr)
+        ref = p.ref
+        if ref.__class__ is str:
+            self.current_scope().set(ref, p.expr)
+        else:
+            ref.set(p.expr)
         return p.expr
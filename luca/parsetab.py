@@ -0,0 +1,170 @@
+# parsetab.py
+#
+# LR parsing tables for luca.luca.LucaParser.
+# This file is automatically generated by sly.yacc.write_table_module().
+# Do not edit.
+
+signature = '1044cceb58961080ecf7913370374a184603217254fbc982abe7a2d4804009e9'
+
+productions = [
+    ("S'", ['block'], ('right', 0)),
+    ('block', ['block', 'NEWLINE'], ('right', 0)),
+    ('block', ['NEWLINE', 'block'], ('right', 0)),
+    ('block', ['block', 'stmt'], ('right', 0)),
+    ('block', ['stmt'], ('right', 0)),
+    ('stmt', ['expr'], ('right', 0)),
+    ('stmt', ['PRINT', '(', 'expr', ')'], ('right', 0)),
+    ('expr', ['ref', 'ASSIGN', 'expr'], ('right', 0)),
+    ('expr', ['ref'], ('right', 0)),
+    ('expr', ['{', 'new_scope', '}'], ('right', 0)),
+    ('expr', ['{', 'new_scope', 'block', '}'], ('right', 0)),
+    ('expr', ['NULL'], ('right', 0)),
+    ('expr', ['BOOLEAN'], ('right', 0)),
+    ('expr', ['STRING'], ('right', 0)),
+    ('expr', ['NUMBER'], ('right', 0)),
+    ('expr', ['NOT', 'expr'], ('right', 5)),
+    ('expr', ['expr', 'EQ', 'expr'], ('left', 2)),
+    ('expr', ['expr', 'OR', 'expr'], ('left', 1)),
+    ('expr', ['expr', 'AND', 'expr'], ('left', 1)),
+    ('expr', ['(', 'expr', ')'], ('right', 0)),
+    ('expr', ['-', 'expr'], ('right', 5)),
+    ('expr', ['expr', '%', 'expr'], ('left', 4)),
+    ('expr', ['expr', '/', 'expr'], ('left', 4)),
+    ('expr', ['expr', '*', 'expr'], ('left', 4)),
+    ('expr', ['expr', '-', 'expr'], ('left', 3)),
+    ('expr', ['expr', '+', 'expr'], ('left', 3)),
+    ('new_scope', [], ('right', 0)),
+    ('ref', ['NAME'], ('right', 0)),
+    ('ref', ['ref', '.', 'NAME'], ('right', 0)),
+]
+
+tables = {
+    'action': [
+        {'NEWLINE': 2, 'PRINT': 5, '{': 8, 'NULL': 9, 'BOOLEAN': 10, 'STRING': 11, 'NUMBER': 12, 'NOT': 13, '(': 6, '-': 14, 'NAME': 15},
+        {'$end': 0, 'NEWLINE': 16, 'PRINT': 5, '{': 8, 'NULL': 9, 'BOOLEAN': 10, 'STRING': 11, 'NUMBER': 12, 'NOT': 13, '(': 6, '-': 14, 'NAME': 15},
+        {'NEWLINE': 2, 'PRINT': 5, '{': 8, 'NULL': 9, 'BOOLEAN': 10, 'STRING': 11, 'NUMBER': 12, 'NOT': 13, '(': 6, '-': 14, 'NAME': 15},
+        {'NEWLINE': -4, 'PRINT': -4, '{': -4, 'NULL': -4, 'BOOLEAN': -4, 'STRING': -4, 'NUMBER': -4, 'NOT': -4, '(': -4, '-': -4, 'NAME': -4, '$end': -4, '}': -4},
+        {'NEWLINE': -5, 'PRINT': -5, '{': -5, 'NULL': -5, 'BOOLEAN': -5, 'STRING': -5, 'NUMBER': -5, 'NOT': -5, '(': -5, '-': 25, 'NAME': -5, '$end': -5, '}': -5, 'EQ': 19, 'OR': 20, 'AND': 21, '%': 22, '/': 23, '*': 24, '+': 26},
+        {'(': 27},
+        {'{': 8, 'NULL': 9, 'BOOLEAN': 10, 'STRING': 11, 'NUMBER': 12, 'NOT': 13, '(': 6, '-': 14, 'NAME': 15},
+        {'ASSIGN': 29, 'EQ': -8, 'OR': -8, 'AND': -8, '%': -8, '/': -8, '*': -8, '-': -8, '+': -8, 'NEWLINE': -8, 'PRINT': -8, '{': -8, 'NULL': -8, 'BOOLEAN': -8, 'STRING': -8, 'NUMBER': -8, 'NOT': -8, '(': -8, 'NAME': -8, '$end': -8, '}': -8, ')': -8, '.': 30},
+        {'}': -26, 'NEWLINE': -26, 'PRINT': -26, '{': -26, 'NULL': -26, 'BOOLEAN': -26, 'STRING': -26, 'NUMBER': -26, 'NOT': -26, '(': -26, '-': -26, 'NAME': -26},
+        {'EQ': -11, 'OR': -11, 'AND': -11, '%': -11, '/': -11, '*': -11, '-': -11, '+': -11, 'NEWLINE': -11, 'PRINT': -11, '{': -11, 'NULL': -11, 'BOOLEAN': -11, 'STRING': -11, 'NUMBER': -11, 'NOT': -11, '(': -11, 'NAME': -11, '$end': -11, '}': -11, ')': -11},
+        {'EQ': -12, 'OR': -12, 'AND': -12, '%': -12, '/': -12, '*': -12, '-': -12, '+': -12, 'NEWLINE': -12, 'PRINT': -12, '{': -12, 'NULL': -12, 'BOOLEAN': -12, 'STRING': -12, 'NUMBER': -12, 'NOT': -12, '(': -12, 'NAME': -12, '$end': -12, '}': -12, ')': -12},
+        {'EQ': -13, 'OR': -13, 'AND': -13, '%': -13, '/': -13, '*': -13, '-': -13, '+': -13, 'NEWLINE': -13, 'PRINT': -13, '{': -13, 'NULL': -13, 'BOOLEAN': -13, 'STRING': -13, 'NUMBER': -13, 'NOT': -13, '(': -13, 'NAME': -13, '$end': -13, '}': -13, ')': -13},
+        {'EQ': -14, 'OR': -14, 'AND': -14, '%': -14, '/': -14, '*': -14, '-': -14, '+': -14, 'NEWLINE': -14, 'PRINT': -14, '{': -14, 'NULL': -14, 'BOOLEAN': -14, 'STRING': -14, 'NUMBER': -14, 'NOT': -14, '(': -14, 'NAME': -14, '$end': -14, '}': -14, ')': -14},
+        {'{': 8, 'NULL': 9, 'BOOLEAN': 10, 'STRING': 11, 'NUMBER': 12, 'NOT': 13, '(': 6, '-': 14, 'NAME': 15},
+        {'{': 8, 'NULL': 9, 'BOOLEAN': 10, 'STRING': 11, 'NUMBER': 12, 'NOT': 13, '(': 6, '-': 14, 'NAME': 15},
+        {'ASSIGN': -27, '.': -27, 'EQ': -27, 'OR': -27, 'AND': -27, '%': -27, '/': -27, '*': -27, '-': -27, '+': -27, 'NEWLINE': -27, 'PRINT': -27, '{': -27, 'NULL': -27, 'BOOLEAN': -27, 'STRING': -27, 'NUMBER': -27, 'NOT': -27, '(': -27, 'NAME': -27, '$end': -27, '}': -27, ')': -27},
+        {'NEWLINE': -1, 'PRINT': -1, '{': -1, 'NULL': -1, 'BOOLEAN': -1, 'STRING': -1, 'NUMBER': -1, 'NOT': -1, '(': -1, '-': -1, 'NAME': -1, '$end': -1, '}': -1},
+        {'NEWLINE': -3, 'PRINT': -3, '{': -3, 'NULL': -3, 'BOOLEAN': -3, 'STRING': -3, 'NUMBER': -3, 'NOT': -3, '(': -3, '-': -3, 'NAME': -3, '$end': -3, '}': -3},
+        {'NEWLINE': 16, 'PRINT': 5, '{': 8, 'NULL': 9, 'BOOLEAN': 10, 'STRING': 11, 'NUMBER': 12, 'NOT': 13, '(': 6, '-': 14, 'NAME': 15, '$end': -2, '}': -2},
+        {'{': 8, 'NULL': 9, 'BOOLEAN': 10, 'STRING': 11, 'NUMBER': 12, 'NOT': 13, '(': 6, '-': 14, 'NAME': 15},
+        {'{': 8, 'NULL': 9, 'BOOLEAN': 10, 'STRING': 11, 'NUMBER': 12, 'NOT': 13, '(': 6, '-': 14, 'NAME': 15},
+        {'{': 8, 'NULL': 9, 'BOOLEAN': 10, 'STRING': 11, 'NUMBER': 12, 'NOT': 13, '(': 6, '-': 14, 'NAME': 15},
+        {'{': 8, 'NULL': 9, 'BOOLEAN': 10, 'STRING': 11, 'NUMBER': 12, 'NOT': 13, '(': 6, '-': 14, 'NAME': 15},
+        {'{': 8, 'NULL': 9, 'BOOLEAN': 10, 'STRING': 11, 'NUMBER': 12, 'NOT': 13, '(': 6, '-': 14, 'NAME': 15},
+        {'{': 8, 'NULL': 9, 'BOOLEAN': 10, 'STRING': 11, 'NUMBER': 12, 'NOT': 13, '(': 6, '-': 14, 'NAME': 15},
+        {'{': 8, 'NULL': 9, 'BOOLEAN': 10, 'STRING': 11, 'NUMBER': 12, 'NOT': 13, '(': 6, '-': 14, 'NAME': 15},
+        {'{': 8, 'NULL': 9, 'BOOLEAN': 10, 'STRING': 11, 'NUMBER': 12, 'NOT': 13, '(': 6, '-': 14, 'NAME': 15},
+        {'{': 8, 'NULL': 9, 'BOOLEAN': 10, 'STRING': 11, 'NUMBER': 12, 'NOT': 13, '(': 6, '-': 14, 'NAME': 15},
+        {')': 43, 'EQ': 19, 'OR': 20, 'AND': 21, '%': 22, '/': 23, '*': 24, '-': 25, '+': 26},
+        {'{': 8, 'NULL': 9, 'BOOLEAN': 10, 'STRING': 11, 'NUMBER': 12, 'NOT': 13, '(': 6, '-': 14, 'NAME': 15},
+        {'NAME': 45},
+        {'}': 46, 'NEWLINE': 2, 'PRINT': 5, '{': 8, 'NULL': 9, 'BOOLEAN': 10, 'STRING': 11, 'NUMBER': 12, 'NOT': 13, '(': 6, '-': 14, 'NAME': 15},
+        {'EQ': -15, 'OR': -15, 'AND': -15, '%': -15, '/': -15, '*': -15, '-': -15, '+': -15, 'NEWLINE': -15, 'PRINT': -15, '{': -15, 'NULL': -15, 'BOOLEAN': -15, 'STRING': -15, 'NUMBER': -15, 'NOT': -15, '(': -15, 'NAME': -15, '$end': -15, '}': -15, ')': -15},
+        {'EQ': -20, 'OR': -20, 'AND': -20, '%': -20, '/': -20, '*': -20, '-': -20, '+': -20, 'NEWLINE': -20, 'PRINT': -20, '{': -20, 'NULL': -20, 'BOOLEAN': -20, 'STRING': -20, 'NUMBER': -20, 'NOT': -20, '(': -20, 'NAME': -20, '$end': -20, '}': -20, ')': -20},
+        {'EQ': -16, 'OR': -16, 'AND': -16, '%': 22, '/': 23, '*': 24, '-': 25, '+': 26, 'NEWLINE': -16, 'PRINT': -16, '{': -16, 'NULL': -16, 'BOOLEAN': -16, 'STRING': -16, 'NUMBER': -16, 'NOT': -16, '(': -16, 'NAME': -16, '$end': -16, '}': -16, ')': -16},
+        {'EQ': 19, 'OR': -17, 'AND': -17, '%': 22, '/': 23, '*': 24, '-': 25, '+': 26, 'NEWLINE': -17, 'PRINT': -17, '{': -17, 'NULL': -17, 'BOOLEAN': -17, 'STRING': -17, 'NUMBER': -17, 'NOT': -17, '(': -17, 'NAME': -17, '$end': -17, '}': -17, ')': -17},
+        {'EQ': 19, 'OR': -18, 'AND': -18, '%': 22, '/': 23, '*': 24, '-': 25, '+': 26, 'NEWLINE': -18, 'PRINT': -18, '{': -18, 'NULL': -18, 'BOOLEAN': -18, 'STRING': -18, 'NUMBER': -18, 'NOT': -18, '(': -18, 'NAME': -18, '$end': -18, '}': -18, ')': -18},
+        {'EQ': -21, 'OR': -21, 'AND': -21, '%': -21, '/': -21, '*': -21, '-': -21, '+': -21, 'NEWLINE': -21, 'PRINT': -21, '{': -21, 'NULL': -21, 'BOOLEAN': -21, 'STRING': -21, 'NUMBER': -21, 'NOT': -21, '(': -21, 'NAME': -21, '$end': -21, '}': -21, ')': -21},
+        {'EQ': -22, 'OR': -22, 'AND': -22, '%': -22, '/': -22, '*': -22, '-': -22, '+': -22, 'NEWLINE': -22, 'PRINT': -22, '{': -22, 'NULL': -22, 'BOOLEAN': -22, 'STRING': -22, 'NUMBER': -22, 'NOT': -22, '(': -22, 'NAME': -22, '$end': -22, '}': -22, ')': -22},
+        {'EQ': -23, 'OR': -23, 'AND': -23, '%': -23, '/': -23, '*': -23, '-': -23, '+': -23, 'NEWLINE': -23, 'PRINT': -23, '{': -23, 'NULL': -23, 'BOOLEAN': -23, 'STRING': -23, 'NUMBER': -23, 'NOT': -23, '(': -23, 'NAME': -23, '$end': -23, '}': -23, ')': -23},
+        {'EQ': -24, 'OR': -24, 'AND': -24, '%': 22, '/': 23, '*': 24, '-': -24, '+': -24, 'NEWLINE': -24, 'PRINT': -24, '{': -24, 'NULL': -24, 'BOOLEAN': -24, 'STRING': -24, 'NUMBER': -24, 'NOT': -24, '(': -24, 'NAME': -24, '$end': -24, '}': -24, ')': -24},
+        {'EQ': -25, 'OR': -25, 'AND': -25, '%': 22, '/': 23, '*': 24, '-': -25, '+': -25, 'NEWLINE': -25, 'PRINT': -25, '{': -25, 'NULL': -25, 'BOOLEAN': -25, 'STRING': -25, 'NUMBER': -25, 'NOT': -25, '(': -25, 'NAME': -25, '$end': -25, '}': -25, ')': -25},
+        {')': 48, 'EQ': 19, 'OR': 20, 'AND': 21, '%': 22, '/': 23, '*': 24, '-': 25, '+': 26},
+        {'EQ': -19, 'OR': -19, 'AND': -19, '%': -19, '/': -19, '*': -19, '-': -19, '+': -19, 'NEWLINE': -19, 'PRINT': -19, '{': -19, 'NULL': -19, 'BOOLEAN': -19, 'STRING': -19, 'NUMBER': -19, 'NOT': -19, '(': -19, 'NAME': -19, '$end': -19, '}': -19, ')': -19},
+        {'EQ': 19, 'OR': 20, 'AND': 21, '%': 22, '/': 23, '*': 24, '-': 25, '+': 26, 'NEWLINE': -7, 'PRINT': -7, '{': -7, 'NULL': -7, 'BOOLEAN': -7, 'STRING': -7, 'NUMBER': -7, 'NOT': -7, '(': -7, 'NAME': -7, '$end': -7, '}': -7, ')': -7},
+        {'ASSIGN': -28, '.': -28, 'EQ': -28, 'OR': -28, 'AND': -28, '%': -28, '/': -28, '*': -28, '-': -28, '+': -28, 'NEWLINE': -28, 'PRINT': -28, '{': -28, 'NULL': -28, 'BOOLEAN': -28, 'STRING': -28, 'NUMBER': -28, 'NOT': -28, '(': -28, 'NAME': -28, '$end': -28, '}': -28, ')': -28},
+        {'EQ': -9, 'OR': -9, 'AND': -9, '%': -9, '/': -9, '*': -9, '-': -9, '+': -9, 'NEWLINE': -9, 'PRINT': -9, '{': -9, 'NULL': -9, 'BOOLEAN': -9, 'STRING': -9, 'NUMBER': -9, 'NOT': -9, '(': -9, 'NAME': -9, '$end': -9, '}': -9, ')': -9},
+        {'}': 49, 'NEWLINE': 16, 'PRINT': 5, '{': 8, 'NULL': 9, 'BOOLEAN': 10, 'STRING': 11, 'NUMBER': 12, 'NOT': 13, '(': 6, '-': 14, 'NAME': 15},
+        {'NEWLINE': -6, 'PRINT': -6, '{': -6, 'NULL': -6, 'BOOLEAN': -6, 'STRING': -6, 'NUMBER': -6, 'NOT': -6, '(': -6, '-': -6, 'NAME': -6, '$end': -6, '}': -6},
+        {'EQ': -10, 'OR': -10, 'AND': -10, '%': -10, '/': -10, '*': -10, '-': -10, '+': -10, 'NEWLINE': -10, 'PRINT': -10, '{': -10, 'NULL': -10, 'BOOLEAN': -10, 'STRING': -10, 'NUMBER': -10, 'NOT': -10, '(': -10, 'NAME': -10, '$end': -10, '}': -10, ')': -10},
+    ],
+    'goto': [
+        {'block': 1, 'stmt': 3, 'expr': 4, 'ref': 7},
+        {'stmt': 17, 'expr': 4, 'ref': 7},
+        {'block': 18, 'stmt': 3, 'expr': 4, 'ref': 7},
+        {},
+        {},
+        {},
+        {'expr': 28, 'ref': 7},
+        {},
+        {'new_scope': 31},
+        {},
+        {},
+        {},
+        {},
+        {'expr': 32, 'ref': 7},
+        {'expr': 33, 'ref': 7},
+        {},
+        {},
+        {},
+        {'stmt': 17, 'expr': 4, 'ref': 7},
+        {'expr': 34, 'ref': 7},
+        {'expr': 35, 'ref': 7},
+        {'expr': 36, 'ref': 7},
+        {'expr': 37, 'ref': 7},
+        {'expr': 38, 'ref': 7},
+        {'expr': 39, 'ref': 7},
+        {'expr': 40, 'ref': 7},
+        {'expr': 41, 'ref': 7},
+        {'expr': 42, 'ref': 7},
+        {},
+        {'ref': 7, 'expr': 44},
+        {},
+        {'block': 47, 'stmt': 3, 'expr': 4, 'ref': 7},
+        {},
+        {},
+        {},
+        {},
+        {},
+        {},
+        {},
+        {},
+        {},
+        {},
+        {},
+        {},
+        {},
+        {},
+        {},
+        {'stmt': 17, 'expr': 4, 'ref': 7},
+        {},
+        {},
+    ],
+    'defaulted': [],
+    'sr_conflicts': [
+        [4, '-', 'shift'],
+        [18, 'NEWLINE', 'shift'],
+        [18, 'PRINT', 'shift'],
+        [18, '{', 'shift'],
+        [18, 'NULL', 'shift'],
+        [18, 'BOOLEAN', 'shift'],
+        [18, 'STRING', 'shift'],
+        [18, 'NUMBER', 'shift'],
+        [18, 'NOT', 'shift'],
+        [18, '(', 'shift'],
+        [18, '-', 'shift'],
+        [18, 'NAME', 'shift'],
+        [44, 'EQ', 'shift'],
+        [44, 'OR', 'shift'],
+        [44, 'AND', 'shift'],
+        [44, '%', 'shift'],
+        [44, '/', 'shift'],
+        [44, '*', 'shift'],
+        [44, '-', 'shift'],
+        [44, '+', 'shift'],
+    ],
+    'rr_conflicts': [],
+}
@@ -0,0 +1,67 @@
+"""Compiled Luca programs, for compiling once and running many times.
+
+A Program holds everything derived from its source: the syntax tree, the
+name resolution and the compiled closures (see closures.py). Programs are
+immutable and keep no state between runs; each run works only on the scope
+it is given. So a Program can be compiled once, kept for the life of the
+process, and run from any number of threads at the same time.
+"""
+
+from collections.abc import Mapping
+
+from . import closures, syntax
+from .luca import LucaObject, LucaValue
+
+Globals = LucaObject | Mapping[str, LucaValue] | None
+
+
+class Program:
+    """A compiled Luca program. Use Luca.compile to create one."""
+
+    __slots__ = ("source", "tree", "_run")
+
+    @classmethod
+    def from_source(cls, source: str) -> "Program":
+        """Compile source, raising SyntaxError if it can't be parsed."""
+        tree = syntax.parse_source(source)
+        if tree is None:
+            raise SyntaxError("Could not parse Luca program.")
+        return cls(source, tree)
+
+    def __init__(self, source: str, tree: syntax.Block):
+        object.__setattr__(self, "source", source)
+        object.__setattr__(self, "tree", tree)
+        object.__setattr__(self, "_run", closures.compile_tree(tree))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Program is immutable; cannot set {name}.")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"Program is immutable; cannot delete {name}.")
+
+    def __eq__(self, other):
+        if not isinstance(other, Program):
+            return NotImplemented
+        return self.source == other.source
+
+    def __hash__(self):
+        return hash(self.source)
+
+    def __repr__(self):
+        return f"Program({self.source!r})"
+
+    def run(self, globals: Globals = None) -> LucaValue:
+        """Run the program and return the value of its last statement.
+
+        globals is the top level scope. A LucaObject is used as is, so that
+        names assigned by the program are kept in it. A mapping from names to
+        values is copied into a new scope, and is not changed by the run.
+        None runs the program in a new, empty scope.
+        """
+        if not isinstance(globals, LucaObject):
+            names = globals
+            globals = LucaObject()
+            if names is not None:
+                for name, value in names.items():
+                    globals.set(name, value)
+        return self._run(globals)
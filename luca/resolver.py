@@ -0,0 +1,109 @@
+"""Static name resolution for Luca syntax trees.
+
+Luca has no control flow, so the statements of a program always run in the
+order they are written. That makes it possible to decide at compile time,
+for every bare name, which enclosing block holds it: the innermost block
+that has already assigned the name at that point. Each name is resolved to
+a (depth, slot) pair, where depth counts the blocks to walk outwards from
+the current one. Names assigned directly in a braced block get slot numbers
+in the order in which they are first assigned, and that block's frame can
+store them in a fixed-size list (see LucaFrame).
+
+The top level of a program runs in a scope supplied by the caller, which may
+already hold names and outlives the program. Names that resolve to it have a
+slot of None and are looked up by name.
+"""
+
+from . import syntax
+
+
+class Resolution:
+    """The result of resolving a syntax tree.
+
+    names maps each Name node, and each Assign node with a Name target, to
+    its (depth, slot) pair. layouts maps each Scope node to the dict from
+    the names assigned in that block to their slots.
+    """
+
+    def __init__(self):
+        self.names = {}
+        self.layouts = {}
+
+
+class _Block:
+    __slots__ = ("layout", "assigned")
+
+    def __init__(self, layout):
+        # The top level block has no layout; its names are looked up by name.
+        self.layout = layout
+        self.assigned = set()
+
+
+class Resolver:
+    def __init__(self):
+        self.resolution = Resolution()
+        self.blocks = [_Block(None)]
+        self._dispatch = {
+            syntax.Block: self._block,
+            syntax.Scope: self._scope,
+            syntax.Print: lambda node: self.visit(node.expr),
+            syntax.Constant: lambda node: None,
+            syntax.BinOp: self._binop,
+            syntax.UnaryOp: lambda node: self.visit(node.operand),
+            syntax.Name: self._name,
+            syntax.Attribute: lambda node: self.visit(node.obj),
+            syntax.Assign: self._assign,
+        }
+
+    def resolve(self, tree: syntax.Block) -> Resolution:
+        self.visit(tree)
+        return self.resolution
+
+    def visit(self, node: syntax.Node):
+        self._dispatch[type(node)](node)
+
+    def _block(self, node: syntax.Block):
+        for stmt in node.statements:
+            self.visit(stmt)
+
+    def _scope(self, node: syntax.Scope):
+        block = _Block({})
+        self.blocks.append(block)
+        for stmt in node.statements:
+            self.visit(stmt)
+        self.blocks.pop()
+        self.resolution.layouts[node] = block.layout
+
+    def _binop(self, node: syntax.BinOp):
+        first, chain = syntax.binop_chain(node)
+        self.visit(first)
+        for binop in chain:
+            self.visit(binop.right)
+
+    def _name(self, node: syntax.Name):
+        for depth, block in enumerate(reversed(self.blocks)):
+            if block.layout is not None and node.name in block.assigned:
+                self.resolution.names[node] = (depth, block.layout[node.name])
+                return
+        self.resolution.names[node] = (len(self.blocks) - 1, None)
+
+    def _assign(self, node: syntax.Assign):
+        target = node.target
+        if isinstance(target, syntax.Attribute):
+            self.visit(target.obj)
+            self.visit(node.value)
+            return
+        # The value is evaluated before the name is assigned, so any
+        # references to the name in it see the previous binding.
+        self.visit(node.value)
+        block = self.blocks[-1]
+        block.assigned.add(target.name)
+        if block.layout is None:
+            self.resolution.names[node] = (0, None)
+        else:
+            slot = block.layout.setdefault(target.name, len(block.layout))
+            self.resolution.names[node] = (0, slot)
+
+
+def resolve(tree: syntax.Block) -> Resolution:
+    return Resolver().resolve(tree)
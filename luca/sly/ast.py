@@ -2,7 +2,10 @@
 import sys
 
 class AST(object):
-    
+    # Subclasses may define __slots__ naming their annotated fields to keep
+    # nodes compact.  Every node carries an optional (start, end) source span.
+    __slots__ = ('span',)
+
     @classmethod
     def __init_subclass__(cls, **kwargs):
         mod = sys.modules[cls.__module__]
@@ -10,16 +13,26 @@ class AST(object):
             return
 
         hints = list(cls.__annotations__.items())
+        types = None
 
-        def __init__(self, *args, **kwargs):
+        def __init__(self, *args, span=None):
+            nonlocal types
             if len(hints) != len(args):
                 raise TypeError(f'Expected {len(hints)} arguments')
-            for arg, (name, val) in zip(args, hints):
-                if isinstance(val, str):
-                    val = getattr(mod, val)
+            # String annotations are resolved once, on first use, since they
+            # may name classes defined later in the module.
+            if types is None:
+                types = [ getattr(mod, val) if isinstance(val, str) else val
+                          for _, val in hints ]
+            for arg, (name, _), val in zip(args, hints, types):
                 if not isinstance(arg, val):
                     raise TypeError(f'{name} argument must be {val}')
                 setattr(self, name, arg)
+            self.span = span
 
-        cls.__init__ = __init__
+        def __repr__(self):
+            fields = ', '.join(repr(getattr(self, name)) for name, _ in hints)
+            return f'{cls.__name__}({fields})'
 
+        cls.__init__ = __init__
+        cls.__repr__ = __repr__
@@ -31,17 +31,22 @@
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 # -----------------------------------------------------------------------------
 
-__all__ = ['Lexer', 'LexerStateChange']
+__all__ = ['Lexer', 'LexerStateChange', 'LazyToken', 'TokenList', 'TokenBatch', 'TokenDelta']
 
 import re
 import copy
+import codecs
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
 
 class LexError(Exception):
     '''
     Exception raised if an invalid character is encountered and no default
     error handler function is defined.  The .text attribute of the exception
-    contains all remaining untokenized text. The .error_index is the index
-    location of the error.
+    contains the untokenized text from the error, up to the lexer's
+    error_context characters. The .error_index is the index location of the
+    error.
     '''
     def __init__(self, message, text, error_index):
         self.args = (message,)
@@ -77,6 +82,179 @@ class Token(object):
     def __repr__(self):
         return f'Token(type={self.type!r}, value={self.value!r}, lineno={self.lineno}, index={self.index}, end={self.end})'
 
+class LazyToken(Token):
+    '''
+    A token whose value is only made when it's first read. Until then the
+    token holds the text it was tokenized from, its lexer and the lexer's
+    rule functions when it was made, and the value is decoded from
+    text[index:end] by the rule function for its type. Lexers make these
+    for the types in their lazy_values.
+    '''
+    __slots__ = ('_source',)
+
+    @property
+    def value(self):
+        try:
+            return _token_value.__get__(self)
+        except AttributeError:
+            pass
+        text, lexer, token_funcs = self._source
+        tok = Token()
+        tok.type = self.type
+        tok.value = text[self.index:self.end]
+        tok.lineno = self.lineno
+        tok.index = self.index
+        tok.end = self.end
+        func = token_funcs.get(self.type)
+        if func is not None:
+            tok = func(lexer, tok)
+        _token_value.__set__(self, tok.value)
+        # The text is no longer needed
+        self._source = None
+        return tok.value
+
+    @value.setter
+    def value(self, value):
+        _token_value.__set__(self, value)
+        self._source = None
+
+_token_value = Token.value
+
+def _lazy_token(tok, source):
+    lazy = LazyToken()
+    lazy.type = tok.type
+    lazy.lineno = tok.lineno
+    lazy.index = tok.index
+    lazy.end = tok.end
+    lazy._source = source
+    return lazy
+
+class TokenList(object):
+    '''
+    A compact, list-like store of tokens. Token types, values and positions
+    are kept in columns rather than in one Token object per token: types
+    and values in lists, and lineno, index and end in arrays of machine
+    integers. String values are shared between equal tokens. Indexing and
+    iterating make Token objects as they're needed, so a TokenList can be
+    passed to Parser.parse() in place of tokenize(). Positions must be
+    integers.
+    '''
+    __slots__ = ('types', 'values', 'lineno', 'index', 'end', '_strings')
+
+    def __init__(self, tokens=()):
+        self.types = []
+        self.values = []
+        self.lineno = array('l')
+        self.index = array('l')
+        self.end = array('l')
+        self._strings = {}
+        self.extend(tokens)
+
+    def append(self, tok):
+        self.extend((tok,))
+
+    def extend(self, tokens):
+        types = self.types.append
+        values = self.values.append
+        lineno = self.lineno.append
+        index = self.index.append
+        end = self.end.append
+        strings = self._strings.setdefault
+        for tok in tokens:
+            value = tok.value
+            types(tok.type)
+            values(strings(value, value) if value.__class__ is str else value)
+            lineno(tok.lineno)
+            index(tok.index)
+            end(tok.end)
+
+    def _token(self, n):
+        tok = Token()
+        tok.type = self.types[n]
+        tok.value = self.values[n]
+        tok.lineno = self.lineno[n]
+        tok.index = self.index[n]
+        tok.end = self.end[n]
+        return tok
+
+    def __len__(self):
+        return len(self.types)
+
+    def __getitem__(self, n):
+        if isinstance(n, slice):
+            return TokenList(map(self._token, range(*n.indices(len(self)))))
+        if n < 0:
+            n += len(self)
+        if not 0 <= n < len(self):
+            raise IndexError('TokenList index out of range')
+        return self._token(n)
+
+    def __iter__(self):
+        for type, value, lineno, index, end in zip(self.types, self.values, self.lineno, self.index, self.end):
+            tok = Token()
+            tok.type = type
+            tok.value = value
+            tok.lineno = lineno
+            tok.index = index
+            tok.end = end
+            yield tok
+
+    def __repr__(self):
+        return f'TokenList({list(self)!r})'
+
+class TokenBatch(object):
+    '''
+    The tokens of a text as parallel arrays, made by Lexer.tokenize_batch().
+    types holds each token's type as an index into type_names, in an
+    array('B'), and start and end hold its offsets in text, in array('l')s.
+    Values are only decoded when value() or token() asks for them.
+    '''
+    __slots__ = ('lexer', 'text', 'lineno', 'type_names', 'types', 'start', 'end')
+
+    def __init__(self, lexer, text, lineno, type_names, types, start, end):
+        self.lexer = lexer
+        self.text = text
+        self.lineno = lineno
+        self.type_names = type_names
+        self.types = types
+        self.start = start
+        self.end = end
+
+    def __len__(self):
+        return len(self.types)
+
+    def type(self, n):
+        return self.type_names[self.types[n]]
+
+    def token(self, n):
+        '''
+        Return token n, with its value decoded by the rule function for its
+        type, if there is one. Every token has the lineno that tokenizing
+        started with.
+        '''
+        tok = Token()
+        tok.type = self.type_names[self.types[n]]
+        tok.index = start = self.start[n]
+        tok.end = end = self.end[n]
+        tok.value = self.text[start:end]
+        tok.lineno = self.lineno
+        func = self.lexer._token_funcs.get(tok.type)
+        if func is not None:
+            lexer = self.lexer
+            lexer.text = self.text
+            lexer.index = end
+            lexer.lineno = self.lineno
+            tok = func(lexer, tok) or tok
+        return tok
+
+    def value(self, n):
+        return self.token(n).value
+
+# The change that Lexer.relex() made to a TokenBatch: the removed tokens from
+# index were replaced by the added ones, and the offsets of the tokens after
+# them moved by shift.
+TokenDelta = namedtuple('TokenDelta', ['index', 'removed', 'added', 'shift'])
+
 class TokenStr(str):
     @staticmethod
     def __new__(cls, value, key=None, remap=None):
@@ -180,6 +358,9 @@ class LexerMeta(type):
         cls._build()
         return cls
 
+class _MoreInput(Exception):
+    pass
+
 class Lexer(metaclass=LexerMeta):
     # These attributes may be defined in subclasses
     tokens = set()
@@ -188,6 +369,19 @@ class Lexer(metaclass=LexerMeta):
     reflags = 0
     regex_module = re
 
+    # Replace tokenize() with a function generated for this class's rules
+    # (see _specialize_tokenize). It doesn't support lexer states or
+    # mark()/accept()/reject().
+    specialize = False
+
+    # Token types whose rule functions are only called when the token's
+    # value is first read (see LazyToken). The functions may only set the
+    # value.
+    lazy_values = frozenset()
+
+    # The most characters of remaining text given to error() and LexError
+    error_context = 80
+
     _token_names = set()
     _token_funcs = {}
     _ignored_tokens = set()
@@ -333,6 +527,16 @@ class Lexer(metaclass=LexerMeta):
         if not all(isinstance(lit, str) for lit in cls.literals):
             raise LexerBuildError('literals must be specified as strings')
 
+        lazy_ignored = set(cls.lazy_values) & cls._ignored_tokens
+        if lazy_ignored:
+            raise LexerBuildError(f'Ignored token(s) {", ".join(sorted(lazy_ignored))} can\'t have lazy values')
+
+        if cls.specialize:
+            cls.tokenize = _specialize_tokenize(cls)
+        elif getattr(cls.tokenize, 'specialized', False):
+            # Don't inherit a tokenize() generated for a base class
+            cls.tokenize = Lexer.tokenize
+
     def begin(self, cls):
         '''
         Begin a new lexer state
@@ -358,17 +562,22 @@ class Lexer(metaclass=LexerMeta):
         self.begin(self.__state_stack.pop())
 
     def tokenize(self, text, lineno=1, index=0):
-        _ignored_tokens = _master_re = _ignore = _token_funcs = _literals = _remapping = None
+        _ignored_tokens = _master_re = _ignore = _token_funcs = _literals = _remapping = _lazy_values = None
+        source = None
 
         # --- Support for state changes
         def _set_state(cls):
-            nonlocal _ignored_tokens, _master_re, _ignore, _token_funcs, _literals, _remapping
+            nonlocal _ignored_tokens, _master_re, _ignore, _token_funcs, _literals, _remapping, _lazy_values
+            nonlocal source
             _ignored_tokens = cls._ignored_tokens
             _master_re = cls._master_re
             _ignore = cls.ignore
             _token_funcs = cls._token_funcs
             _literals = cls.literals
             _remapping = cls._remapping
+            _lazy_values = cls.lazy_values
+            # Lazy values are decoded by the rule functions of this state
+            source = (text, self, _token_funcs)
 
         self.__set_state = _set_state
         _set_state(type(self))
@@ -392,6 +601,7 @@ class Lexer(metaclass=LexerMeta):
 
         # --- Main tokenization function
         self.text = text
+        self.reset()
         try:
             while True:
                 try:
@@ -413,6 +623,10 @@ class Lexer(metaclass=LexerMeta):
                     if tok.type in _remapping:
                         tok.type = _remapping[tok.type].get(tok.value, tok.type)
 
+                    if tok.type in _lazy_values:
+                        yield _lazy_token(tok, source)
+                        continue
+
                     if tok.type in _token_funcs:
                         self.index = index
                         self.lineno = lineno
@@ -440,7 +654,7 @@ class Lexer(metaclass=LexerMeta):
                         self.index = index
                         self.lineno = lineno
                         tok.type = 'ERROR'
-                        tok.value = text[index:]
+                        tok.value = text[index:index + self.error_context]
                         tok = self.error(tok)
                         if tok is not None:
                             tok.end = self.index
@@ -455,6 +669,624 @@ class Lexer(metaclass=LexerMeta):
             self.index = index
             self.lineno = lineno
 
+    def tokenize_batch(self, text, lineno=1, index=0, stop=None):
+        '''
+        Tokenize text into a TokenBatch of parallel arrays, without making an
+        object for each token. It is no faster than iterating over
+        tokenize(), but holds the tokens in about a tenth of the memory of a
+        list of Tokens. Rule functions aren't called, so each token
+        has the type its rule and remapping give it, and tokens that a rule
+        function would drop are kept. TokenBatch.token() calls them for one
+        token when it's decoded. A token that the error handler returns with
+        a type that isn't one of the lexer's is kept as an ERROR token. As
+        with specialize, lexer states and mark()/accept()/reject() aren't
+        supported.
+
+        If stop is given, tokenizing stops before the first token starting
+        at or after it, and self.index is left at that token's start.
+        '''
+        cls = type(self)
+        tokenize_batch = cls.__dict__.get('_tokenize_batch')
+        if tokenize_batch is None:
+            tokenize_batch = cls._tokenize_batch = _specialize_tokenize(cls, batch=True)
+        return tokenize_batch(self, text, lineno, index, stop)
+
+    def relex(self, batch, offset, deleted, inserted):
+        '''
+        Update the TokenBatch of a text for an edit that replaced deleted
+        characters at offset with the string inserted. Returns the TokenBatch
+        of the new text and a TokenDelta describing the change.
+
+        Tokenizing restarts at the start of the line containing the edit, or
+        at the start of the token that line begins in, and stops as soon as a
+        token starts where one started before the edit. So tokenizing depends
+        on the size of the edit rather than of the text. Copying the arrays
+        and moving the offsets after the edit are still linear, but cheap
+        per token. This assumes that no token depends on text beyond the
+        end of the line it ends on, and that no ignored token spans lines.
+        '''
+        text = batch.text
+        if not 0 <= offset <= offset + deleted <= len(text):
+            raise ValueError('edit is outside the text')
+        new_text = text[:offset] + inserted + text[offset + deleted:]
+        shift = len(inserted) - deleted
+        starts = batch.start
+        ntokens = len(batch)
+
+        # Keep the tokens that end before the line containing the edit
+        line_start = text.rfind('\n', 0, offset) + 1
+        first = bisect_left(batch.end, line_start)
+        index = min(line_start, starts[first]) if first < ntokens else line_start
+
+        # Tokenize up to the end of the inserted text, then on to each old
+        # token boundary until a new token starts on one.
+        parts = []
+        stop = offset + len(inserted)
+        resume = bisect_left(starts, offset + deleted)
+        while True:
+            parts.append(self.tokenize_batch(new_text, batch.lineno, index, stop))
+            index = self.index
+            if index >= len(new_text):
+                resume = ntokens
+                break
+            resume = bisect_left(starts, index - shift, resume)
+            if resume < ntokens and starts[resume] == index - shift:
+                break
+            stop = starts[resume] + shift if resume < ntokens else len(new_text)
+
+        types = batch.types[:first]
+        new_starts = starts[:first]
+        new_ends = batch.end[:first]
+        for part in parts:
+            types += part.types
+            new_starts += part.start
+            new_ends += part.end
+        added = len(types) - first
+        types += batch.types[resume:]
+        if shift:
+            new_starts += array('l', [n + shift for n in starts[resume:]])
+            new_ends += array('l', [n + shift for n in batch.end[resume:]])
+        else:
+            new_starts += starts[resume:]
+            new_ends += batch.end[resume:]
+        result = TokenBatch(self, new_text, batch.lineno, batch.type_names, types, new_starts, new_ends)
+        return result, TokenDelta(first, resume - first, added, shift)
+
+    def tokenize_stream(self, source, chunk_size=1 << 20, lineno=1, encoding='utf-8',
+                        max_token=1 << 24):
+        '''
+        Tokenize the text read from source, a file object or an mmap, in
+        chunks of chunk_size, so that the whole text is never in memory.
+        Binary sources are decoded with encoding. Token positions are
+        offsets into the whole text.
+
+        Each chunk is tokenized up to its last newline, and the rest is
+        carried into the next one. As with relex(), this assumes that no
+        token depends on text beyond the end of the line it ends on. A token
+        can still span lines: if tokenizing fails before the end of the
+        input at a character that can start a token, such as at a string
+        that continues in the next chunk, more input is read and tokenizing
+        resumes at the failure. The text kept from a failure at least
+        doubles before each retry, so retries take linear time, and once it
+        is longer than max_token characters the error is reported. So memory
+        is bounded by the chunk size and the longest line or token, and an
+        error is reported once more input can't fix it. Error handlers see
+        self.text and self.index relative to the text being tokenized.
+        '''
+        decoder = None
+        parts = []
+        size = 0
+        newline = False
+        # After a failure, retry once this much text is pending
+        retry_size = 0
+        base = 0
+        while True:
+            chunk = source.read(chunk_size)
+            eof = not chunk
+            if not isinstance(chunk, str):
+                if decoder is None:
+                    decoder = codecs.getincrementaldecoder(encoding)()
+                chunk = decoder.decode(chunk, final=eof)
+            if chunk:
+                parts.append(chunk)
+                size += len(chunk)
+                newline = newline or '\n' in chunk
+            if not eof and (not newline or size < retry_size):
+                continue
+
+            pending = ''.join(parts)
+            cut = len(pending) if eof else pending.rfind('\n') + 1
+            text = pending[:cut]
+            index = 0
+            if not eof and not (retry_size and size > max_token):
+                # Stop at an error that more input might fix
+                self.error = self._stream_error
+            try:
+                for tok in self.tokenize(text, lineno):
+                    if type(tok) is LazyToken:
+                        # Decode the value now, rather than keep the chunk
+                        tok.value
+                    tok.index += base
+                    tok.end += base
+                    yield tok
+                index = cut
+                retry_size = 0
+            except _MoreInput:
+                index = self.index
+                retry_size = 2 * (len(pending) - index)
+            except LexError as e:
+                # Report the position in the whole text
+                e.error_index += base
+                if type(self).error is Lexer.error:
+                    e.args = (f'Illegal character {e.text[0]!r} at index {e.error_index}',)
+                raise
+            finally:
+                self.__dict__.pop('error', None)
+            if eof:
+                return
+            lineno = self.lineno
+            base += index
+            pending = pending[index:]
+            parts = [pending] if pending else []
+            size = len(pending)
+            newline = '\n' in pending
+
+    def _stream_error(self, t):
+        # The error handler of tokenize_stream() until the end of the input.
+        # A character that can't start a token is an error whatever follows.
+        c = t.value[0]
+        starts = _start_chars(type(self))
+        if starts is not None and c < '\x80' and c not in starts:
+            return type(self).error(self, t)
+        raise _MoreInput()
+
+    # Called at the start of tokenize() and tokenize_batch(), before any rule
+    # function. May be changed in subclasses to make per-text state.
+    def reset(self):
+        pass
+
     # Default implementations of the error handler. May be changed in subclasses
     def error(self, t):
         raise LexError(f'Illegal character {t.value[0]!r} at index {self.index}', t.value, self.index)
+
+# -----------------------------------------------------------------------------
+# Specialized tokenizers
+#
+# _specialize_tokenize() generates the source of a tokenize() function for one
+# lexer class, so that the per-token work is only what that class's rules
+# need. Compared with the generic Lexer.tokenize():
+#
+#   - The first character of a token picks the rules to try. Each rule's
+#     regex is analysed for the ASCII characters that a match can start
+#     with, and characters are grouped by the rules that can start with them.
+#     Each group gets a pattern with only those rules, in their original
+#     order, so the rule that matches is the same one as before. Characters
+#     that only start literals make a token without a regex match, and so do
+#     rules matching one fixed character. Other characters use the master
+#     pattern.
+#   - A run of more than one ignored character is skipped with one regex
+#     match.
+#   - Each rule gets its own branch of code. Where a group has one rule, the
+#     token type is known without asking the match for it. Keyword remapping
+#     (NAME['if'] = IF) is a lookup in a dict for that rule only, ignored
+#     rules without functions skip the match without making a Token, and rule
+#     functions are called directly.
+#
+# With batch=True it generates tokenize_batch() instead, which appends each
+# token's type ID and offsets to arrays rather than making a Token, and
+# doesn't call rule functions.
+#
+# The generated source is kept in the class's _tokenize_source or
+# _tokenize_batch_source attribute.
+# -----------------------------------------------------------------------------
+
+try:
+    from re import _parser as _sre_parse, _constants as _sre_constants
+except ImportError:
+    # Python < 3.11
+    import sre_parse as _sre_parse, sre_constants as _sre_constants
+
+_ASCII = frozenset(map(chr, range(128)))
+
+_CATEGORIES = {
+    'DIGIT': r'\d', 'NOT_DIGIT': r'\D',
+    'SPACE': r'\s', 'NOT_SPACE': r'\S',
+    'WORD': r'\w', 'NOT_WORD': r'\W',
+}
+
+def _category_chars(category):
+    name = str(category).replace('CATEGORY_UNI_', '').replace('CATEGORY_', '')
+    if name not in _CATEGORIES:
+        return _ASCII
+    match = re.compile(_CATEGORIES[name]).match
+    return frozenset(c for c in _ASCII if match(c))
+
+def _set_chars(items):
+    chars = set()
+    negate = False
+    for op, av in items:
+        if op is _sre_constants.NEGATE:
+            negate = True
+        elif op is _sre_constants.LITERAL:
+            chars.add(chr(av))
+        elif op is _sre_constants.RANGE:
+            chars.update(chr(n) for n in range(av[0], min(av[1], 127) + 1))
+        elif op is _sre_constants.CATEGORY:
+            chars |= _category_chars(av)
+        else:
+            return _ASCII
+    return _ASCII - chars if negate else chars
+
+_REPEATS = {
+    _sre_constants.MAX_REPEAT,
+    _sre_constants.MIN_REPEAT,
+    getattr(_sre_constants, 'POSSESSIVE_REPEAT', None),
+}
+
+def _first_chars(items):
+    '''
+    Return (chars, nullable) for a parsed regex: the ASCII characters that a
+    match can start with, and whether it can match the empty string. chars
+    may include characters that can't start a match, but never leaves out
+    one that can.
+    '''
+    chars = set()
+    for op, av in items:
+        nullable = False
+        if op is _sre_constants.LITERAL:
+            first = {chr(av)}
+        elif op is _sre_constants.NOT_LITERAL:
+            first = _ASCII - {chr(av)}
+        elif op is _sre_constants.IN:
+            first = _set_chars(av)
+        elif op is _sre_constants.SUBPATTERN and not av[1]:
+            first, nullable = _first_chars(av[3])
+        elif op is getattr(_sre_constants, 'ATOMIC_GROUP', None):
+            first, nullable = _first_chars(av)
+        elif op is _sre_constants.BRANCH:
+            first = set()
+            for branch in av[1]:
+                branch_first, branch_nullable = _first_chars(branch)
+                first |= branch_first
+                nullable = nullable or branch_nullable
+        elif op in _REPEATS:
+            first, nullable = _first_chars(av[2])
+            nullable = nullable or av[0] == 0
+        elif op in (_sre_constants.AT, _sre_constants.ASSERT, _sre_constants.ASSERT_NOT):
+            # Zero width. Ignoring the assertion only allows more matches.
+            first, nullable = set(), True
+        else:
+            return _ASCII, True
+        chars |= first
+        if not nullable:
+            return chars, False
+    return chars, True
+
+def _parse_pattern(pattern, flags):
+    # None if the pattern can't be analysed
+    if flags & (re.IGNORECASE | re.LOCALE):
+        return None
+    try:
+        return list(_sre_parse.parse(pattern, flags))
+    except Exception:
+        return None
+
+def _rule_first_chars(pattern, flags):
+    parsed = _parse_pattern(pattern, flags)
+    if parsed is None:
+        return _ASCII
+    chars, nullable = _first_chars(parsed)
+    return _ASCII if nullable else frozenset(chars)
+
+def _start_chars(cls):
+    '''
+    The ASCII characters that a token of cls can start with, or None if
+    that isn't known. Cached on the class.
+    '''
+    if '_stream_start_chars' not in cls.__dict__:
+        chars = None
+        if cls.regex_module is re:
+            chars = set(cls.literals)
+            for _, value in cls._rules:
+                pattern = value if isinstance(value, str) else value.pattern
+                chars |= _rule_first_chars(pattern, cls.reflags)
+            chars = frozenset(chars)
+        cls._stream_start_chars = chars
+    return cls._stream_start_chars
+
+def _fixed_char(pattern, flags):
+    # The character that pattern matches if it only matches that character
+    parsed = _parse_pattern(pattern, flags)
+    if parsed and len(parsed) == 1 and parsed[0][0] is _sre_constants.LITERAL:
+        return chr(parsed[0][1])
+    return None
+
+def _batch_types(cls):
+    # The token types of tokenize_batch(), in the order of their IDs
+    names = [*sorted(cls._token_names), *sorted(lit for lit in cls.literals if len(lit) == 1)]
+    names.append('ERROR')
+    if len(names) > 256:
+        raise LexerBuildError('tokenize_batch() supports at most 256 token types')
+    return names
+
+def _no_state_changes(cls):
+    raise NotImplementedError('specialized tokenizers do not support lexer states')
+
+def _specialize_tokenize(cls, batch=False):
+    '''
+    Generate tokenize() for cls, or tokenize_batch() if batch is true.
+    '''
+    rules = []
+    for tokname, value in cls._rules:
+        if tokname.startswith('ignore_'):
+            tokname = tokname[7:]
+        pattern = value if isinstance(value, str) else value.pattern
+        rules.append((tokname, pattern))
+
+    # Group characters by the rules that can match at them. Only re's
+    # syntax is analysed, so other regex modules always use the master
+    # pattern.
+    if cls.regex_module is re:
+        first = [_rule_first_chars(pattern, cls.reflags) for _, pattern in rules]
+    else:
+        first = [_ASCII] * len(rules)
+    groups = {}
+    for c in sorted(_ASCII - set(cls.ignore)):
+        candidates = tuple(n for n, chars in enumerate(first) if c in chars)
+        if len(candidates) < len(rules):
+            groups.setdefault(candidates, []).append(c)
+
+    namespace = {
+        'Token': Token,
+        'LazyToken': LazyToken,
+        '_lazy_values': cls.lazy_values,
+        '_master': cls._master_re.match,
+        '_literals': cls.literals,
+        '_token_funcs': cls._token_funcs,
+        '_ignored_tokens': cls._ignored_tokens,
+        '_no_state_changes': _no_state_changes,
+    }
+    if cls.ignore:
+        namespace['_ignore'] = cls.ignore
+        ignore = ''.join(re.escape(c) for c in sorted(set(cls.ignore)))
+        namespace['_skip'] = re.compile(f'[{ignore}]+').match
+    if batch:
+        type_ids = {name: n for n, name in enumerate(_batch_types(cls))}
+        namespace.update(
+            array=array,
+            _TokenBatch=TokenBatch,
+            _type_names=tuple(type_ids),
+            _type_ids=type_ids,
+            _error_id=type_ids['ERROR'],
+            _literal_ids={lit: type_ids[lit] for lit in cls.literals if lit in type_ids},
+            _ignored_ids={type_ids[name] for name in cls._ignored_tokens if name in type_ids},
+        )
+
+    def token(type_expr):
+        return [
+            'tok = Token()',
+            f'tok.type = {type_expr}',
+            'tok.value = value',
+            'tok.lineno = lineno',
+            'tok.index = start',
+            'tok.end = index',
+            'yield tok',
+        ]
+
+    def indent(lines, prefix='    '):
+        return [f'{prefix}{line}' for line in lines]
+
+    def is_lazy(tokname):
+        # Tokens of rule tokname are always LazyTokens
+        return (not batch and tokname in cls.lazy_values and
+                not cls._remapping.get(tokname))
+
+    def rule_body(tokname):
+        # Code for a match of rule tokname, ending at index
+        remap = cls._remapping.get(tokname, {})
+        types = {tokname, *remap.values()}
+        if batch:
+            # Rule functions aren't called, so only the types matter.
+            if not remap:
+                if tokname in cls._ignored_tokens:
+                    return ['continue']
+                return [f'types({type_ids[tokname]})', 'starts(start)', 'ends(index)']
+            namespace[f'_remap_{tokname}'] = {key: type_ids[name] for key, name in remap.items()}
+            body = [f'kind = _remap_{tokname}.get(text[start:index], {type_ids[tokname]})']
+            if types & cls._ignored_tokens:
+                body += ['if kind in _ignored_ids:', '    continue']
+            return body + ['types(kind)', 'starts(start)', 'ends(index)']
+
+        if is_lazy(tokname):
+            return [
+                'tok = LazyToken()',
+                f'tok.type = {tokname!r}',
+                'tok.lineno = lineno',
+                'tok.index = start',
+                'tok.end = index',
+                'tok._source = source',
+                'yield tok',
+            ]
+        if remap:
+            namespace[f'_remap_{tokname}'] = dict(remap)
+            type_expr = f'_remap_{tokname}.get(value, {tokname!r})'
+        else:
+            type_expr = repr(tokname)
+
+        if not types & (set(cls._token_funcs) | cls._ignored_tokens | cls.lazy_values):
+            return token(type_expr)
+        if not remap and tokname not in cls._token_funcs:
+            # An ignored rule without a function
+            return ['continue']
+        body = token(type_expr)[:-1]
+        if remap and types & cls.lazy_values:
+            body += [
+                'if tok.type in _lazy_values:',
+                '    yield _lazy_token(tok, source)',
+                '    continue',
+            ]
+            namespace['_lazy_token'] = _lazy_token
+        if remap:
+            body += [
+                'func = _token_funcs.get(tok.type)',
+                'if func is not None:',
+            ]
+            prefix = '    '
+        elif tokname in cls._token_funcs:
+            namespace[f'_func_{tokname}'] = cls._token_funcs[tokname]
+            body.append(f'func = _func_{tokname}')
+            prefix = ''
+        else:
+            prefix = None
+        if prefix is not None:
+            body += indent([
+                'self.index = index',
+                'self.lineno = lineno',
+                'tok = func(self, tok)',
+                'index = self.index',
+                'lineno = self.lineno',
+                'if not tok:',
+                '    continue',
+            ], prefix)
+        body += [
+            'if tok.type in _ignored_tokens:',
+            '    continue',
+            'yield tok',
+        ]
+        return body
+
+    if batch:
+        literal_token = ['types(_literal_ids[c])', 'starts(start)', 'ends(index)']
+    else:
+        literal_token = ['value = c', *token('c')]
+    literal_body = [
+        'if c in _literals:',
+        '    index += 1',
+        *indent(literal_token),
+        'else:',
+        '    error = True',
+    ]
+
+    def match_body(match, candidates):
+        # Code for the token at index, using a pattern of the candidate rules
+        names = [rules[n][0] for n in candidates]
+        body = [
+            f'm = {match}(text, index)',
+            'if m is not None:',
+            '    index = m.end()',
+        ]
+        if not batch and not (len(names) == 1 and is_lazy(names[0])):
+            body.append('    value = m.group()')
+        if len(names) == 1:
+            body += indent(rule_body(names[0]))
+        else:
+            body.append('    kind = m.lastgroup')
+            for n, tokname in enumerate(names):
+                keyword = 'if' if n == 0 else 'elif'
+                body.append(f'    {keyword} kind == {tokname!r}:')
+                body += indent(rule_body(tokname), '        ')
+        return body + ['el' + literal_body[0], *literal_body[1:]]
+
+    # Literals first, then the groups starting the most characters
+    blocks = []
+    dispatch = {}
+    for candidates, chars in sorted(groups.items(), key=lambda item: (len(item[0]) > 0, -len(item[1]))):
+        if not candidates:
+            body = literal_body
+        elif (len(candidates) == 1 and len(chars) == 1 and
+              _fixed_char(rules[candidates[0]][1], cls.reflags) == chars[0]):
+            tokname = rules[candidates[0]][0]
+            body = ['index += 1', *([] if batch or is_lazy(tokname) else ['value = c']), *rule_body(tokname)]
+        else:
+            match = f'_match{len(blocks)}'
+            pattern = '|'.join(f'(?P<{rules[n][0]}>{rules[n][1]})' for n in candidates)
+            namespace[match] = cls.regex_module.compile(pattern, cls.reflags).match
+            body = match_body(match, candidates)
+        dispatch.update(dict.fromkeys(chars, len(blocks)))
+        blocks.append(body)
+    namespace['_dispatch'] = dispatch
+
+    if batch:
+        lines = [
+            'def tokenize_batch(self, text, lineno=1, index=0, stop=None):',
+            '    if stop is None:',
+            '        stop = len(text)',
+            "    types = array('B')",
+            "    starts = array('l')",
+            "    ends = array('l')",
+            '    batch = _TokenBatch(self, text, lineno, _type_names, types, starts, ends)',
+            '    types = types.append',
+            '    starts = starts.append',
+            '    ends = ends.append',
+        ]
+    else:
+        lines = ['def tokenize(self, text, lineno=1, index=0):', '    source = (text, self, _token_funcs)']
+    lines += [
+        '    self.text = text',
+        '    self.reset()',
+        '    self._Lexer__set_state = _no_state_changes',
+        '    try:',
+        '        while True:',
+        '            try:',
+        '                c = text[index]',
+    ]
+    if cls.ignore:
+        lines += [
+            '                if c in _ignore:',
+            '                    index += 1',
+            '                    c = text[index]',
+            '                    if c in _ignore:',
+            '                        index = _skip(text, index).end()',
+            '                        c = text[index]',
+        ]
+    lines += [
+        '            except IndexError:',
+        '                return batch' if batch else '                return',
+        '            start = index',
+        *(['            if start >= stop:', '                return batch'] if batch else []),
+        '            error = False',
+        '            block = _dispatch.get(c)',
+    ]
+    for n, body in enumerate(blocks):
+        keyword = 'if' if n == 0 else 'elif'
+        lines.append(f'            {keyword} block == {n}:')
+        lines += indent(body, ' ' * 16)
+    lines.append('            else:' if blocks else '            if True:')
+    lines += indent(match_body('_master', range(len(rules))), ' ' * 16)
+    lines += [
+        '            if error:',
+        '                # A lexing error',
+        '                tok = Token()',
+        '                tok.lineno = lineno',
+        '                tok.index = index',
+        "                tok.type = 'ERROR'",
+        '                tok.value = text[index:index + self.error_context]',
+        '                self.index = index',
+        '                self.lineno = lineno',
+        '                tok = self.error(tok)',
+        '                if tok is not None:',
+        '                    tok.end = self.index',
+    ]
+    if batch:
+        lines += [
+            '                    types(_type_ids.get(tok.type, _error_id))',
+            '                    starts(tok.index)',
+            '                    ends(tok.end)',
+        ]
+    else:
+        lines.append('                    yield tok')
+    lines += [
+        '                index = self.index',
+        '                lineno = self.lineno',
+        '    finally:',
+        '        self.text = text',
+        '        self.index = index',
+        '        self.lineno = lineno',
+    ]
+    source = '\n'.join(lines) + '\n'
+    name = 'tokenize_batch' if batch else 'tokenize'
+    exec(compile(source, f'<{name} {cls.__qualname__}>', 'exec'), namespace)
+    func = namespace[name]
+    func.specialized = True
+    setattr(cls, f'_{name}_source', source)
+    return func
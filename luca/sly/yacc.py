@@ -32,7 +32,14 @@
 # -----------------------------------------------------------------------------
 
 import sys
+import os
+import json
+import hashlib
 import inspect
+import importlib
+import threading
+import functools
+from array import array
 from collections import OrderedDict, defaultdict, Counter
 
 __all__        = [ 'Parser' ]
@@ -52,6 +59,8 @@ class YaccError(Exception):
 
 ERROR_COUNT = 3                # Number of symbols that must be shifted to leave recovery mode
 MAXINT = sys.maxsize
+_build_lock = threading.RLock() # Serializes the deferred construction of parsing tables
+_TABLE_FORMAT = 1              # Bump whenever the layout of cached LR tables changes
 
 # This object is a stand-in for a logging object created by the
 # logging module.   SLY will use this by default to create things
@@ -87,79 +96,151 @@ class SlyLogger(object):
 # ----------------------------------------------------------------------
 
 class YaccSymbol:
+    __slots__ = ('type', 'value', 'lineno', 'index', 'end')
+
     def __str__(self):
         return self.type
 
     def __repr__(self):
         return str(self)
 
+# ----------------------------------------------------------------------
+# The positions of the values produced by one call to Parser.parse(), for
+# line_position() and index_position(). Values are keyed by id(), and each
+# key also holds its value, which keeps the id() from being reused while
+# the table exists and is compared with `is` on lookup. A value recorded
+# twice keeps its latest position, so the table never holds more rows than
+# there were reductions. Positions are stored in parallel integer columns,
+# with -1 for a missing position (zero-length productions).
+# ----------------------------------------------------------------------
+
+class PositionTable:
+    __slots__ = ('_rows', 'lineno', 'start', 'end')
+
+    def __init__(self):
+        self._rows = { }                 # id(value) -> (value, row)
+        self.lineno = array('l')
+        self.start = array('l')
+        self.end = array('l')
+
+    def record(self, value, lineno, start, end):
+        lineno = -1 if lineno is None else lineno
+        start = -1 if start is None else start
+        end = -1 if end is None else end
+        entry = self._rows.get(id(value))
+        if entry is None:
+            self._rows[id(value)] = (value, len(self.lineno))
+            self.lineno.append(lineno)
+            self.start.append(start)
+            self.end.append(end)
+        else:
+            row = entry[1]
+            self.lineno[row] = lineno
+            self.start[row] = start
+            self.end[row] = end
+
+    def _row(self, value):
+        entry = self._rows.get(id(value))
+        if entry is None or entry[0] is not value:
+            raise KeyError(value)
+        return entry[1]
+
+    def line_position(self, value):
+        lineno = self.lineno[self._row(value)]
+        return None if lineno < 0 else lineno
+
+    def index_position(self, value):
+        row = self._row(value)
+        start, end = self.start[row], self.end[row]
+        return (None if start < 0 else start, None if end < 0 else end)
+
+    def __len__(self):
+        return len(self.lineno)
+
 # ----------------------------------------------------------------------
 # This class is a wrapper around the objects actually passed to each
 # grammar rule.   Index lookup and assignment actually assign the
 # .value attribute of the underlying YaccSymbol object.
 # The lineno() method returns the line number of a given
 # item (or 0 if not defined).   
+#
+# The symbols of the production are the top _len entries of the symbol
+# stack, starting at _base, so no slice of the stack is made on a reduce.
+# Each Production has a subclass of YaccProduction with a property for each
+# symbol name (see Production.accessors), and the parser switches the class
+# of its one YaccProduction object before calling each rule.
 # ----------------------------------------------------------------------
 
 class YaccProduction:
-    __slots__ = ('_slice', '_namemap', '_stack')
-    def __init__(self, s, stack=None):
-        self._slice = s
-        self._namemap = { }
+    __slots__ = ('_stack', '_base', '_len')
+    _names = ()
+    
+    def __init__(self, stack, base=0, length=0):
         self._stack = stack
+        self._base = base
+        self._len = length
+
+    @property
+    def _slice(self):
+        return self._stack[self._base:self._base + self._len]
 
     def __getitem__(self, n):
         if n >= 0:
-            return self._slice[n].value
+            return self._stack[self._base + n].value
         else:
             return self._stack[n].value
 
     def __setitem__(self, n, v):
         if n >= 0:
-            self._slice[n].value = v
+            self._stack[self._base + n].value = v
         else:
             self._stack[n].value = v
 
     def __len__(self):
-        return len(self._slice)
+        return self._len
 
+    # The position properties walk the production's symbols in place
+    # rather than through _slice, since they run on every reduction of a
+    # grammar that records spans.
     @property
     def lineno(self):
-        for tok in self._slice:
-            lineno = getattr(tok, 'lineno', None)
+        stack = self._stack
+        for n in range(self._base, self._base + self._len):
+            lineno = getattr(stack[n], 'lineno', None)
             if lineno:
                 return lineno
         raise AttributeError('No line number found')
 
     @property
     def index(self):
-        for tok in self._slice:
-            index = getattr(tok, 'index', None)
+        stack = self._stack
+        for n in range(self._base, self._base + self._len):
+            index = getattr(stack[n], 'index', None)
             if index is not None:
                 return index
         raise AttributeError('No index attribute found')
 
     @property
     def end(self):
-        result = None
-        for tok in self._slice:
-            r = getattr(tok, 'end', None)
+        stack = self._stack
+        for n in range(self._base + self._len - 1, self._base - 1, -1):
+            r = getattr(stack[n], 'end', None)
             if r:
-                result = r
-        return result
+                return r
+        return None
     
     def __getattr__(self, name):
-        if name in self._namemap:
-            return self._namemap[name](self._slice)
-        else:
-            nameset = '{' + ', '.join(self._namemap) + '}'
-            raise AttributeError(f'No symbol {name}. Must be one of {nameset}.')
+        # Only reached for names that aren't symbols of the production
+        nameset = '{' + ', '.join(self._names) + '}'
+        raise AttributeError(f'No symbol {name}. Must be one of {nameset}.')
 
-    def __setattr__(self, name, value):
-        if name[:1] == '_':
-            super().__setattr__(name, value)
-        else:
-            raise AttributeError(f"Can't reassign the value of attribute {name!r}")
+def _symbol_accessor(index):
+    def get(p):
+        return p._stack[p._base + index].value
+    return property(get)
+
+def _alias_accessor(func):
+    return property(lambda p: func(p._slice))
 
 # -----------------------------------------------------------------------------
 #                          === Grammar Representation ===
@@ -226,6 +307,7 @@ class Production(object):
         # Now, walk through the names and generate accessor functions
         nameuse = defaultdict(int)
         namemap = { }
+        symbol_index = { }
         for index, key in enumerate(self.prod):
             if namecount[key] > 1:
                 k = f'{key}{nameuse[key]}'
@@ -233,6 +315,7 @@ class Production(object):
             else:
                 k = key
             namemap[k] = lambda s,i=index: s[i].value
+            symbol_index[k] = index
             if key in _name_aliases:
                 for n, alias in enumerate(_name_aliases[key]):
                     if namecount[alias] > 1:
@@ -244,11 +327,28 @@ class Production(object):
                     namemap[k] = lambda s,i=index,n=n: ([x[n] for x in s[i].value]) if isinstance(s[i].value, list) else s[i].value[n]
 
         self.namemap = namemap
+        self.symbol_index = symbol_index      # Name -> position, for names of symbols
                 
         # List of all LR items for the production
         self.lr_items = []
         self.lr_next = None
 
+    @functools.cached_property
+    def accessors(self):
+        '''
+        The subclass of YaccProduction passed to this production's rule, with
+        a property for each name in namemap.
+        '''
+        attributes = { '__slots__': (), '_names': tuple(self.namemap) }
+        for k, func in self.namemap.items():
+            if hasattr(YaccProduction, k):
+                continue
+            if k in self.symbol_index:
+                attributes[k] = _symbol_accessor(self.symbol_index[k])
+            else:
+                attributes[k] = _alias_accessor(func)
+        return type(f'YaccProduction[{self.name}]', (YaccProduction,), attributes)
+
     def __str__(self):
         if self.prod:
             s = '%s -> %s' % (self.name, ' '.join(self.prod))
@@ -869,6 +969,25 @@ class Grammar(object):
         out.append('')
         return '\n'.join(out)
 
+    # ----------------------------------------------------------------------
+    # signature()
+    #
+    # Returns a hex digest that identifies the grammar for the purpose of
+    # caching the LR tables.  Anything that can change the generated tables
+    # (productions, precedence, terminals, and the start symbol) is included.
+    # ----------------------------------------------------------------------
+    def signature(self):
+        h = hashlib.sha256()
+        h.update(f'{_TABLE_FORMAT}\n'.encode())
+        h.update(f'start {self.Start}\n'.encode())
+        for term in sorted(self.Terminals):
+            h.update(f'term {term}\n'.encode())
+        for term, (assoc, level) in sorted(self.Precedence.items()):
+            h.update(f'prec {term} {assoc} {level}\n'.encode())
+        for p in self.Productions:
+            h.update(f'rule {p.name} {" ".join(p.prod)} {p.prec[0]} {p.prec[1]}\n'.encode())
+        return h.hexdigest()
+
 # -----------------------------------------------------------------------------
 #                           === LR Generator ===
 #
@@ -1566,6 +1685,190 @@ class LRTable(object):
 
         return '\n'.join(out)
 
+    # ----------------------------------------------------------------------
+    # Serialization.  to_data() returns the parts of the table needed at
+    # parse time (plus the state descriptions used for debugging output) as
+    # plain JSON-compatible data.  from_data() rebuilds a table from that data
+    # without running the LALR construction.
+    # ----------------------------------------------------------------------
+    def to_data(self):
+        nstates = len(self.lr_action)
+        return {
+            'action': [ self.lr_action[st] for st in range(nstates) ],
+            'goto': [ self.lr_goto[st] for st in range(nstates) ],
+            'defaulted': sorted(self.defaulted_states.items()),
+            'descriptions': [ self.state_descriptions.get(st, '') for st in range(nstates) ],
+            'sr_conflicts': [ list(c) for c in self.sr_conflicts ],
+            'rr_conflicts': [ [state, rule.number, rejected.number]
+                              for state, rule, rejected in self.rr_conflicts ],
+        }
+
+    @classmethod
+    def from_data(cls, productions, data):
+        self = cls.__new__(cls)
+        self.grammar = None
+        self.lr_productions = productions
+        self.lr_action = dict(enumerate(data['action']))
+        self.lr_goto = dict(enumerate(data['goto']))
+        self.defaulted_states = dict(data['defaulted'])
+        self.state_descriptions = OrderedDict(enumerate(data.get('descriptions', [])))
+        self.sr_conflicts = [ tuple(c) for c in data['sr_conflicts'] ]
+        self.rr_conflicts = [ (state, productions[rule], productions[rejected])
+                              for state, rule, rejected in data['rr_conflicts'] ]
+        self.sr_conflict = len(self.sr_conflicts)
+        self.rr_conflict = len(self.rr_conflicts)
+        return self
+
+# -----------------------------------------------------------------------------
+# class DenseLRTable
+#
+# Integer-indexed form of the LR tables that is used by the parsing runtime.
+# Terminals and nonterminals are numbered at build time and the action and
+# goto tables are stored as flat arrays, so that each step of the parse loop
+# is an index operation instead of a pair of nested dictionary lookups.
+#
+#       action[state * nterminals + terminal_id]    -> action (NOACTION if none)
+#       goto[goto_offset[prodnum] + state]          -> next state after a reduce
+#       defaulted[state]                            -> default reduction or 0
+#
+# The last terminal column is reserved for token types that don't appear in
+# the grammar.  It never has an action, so those tokens are syntax errors.
+# -----------------------------------------------------------------------------
+
+NOACTION = -2**31
+
+class DenseLRTable(object):
+    def __init__(self, lrtable, productions):
+        nstates = len(lrtable.lr_action)
+        terminals = sorted({ t for acts in lrtable.lr_action.values() for t in acts })
+        nonterminals = sorted({ n for gotos in lrtable.lr_goto.values() for n in gotos }
+                              | { p.name for p in productions })
+
+        self.nstates = nstates
+        self.terminal_ids = { t: i for i, t in enumerate(terminals) }
+        self.unknown_id = len(terminals)
+        self.nterminals = nterms = len(terminals) + 1
+        self.nonterminal_ids = { n: i for i, n in enumerate(nonterminals) }
+
+        self.action = array('i', [NOACTION]) * (nstates * nterms)
+        for st, acts in lrtable.lr_action.items():
+            base = st * nterms
+            for term, act in acts.items():
+                self.action[base + self.terminal_ids[term]] = act
+
+        self.goto = array('i', [-1]) * (nstates * len(nonterminals))
+        for st, gotos in lrtable.lr_goto.items():
+            for nonterm, target in gotos.items():
+                self.goto[self.nonterminal_ids[nonterm] * nstates + st] = target
+
+        self.goto_offset = array('i', [ self.nonterminal_ids[p.name] * nstates
+                                        for p in productions ])
+
+        self.defaulted = array('i', [0]) * nstates
+        for st, rule in lrtable.defaulted_states.items():
+            self.defaulted[st] = rule
+
+    def get_action(self, state, term):
+        '''
+        Return the action for term in the given state or None
+        '''
+        act = self.action[state * self.nterminals + self.terminal_ids.get(term, self.unknown_id)]
+        return None if act == NOACTION else act
+
+# -----------------------------------------------------------------------------
+#                           === Table Caching ===
+#
+# Building the LALR tables dominates the cost of defining a parser class.  The
+# following functions store the tables in a JSON file keyed by the grammar
+# signature so that later processes can skip the construction entirely.  Any
+# problem reading or writing the cache simply falls back to building the
+# tables, so a missing or read-only cache directory is never an error.
+#
+# write_table_module() goes one step further and freezes the tables into a
+# Python module that can be shipped with a package, so that the grammar does
+# not need to be built at all.
+# -----------------------------------------------------------------------------
+
+def read_table_cache(filename, grammar):
+    '''
+    Return an LRTable loaded from filename, or None if the file is missing,
+    unreadable, or was produced for a different grammar.
+    '''
+    try:
+        with open(filename) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get('signature') != grammar.signature():
+        return None
+    try:
+        return LRTable.from_data(grammar.Productions, data['tables'])
+    except (KeyError, IndexError, TypeError, ValueError):
+        return None
+
+def write_table_cache(filename, grammar, lrtable):
+    '''
+    Atomically write lrtable to filename.  Returns True on success.
+    '''
+    data = { 'signature': grammar.signature(), 'tables': lrtable.to_data() }
+    tmpname = f'{filename}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+        with open(tmpname, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmpname, filename)
+    except OSError:
+        try:
+            os.unlink(tmpname)
+        except OSError:
+            pass
+        return False
+    return True
+
+def write_table_module(parser, filename):
+    '''
+    Write the LR tables and production metadata of a parser class to filename
+    as an importable Python module.  Setting tablemodule on the parser to the
+    name of that module makes the class load its tables from it without
+    building the grammar.  The module is ignored once the parser
+    specification no longer matches the signature recorded in it.
+    '''
+    if vars(parser).get('_grammar') is None:
+        parser._build_tables()
+    data = parser._lrtable.to_data()
+    # State descriptions are only used for debugging output, which always
+    # builds the grammar.
+    del data['descriptions']
+    out = [
+        f'# {os.path.basename(filename)}',
+        '#',
+        f'# LR parsing tables for {parser.__module__}.{parser.__qualname__}.',
+        '# This file is automatically generated by sly.yacc.write_table_module().',
+        '# Do not edit.',
+        '',
+        f'signature = {parser._spec_signature!r}',
+        '',
+        'productions = [',
+        *(f'    ({p.name!r}, {list(p.prod)!r}, {p.prec!r}),' for p in parser._productions),
+        ']',
+        '',
+        'tables = {',
+    ]
+    for key, value in data.items():
+        if value:
+            out.append(f'    {key!r}: [')
+            out.extend(f'        {item!r},' for item in value)
+            out.append('    ],')
+        else:
+            out.append(f'    {key!r}: [],')
+    out.append('}')
+    out.append('')
+
+    tmpname = f'{filename}.{os.getpid()}.tmp'
+    with open(tmpname, 'w') as f:
+        f.write('\n'.join(out))
+    os.replace(tmpname, filename)
+
 # Collect grammar rules from a function
 def _collect_grammar_rules(func):
     grammar = []
@@ -1821,8 +2124,19 @@ class ParserMeta(type):
         return cls
 
 class Parser(metaclass=ParserMeta):
-    # Automatic tracking of position information
+    # Automatic tracking of position information. Sets lineno, index and end
+    # on nonterminal symbols, which p.lineno, p.index and p.end need. Turn it
+    # off if the grammar rules don't use positions.
     track_positions = True
+
+    # Record the position of every value produced by parse() in a per-parse
+    # table, for line_position() and index_position(). Needs track_positions.
+    position_table = True
+
+    # The PositionTable of a parse is kept on its context (see
+    # parse_context()). parse() also keeps the latest one for each thread in
+    # the parser's _latest, see the positions property.
+    _positions = None
     
     # Logging object where debugging/diagnostic messages are sent
     log = SlyLogger(sys.stderr)     
@@ -1830,6 +2144,12 @@ class Parser(metaclass=ParserMeta):
     # Debugging filename where parsetab.out data can be written
     debugfile = None
 
+    # Directory where the LR tables are cached between runs (None disables)
+    tablecache = None
+
+    # Name of a module written by write_table_module() to load tables from
+    tablemodule = None
+
     @classmethod
     def __validate_tokens(cls):
         if not hasattr(cls, 'tokens'):
@@ -1888,16 +2208,45 @@ class Parser(metaclass=ParserMeta):
         return True
 
     @classmethod
-    def __build_grammar(cls, rules):
+    def __parse_rules(cls, rules):
         '''
-        Build the grammar from the grammar rules
+        Expand the tagged grammar rule functions into a list of
+        (func, file, line, prodname, syms) productions
         '''
-        grammar_rules = []
+        parsed = []
         errors = ''
-        # Check for non-empty symbols
-        if not rules:
-            raise YaccError('No grammar rules are defined')
+        for name, func in rules:
+            try:
+                parsed.extend(_collect_grammar_rules(func))
+            except SyntaxError as e:
+                errors += f'{e}\n'
+        return parsed, errors
+
+    @classmethod
+    def __specification_signature(cls):
+        '''
+        Return a digest of the parser specification (tokens, precedence, start
+        symbol, and rules) that can be computed without building the grammar
+        '''
+        start = getattr(cls, 'start', None)
+        if callable(start):
+            start = start.__name__
+        h = hashlib.sha256()
+        h.update(f'{_TABLE_FORMAT}\n'.encode())
+        h.update(f'start {start}\n'.encode())
+        h.update(f'tokens {" ".join(sorted(cls.tokens))}\n'.encode())
+        for term, assoc, level in cls.__preclist:
+            h.update(f'prec {term} {assoc} {level}\n'.encode())
+        for pfunc, rulefile, ruleline, prodname, syms in cls._parsed_rules:
+            h.update(f'rule {prodname} : {" ".join(syms)}\n'.encode())
+        return h.hexdigest()
 
+    @classmethod
+    def __build_grammar(cls):
+        '''
+        Build the grammar from the grammar rules
+        '''
+        errors = cls._parse_errors
         grammar = Grammar(cls.tokens)
 
         # Set the precedence level for terminals
@@ -1907,15 +2256,10 @@ class Parser(metaclass=ParserMeta):
             except GrammarError as e:
                 errors += f'{e}\n'
 
-        for name, func in rules:
+        for pfunc, rulefile, ruleline, prodname, syms in cls._parsed_rules:
             try:
-                parsed_rule = _collect_grammar_rules(func)
-                for pfunc, rulefile, ruleline, prodname, syms in parsed_rule:
-                    try:
-                        grammar.add_production(prodname, syms, pfunc, rulefile, ruleline)
-                    except GrammarError as e:
-                        errors += f'{e}\n'
-            except SyntaxError as e:
+                grammar.add_production(prodname, list(syms), pfunc, rulefile, ruleline)
+            except GrammarError as e:
                 errors += f'{e}\n'
         try:
             grammar.set_start(getattr(cls, 'start', None))
@@ -1967,7 +2311,12 @@ class Parser(metaclass=ParserMeta):
         '''
         Build the LR Parsing tables from the grammar
         '''
-        lrtable = LRTable(cls._grammar)
+        cachefile = cls._tablecache_file()
+        lrtable = read_table_cache(cachefile, cls._grammar) if cachefile else None
+        if lrtable is None:
+            lrtable = LRTable(cls._grammar)
+            if cachefile:
+                write_table_cache(cachefile, cls._grammar, lrtable)
         num_sr = len(lrtable.sr_conflicts)
 
         # Report shift/reduce and reduce/reduce conflicts
@@ -1987,6 +2336,15 @@ class Parser(metaclass=ParserMeta):
         cls._lrtable = lrtable
         return True
 
+    @classmethod
+    def _tablecache_file(cls):
+        '''
+        Return the name of the file used to cache the LR tables
+        '''
+        if not cls.tablecache:
+            return None
+        return os.path.join(cls.tablecache, f'{cls.__module__}.{cls.__qualname__}.lrtab.json')
+
     @classmethod
     def __collect_rules(cls, definitions):
         '''
@@ -1996,10 +2354,96 @@ class Parser(metaclass=ParserMeta):
                   if callable(value) and hasattr(value, 'rules') ]
         return rules
 
+    @classmethod
+    def __load_table_module(cls):
+        '''
+        Load pregenerated tables from cls.tablemodule.  Returns False if there
+        is no such module or it was generated from a different specification.
+        '''
+        if not cls.tablemodule:
+            return False
+        try:
+            tabmod = importlib.import_module(cls.tablemodule)
+        except ImportError:
+            return False
+        if getattr(tabmod, 'signature', None) != cls._spec_signature:
+            return False
+
+        # Production 0 is the augmented start rule.  The remainder line up
+        # one-to-one with the parsed rules since the signatures match.
+        productions = [ Production(0, *tabmod.productions[0]) ]
+        for (pfunc, rulefile, ruleline, *_), (name, syms, prec) in zip(cls._parsed_rules,
+                                                                      tabmod.productions[1:]):
+            productions.append(Production(len(productions), name, syms, prec,
+                                          pfunc, rulefile, ruleline))
+        cls._productions = productions
+        cls._lrtable = LRTable.from_data(productions, tabmod.tables)
+        cls._dense = DenseLRTable(cls._lrtable, productions)
+        return True
+
+    @classmethod
+    def _build_tables(cls):
+        '''
+        Build the grammar and LR tables from the parser specification
+        '''
+        with _build_lock:
+            if cls._spec_signature is None:
+                cls._spec_signature = cls.__specification_signature()
+
+            # Build the underlying grammar object
+            cls.__build_grammar()
+
+            # Build the LR tables
+            if not cls.__build_lrtables():
+                raise YaccError('Can\'t build parsing tables')
+
+            cls._productions = cls._grammar.Productions
+            cls._dense = DenseLRTable(cls._lrtable, cls._productions)
+
+            if cls.debugfile:
+                cls.dump_debug(cls.debugfile)
+
+    @classmethod
+    def _load_tables(cls):
+        '''
+        Make the parsing tables available, importing them from the table
+        module if possible and building them otherwise.  This is deferred
+        until the parser is first used.
+        '''
+        with _build_lock:
+            if cls._dense is not None:
+                return
+            cls._spec_signature = cls.__specification_signature()
+
+            # Debugging output needs the full grammar, so never use the table
+            # module in that case.
+            if cls.debugfile or cls._parse_errors or not cls.__load_table_module():
+                cls._build_tables()
+
+    @classmethod
+    def dump_debug(cls, filename):
+        '''
+        Write a description of the grammar and LR states to filename.
+        Builds the grammar if the tables were loaded from a table module.
+        '''
+        if cls._grammar is None:
+            cls._build_tables()
+        with open(filename, 'w') as f:
+            f.write(str(cls._grammar))
+            f.write('\n')
+            f.write(str(cls._lrtable))
+        cls.log.info('Parser debugging for %s written to %s', cls.__qualname__, filename)
+
     # ----------------------------------------------------------------------
-    # Build the LALR(1) tables. definitions is a list of (name, item) tuples
+    # Collect the grammar rules. definitions is a list of (name, item) tuples
     # of all definitions provided in the class, listed in the order in which
     # they were defined.  This method is triggered by a metaclass.
+    #
+    # The LALR(1) tables are not built here.  They are loaded the first time
+    # the parser is used (see _load_tables()).  If the class names a
+    # tablemodule generated by write_table_module() from the same
+    # specification, the tables are imported from it and the grammar is
+    # never constructed.
     # ----------------------------------------------------------------------
     @classmethod
     def _build(cls, definitions):
@@ -2008,28 +2452,26 @@ class Parser(metaclass=ParserMeta):
 
         # Collect all of the grammar rules from the class definition
         rules = cls.__collect_rules(definitions)
+        if not rules:
+            raise YaccError('No grammar rules are defined')
 
         # Validate other parts of the grammar specification
         if not cls.__validate_specification():
             raise YaccError('Invalid parser specification')
 
-        # Build the underlying grammar object
-        cls.__build_grammar(rules)
-
-        # Build the LR tables
-        if not cls.__build_lrtables():
-            raise YaccError('Can\'t build parsing tables')
-
-        if cls.debugfile:
-            with open(cls.debugfile, 'w') as f:
-                f.write(str(cls._grammar))
-                f.write('\n')
-                f.write(str(cls._lrtable))
-            cls.log.info('Parser debugging for %s written to %s', cls.__qualname__, cls.debugfile)
+        cls._grammar = None
+        cls._lrtable = None
+        cls._dense = None
+        cls._productions = None
+        cls._spec_signature = None
+        cls._parsed_rules, cls._parse_errors = cls.__parse_rules(rules)
 
     # ----------------------------------------------------------------------
     # Parsing Support.  This is the parsing runtime that users use to
     # ----------------------------------------------------------------------
+    def __init__(self):
+        self._latest = threading.local()
+
     def error(self, token):
         '''
         Default error handling function.  This may be subclassed.
@@ -2061,38 +2503,96 @@ class Parser(metaclass=ParserMeta):
         self.statestack.append(0)
         self.state = 0
 
+    def context(self):
+        '''
+        Return a new context for one call to parse(). The context is a
+        shallow copy of the parser, and the grammar rules and error() run
+        with it as self. All per-call state (the tokens, the state and
+        symbol stacks, the current state and production, the error status)
+        is stored on the context, never on the parser. So a parser is
+        reentrant and can be shared between threads, provided its rules
+        only change state on the context. Subclasses can override this to
+        give each context its own copy of mutable state of their own.
+        '''
+        ctx = object.__new__(type(self))
+        ctx.__dict__.update(self.__dict__)
+        ctx._latest = None
+        return ctx
+
     def parse(self, tokens):
         '''
         Parse the given input tokens.
         '''
+        ctx = self.parse_context(tokens)
+        # Keep the position table for this thread only, so that
+        # line_position() and index_position() work on the result.
+        self._latest.positions = ctx.positions
+        return ctx.result
+
+    def parse_context(self, tokens):
+        '''
+        Parse the given input tokens, and return the context that parsed
+        them (see context()). Its result attribute is the value of the
+        parse, and its positions attribute is its PositionTable, if one was
+        recorded. Anything that the rules or error() stored on the context
+        is kept too. The tokens and the parser stacks are released.
+        '''
+        if self._dense is None:
+            self._load_tables()
+        ctx = self.context()
+        try:
+            ctx.result = ctx._parse(tokens)
+        finally:
+            for name in ('tokens', 'statestack', 'symstack'):
+                ctx.__dict__.pop(name, None)
+        return ctx
+
+    @property
+    def positions(self):
+        '''
+        On a context, the PositionTable of its parse. On a parser, that of
+        the latest call to parse() in this thread. None if none was
+        recorded.
+        '''
+        if self._latest is None:
+            return self._positions
+        return getattr(self._latest, 'positions', None)
+
+    def _parse(self, tokens):
         lookahead = None                                  # Current lookahead symbol
         lookaheadstack = []                               # Stack of lookahead symbols
-        actions = self._lrtable.lr_action                 # Local reference to action table (to avoid lookup on self.)
-        goto    = self._lrtable.lr_goto                   # Local reference to goto table (to avoid lookup on self.)
-        prod    = self._grammar.Productions               # Local reference to production list (to avoid lookup on self.)
-        defaulted_states = self._lrtable.defaulted_states # Local reference to defaulted states
-        pslice  = YaccProduction(None)                    # Production object passed to grammar rules
+        dense   = self._dense                             # Integer-indexed parse tables
+        actions = dense.action                            # Local reference to action table (to avoid lookup on self.)
+        goto    = dense.goto                              # Local reference to goto table (to avoid lookup on self.)
+        goto_offset = dense.goto_offset                   # Offset of each production's row in goto
+        termids = dense.terminal_ids                      # Terminal name -> column in actions
+        unknown = dense.unknown_id                        # Column for token types not in the grammar
+        nterms  = dense.nterminals                        # Number of columns in actions
+        prod    = self._productions                       # Local reference to production list (to avoid lookup on self.)
+        defaulted_states = dense.defaulted                # Local reference to defaulted states
+        spare   = []                                      # Symbols free for reuse by reductions
         errorcount = 0                                    # Used during error recovery
 
-        # Set up the state and symbol stacks
-        self.tokens = tokens
+        # Set up the state and symbol stacks. tokens may be any iterable of
+        # tokens, such as a TokenList.
+        self.tokens = tokens = iter(tokens)
         self.statestack = statestack = []                 # Stack of parsing states
         self.symstack = symstack = []                     # Stack of grammar symbols
-        pslice._stack = symstack                          # Associate the stack with the production
+        pslice  = YaccProduction(symstack)                # Production object passed to grammar rules
         self.restart()
 
-        # Set up position tracking
+        # Set up position tracking. The table is replaced on every parse,
+        # so it only ever describes the latest result.
         track_positions = self.track_positions
-        if not hasattr(self, '_line_positions'):
-            self._line_positions = { }           # id: -> lineno
-            self._index_positions = { }          # id: -> (start, end)
+        self._positions = positions = PositionTable() if track_positions and self.position_table else None
 
         errtoken   = None                                 # Err token
         while True:
             # Get the next symbol on the input.  If a lookahead symbol
             # is already set, we just use that. Otherwise, we'll pull
             # the next token off of the lookaheadstack or from the lexer
-            if self.state not in defaulted_states:
+            t = defaulted_states[self.state]
+            if not t:
                 if not lookahead:
                     if not lookaheadstack:
                         lookahead = next(tokens, None)  # Get the next token
@@ -2104,11 +2604,9 @@ class Parser(metaclass=ParserMeta):
                     
                 # Check the action table
                 ltype = lookahead.type
-                t = actions[self.state].get(ltype)
-            else:
-                t = defaulted_states[self.state]
+                t = actions[self.state * nterms + termids.get(ltype, unknown)]
 
-            if t is not None:
+            if t != NOACTION:
                 if t > 0:
                     # shift a symbol on the stack
                     statestack.append(t)
@@ -2127,39 +2625,52 @@ class Parser(metaclass=ParserMeta):
                     self.production = p = prod[-t]
                     pname = p.name
                     plen  = p.len
-                    pslice._namemap = p.namemap
+                    base  = len(symstack) - plen
 
                     # Call the production function
-                    pslice._slice = symstack[-plen:] if plen else []
-
-                    sym = YaccSymbol()
-                    sym.type = pname       
+                    pslice.__class__ = p.accessors
+                    pslice._base = base
+                    pslice._len = plen
                     value = p.func(self, pslice)
                     if value is pslice:
                         value = (pname, *(s.value for s in pslice._slice))
 
-                    sym.value = value
-                        
-                    # Record positions
-                    if track_positions:
-                        if plen:
-                            sym.lineno = symstack[-plen].lineno
-                            sym.index = symstack[-plen].index
+                    # Reuse the symbol in the first slot of the production
+                    # if it's a nonterminal, which already has the right
+                    # starting position. Otherwise take a spare one.
+                    if plen:
+                        sym = symstack[base]
+                        if sym.__class__ is not YaccSymbol:
+                            first = sym
+                            sym = spare.pop() if spare else YaccSymbol()
+                            if track_positions:
+                                sym.lineno = first.lineno
+                                sym.index = first.index
+                        if track_positions:
                             sym.end = symstack[-1].end
-                        else:
+                        if plen > 1:
+                            last = symstack[-1]
+                            if last.__class__ is YaccSymbol:
+                                spare.append(last)
+                        del symstack[base:]
+                        del statestack[base:]
+                    else:
+                        sym = spare.pop() if spare else YaccSymbol()
+                        if track_positions:
                             # A zero-length production  (what to put here?)
                             sym.lineno = None
                             sym.index = None
                             sym.end = None
-                        self._line_positions[id(value)] = sym.lineno
-                        self._index_positions[id(value)] = (sym.index, sym.end)
-                            
-                    if plen:
-                        del symstack[-plen:]
-                        del statestack[-plen:]
+
+                    sym.type = pname
+                    sym.value = value
+
+                    # Record positions
+                    if positions is not None:
+                        positions.record(value, sym.lineno, sym.index, sym.end)
 
                     symstack.append(sym)
-                    self.state = goto[statestack[-1]][pname]
+                    self.state = goto[goto_offset[-t] + statestack[-1]]
                     statestack.append(self.state)
                     continue
 
@@ -2168,7 +2679,7 @@ class Parser(metaclass=ParserMeta):
                     result = getattr(n, 'value', None)
                     return result
 
-            if t is None:
+            if t == NOACTION:
                 # We have some kind of parsing error here.  To handle
                 # this, we are going to push the current token onto
                 # the tokenstack and replace it with an 'error' token.
@@ -2252,10 +2763,15 @@ class Parser(metaclass=ParserMeta):
             # Call an error function here
             raise RuntimeError('sly: internal parser error!!!\n')
 
-    # Return position tracking information
+    # Return position tracking information for a value produced by the
+    # latest parse. Raises KeyError if it wasn't recorded.
     def line_position(self, value):
-        return self._line_positions[id(value)]
+        if self.positions is None:
+            raise KeyError(value)
+        return self.positions.line_position(value)
 
     def index_position(self, value):
-        return self._index_positions[id(value)]
+        if self.positions is None:
+            raise KeyError(value)
+        return self.positions.index_position(value)
     
@@ -0,0 +1,292 @@
+"""Syntax trees for Luca programs.
+
+LucaAstParser accepts the same grammar as LucaParser, but instead of
+evaluating each production as it is reduced it builds a tree of Node objects.
+The tree can be evaluated any number of times (see evaluator.py) without
+lexing or parsing the program again.
+"""
+
+import itertools
+
+from . import sly
+from .sly.ast import AST
+from .luca import NULL, LucaLexer, LucaParser, LucaValue, syntax_error
+
+
+class Node(AST):
+    __slots__ = ()
+
+
+class Block(Node):
+    """A sequence of statements. Evaluates to the value of the last one."""
+
+    __slots__ = ("statements",)
+    statements: tuple
+
+
+class Scope(Node):
+    """A braced block. Runs in a new scope and evaluates to that scope."""
+
+    __slots__ = ("statements",)
+    statements: tuple
+
+
+class Print(Node):
+    __slots__ = ("expr",)
+    expr: Node
+
+
+class Constant(Node):
+    __slots__ = ("value",)
+    value: LucaValue
+
+
+class BinOp(Node):
+    __slots__ = ("op", "left", "right")
+    op: str
+    left: Node
+    right: Node
+
+    def __reduce__(self):
+        # pickle would recurse once per operator of a chain.
+        first, chain = binop_chain(self)
+        return _unchain, (first, tuple((b.op, b.right, b.span) for b in chain))
+
+
+def binop_chain(node: BinOp) -> tuple:
+    """Split a chain of left-associative operators, like 1 + 2 * 3 - 4, into
+    its first operand and its BinOps from the innermost out. The right
+    operand of each BinOp is the next operand.
+
+    LucaAstParser builds chains without recursing, however long they are, so
+    passes over the tree fold over the chain in a loop rather than recursing
+    on the left operand.
+    """
+    chain = []
+    while type(node) is BinOp:
+        chain.append(node)
+        node = node.left
+    chain.reverse()
+    return node, chain
+
+
+def _unchain(first: Node, chain: tuple) -> BinOp:
+    node = first
+    for op, right, span in chain:
+        node = BinOp(op, node, right, span=span)
+    return node
+
+
+class UnaryOp(Node):
+    __slots__ = ("op", "operand")
+    op: str
+    operand: Node
+
+
+class Name(Node):
+    __slots__ = ("name",)
+    name: str
+
+
+class Attribute(Node):
+    """A `.` reference. Looks up name in the object that obj evaluates to."""
+
+    __slots__ = ("obj", "name")
+    obj: Node
+    name: str
+
+
+class Assign(Node):
+    """Assignment to a Name or Attribute target."""
+
+    __slots__ = ("target", "value")
+    target: Node
+    value: Node
+
+
+def _span(p) -> tuple:
+    return (p.index, p.end)
+
+
+class LucaAstParser(sly.Parser):
+    """Parses Luca programs into a Block without evaluating them.
+
+    The rules mirror LucaParser one for one so that both parsers share the
+    same LR tables.
+    """
+
+    tablemodule = LucaParser.tablemodule
+    tablecache = LucaParser.tablecache
+    # Nodes carry their own spans, so there's no need for a position table.
+    track_positions = True
+    position_table = False
+
+    def context(self):
+        ctx = super().context()
+        ctx.errors = []
+        return ctx
+
+    def error(self, token):
+        # See LucaParser.error.
+        super().error(token)
+        self.errors.append(token)
+
+    # The passes over the tree recurse once per level of nesting, and each
+    # level leaves at least one symbol on the parser's stack until it's
+    # reduced. Chains of binary operators are reduced as they are parsed, so
+    # their length isn't limited.
+    max_depth = 200
+
+    def check_depth(self, p):
+        if len(self.symstack) > self.max_depth:
+            raise SyntaxError(
+                f"Syntax error at index {p.index}: nesting exceeds the limit of "
+                f"{self.max_depth} parser stack entries."
+            )
+
+    def parse_context(self, tokens):
+        ctx = super().parse_context(tokens)
+        statements = ctx.result
+        if statements is not None:
+            span = (statements[0].span[0], statements[-1].span[1])
+            ctx.result = Block(tuple(statements), span=span)
+        return ctx
+
+    tokens = LucaLexer.tokens
+
+    precedence = LucaParser.precedence
+
+    @_("stmt", "block stmt")
+    def block(self, p):
+        if len(p) == 1:
+            return [p.stmt]
+        p.block.append(p.stmt)
+        return p.block
+
+    # Omit extra newlines.
+    @_("NEWLINE block", "block NEWLINE")
+    def block(self, p):
+        return p.block
+
+    @_('PRINT "(" expr ")"')
+    def stmt(self, p):
+        return Print(p.expr, span=_span(p))
+
+    @_("expr")
+    def stmt(self, p):
+        return p.expr
+
+    @_('expr "+" expr')
+    def expr(self, p):
+        return BinOp("+", p.expr0, p.expr1, span=_span(p))
+
+    @_('expr "-" expr')
+    def expr(self, p):
+        return BinOp("-", p.expr0, p.expr1, span=_span(p))
+
+    @_('expr "*" expr')
+    def expr(self, p):
+        return BinOp("*", p.expr0, p.expr1, span=_span(p))
+
+    @_('expr "/" expr')
+    def expr(self, p):
+        return BinOp("/", p.expr0, p.expr1, span=_span(p))
+
+    @_('expr "%" expr')
+    def expr(self, p):
+        return BinOp("%", p.expr0, p.expr1, span=_span(p))
+
+    # Note that this formulation of - has the precendence of "NEGATE."
+    @_('"-" expr %prec NEGATE')
+    def expr(self, p):
+        self.check_depth(p)
+        return UnaryOp("-", p.expr, span=_span(p))
+
+    @_('"(" expr ")"')
+    def expr(self, p):
+        self.check_depth(p)
+        return p.expr
+
+    @_("expr AND expr")
+    def expr(self, p):
+        return BinOp("and", p.expr0, p.expr1, span=_span(p))
+
+    @_("expr OR expr")
+    def expr(self, p):
+        return BinOp("or", p.expr0, p.expr1, span=_span(p))
+
+    @_("expr EQ expr")
+    def expr(self, p):
+        return BinOp("==", p.expr0, p.expr1, span=_span(p))
+
+    @_("NOT expr")
+    def expr(self, p):
+        self.check_depth(p)
+        return UnaryOp("not", p.expr, span=_span(p))
+
+    @_("NUMBER")
+    def expr(self, p):
+        return Constant(p.NUMBER, span=_span(p))
+
+    @_("STRING")
+    def expr(self, p):
+        return Constant(p.STRING, span=_span(p))
+
+    @_("BOOLEAN")
+    def expr(self, p):
+        return Constant(p.BOOLEAN, span=_span(p))
+
+    @_("NULL")
+    def expr(self, p):
+        return Constant(NULL, span=_span(p))
+
+    @_('"{" new_scope block "}"', '"{" new_scope "}"')
+    def expr(self, p):
+        self.check_depth(p)
+        statements = tuple(p.block) if len(p) == 4 else ()
+        return Scope(statements, span=_span(p))
+
+    # Kept so that the grammar matches LucaParser. Scopes are created when
+    # the tree is evaluated.
+    @_("")
+    def new_scope(self, p):
+        pass
+
+    @_('ref "." NAME')
+    def ref(self, p):
+        return Attribute(p.ref, p.NAME, span=_span(p))
+
+    @_("NAME")
+    def ref(self, p):
+        return Name(p.NAME, span=_span(p))
+
+    @_("ref")
+    def expr(self, p):
+        return p.ref
+
+    @_("ref ASSIGN expr")
+    def expr(self, p):
+        self.check_depth(p)
+        return Assign(p.ref, p.expr, span=_span(p))
+
+
+def parse_program(tokens) -> Block | None:
+    """Parse a whole program, returning None if it has no tokens.
+
+    Raises SyntaxError if the program has a syntax error anywhere. The
+    parser recovers from errors by discarding statements, so its tree is
+    never returned then.
+    """
+    tokens = iter(tokens)
+    first = next(tokens, None)
+    if first is None:
+        return None
+    ctx = LucaAstParser().parse_context(itertools.chain([first], tokens))
+    if ctx.errors:
+        raise syntax_error(ctx.errors)
+    return ctx.result
+
+
+def parse_source(source: str) -> Block | None:
+    """Tokenize and parse source with parse_program."""
+    return parse_program(LucaLexer().tokenize(source))
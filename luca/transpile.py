@@ -0,0 +1,263 @@
+"""Transpile Luca to Python code objects.
+
+A syntax tree is lowered to a Python ast.Module and compiled with compile(),
+so CPython's own interpreter runs the program. Values are still LucaValues and
+operators still go through their methods, which keeps Luca's semantics: type
+errors from luca.BINARY_OPS, ValueError on division by zero, string
+concatenation with str(other), and braced blocks evaluating to LucaObjects.
+
+The generated module creates its constants once, defines one function per
+braced block, and defines program(scope), which runs the top level block in
+scope and returns its value. For example, `a = { b = 1 }` becomes:
+
+    _c0 = LucaNumber(1)
+
+    def _scope0(parent):
+        scope = LucaObject(parent)
+        _store(scope, 'b', _c0)
+        return scope
+
+    def program(scope):
+        return _store(scope, 'a', _scope0(scope))
+"""
+
+import ast
+import functools
+import types
+from typing import Callable
+
+from . import syntax
+from .luca import (
+    FALSE,
+    NULL,
+    TRUE,
+    LucaBool,
+    LucaNumber,
+    LucaObject,
+    LucaString,
+    LucaValue,
+)
+
+FILENAME = "<luca>"
+
+_BINARY_OPERATORS = {
+    "+": ast.Add,
+    "-": ast.Sub,
+    "*": ast.Mult,
+    "/": ast.Div,
+    "%": ast.Mod,
+}
+
+_LOGIC_METHODS = {
+    "and": "logic_and",
+    "or": "logic_or",
+    "==": "logic_eq",
+}
+
+# Python's compiler recurses once per operator, so longer chains of binary
+# operators are lowered to a flat list instead of nested BinOps.
+_MAX_NESTED_CHAIN = 100
+
+
+def _store(obj: LucaObject, name: str, value: LucaValue) -> LucaValue:
+    obj.set(name, value)
+    return value
+
+
+def _print(value: LucaValue) -> LucaValue:
+    print(str(value))
+    return NULL
+
+
+# Names available to generated code.
+_NAMESPACE = {
+    "NULL": NULL,
+    "TRUE": TRUE,
+    "FALSE": FALSE,
+    "LucaBool": LucaBool,
+    "LucaNumber": LucaNumber,
+    "LucaObject": LucaObject,
+    "LucaString": LucaString,
+    "_store": _store,
+    "_print": _print,
+}
+
+
+def _name(id: str) -> ast.Name:
+    return ast.Name(id=id, ctx=ast.Load())
+
+
+def _call(func: ast.expr, *args: ast.expr) -> ast.Call:
+    return ast.Call(func=func, args=list(args), keywords=[])
+
+
+def _method(obj: ast.expr, method: str, *args: ast.expr) -> ast.Call:
+    return _call(ast.Attribute(value=obj, attr=method, ctx=ast.Load()), *args)
+
+
+def _binary(op: str, left: ast.expr, right: ast.expr) -> ast.expr:
+    if op in _LOGIC_METHODS:
+        return _method(left, _LOGIC_METHODS[op], right)
+    return ast.BinOp(left=left, op=_BINARY_OPERATORS[op](), right=right)
+
+
+def _function(name: str, arg: str, body: list) -> ast.FunctionDef:
+    return ast.FunctionDef(
+        name=name,
+        args=ast.arguments(
+            posonlyargs=[],
+            args=[ast.arg(arg=arg)],
+            kwonlyargs=[],
+            kw_defaults=[],
+            defaults=[],
+        ),
+        body=body,
+        decorator_list=[],
+    )
+
+
+class Transpiler:
+    """Lowers a syntax tree to a Python ast.Module."""
+
+    def __init__(self):
+        self.constants = []
+        # Constant names by id(value). The lexer interns literals, so each
+        # distinct literal is created once.
+        self._constant_names = {}
+        self.functions = []
+        self._chain_depth = 0
+        self._dispatch = {
+            syntax.Scope: self._scope,
+            syntax.Print: self._print,
+            syntax.Constant: self._constant,
+            syntax.BinOp: self._binop,
+            syntax.UnaryOp: self._unaryop,
+            syntax.Name: self._name,
+            syntax.Attribute: self._attribute,
+            syntax.Assign: self._assign,
+        }
+
+    def transpile(self, tree: syntax.Block) -> ast.Module:
+        *init, last = [self.expr(stmt) for stmt in tree.statements]
+        body = [ast.Expr(value=value) for value in init]
+        body.append(ast.Return(value=last))
+        program = _function("program", "scope", body)
+        module = ast.Module(
+            body=[*self.constants, *self.functions, program], type_ignores=[]
+        )
+        return ast.fix_missing_locations(module)
+
+    def expr(self, node: syntax.Node) -> ast.expr:
+        return self._dispatch[type(node)](node)
+
+    def _scope(self, node: syntax.Scope) -> ast.expr:
+        index = len(self.functions)
+        name = f"_scope{index}"
+        # Reserve the slot so that nested scopes get their own names.
+        self.functions.append(None)
+        body = [
+            ast.Assign(
+                targets=[ast.Name(id="scope", ctx=ast.Store())],
+                value=_call(_name("LucaObject"), _name("parent")),
+            ),
+            *(ast.Expr(value=self.expr(stmt)) for stmt in node.statements),
+            ast.Return(value=_name("scope")),
+        ]
+        self.functions[index] = _function(name, "parent", body)
+        return _call(_name(name), _name("scope"))
+
+    def _print(self, node: syntax.Print) -> ast.expr:
+        return _call(_name("_print"), self.expr(node.expr))
+
+    def _constant(self, node: syntax.Constant) -> ast.expr:
+        value = node.value
+        if value is NULL or value is TRUE or value is FALSE:
+            return _name(str(value).upper())
+        name = self._constant_names.get(id(value))
+        if name is not None:
+            return _name(name)
+        init = _call(_name(type(value).__name__), ast.Constant(value.raw_value))
+        name = self._constant_names[id(value)] = f"_c{len(self.constants)}"
+        self.constants.append(
+            ast.Assign(targets=[ast.Name(id=name, ctx=ast.Store())], value=init)
+        )
+        return _name(name)
+
+    def _binop(self, node: syntax.BinOp) -> ast.expr:
+        first, chain = syntax.binop_chain(node)
+        if len(chain) <= _MAX_NESTED_CHAIN:
+            result = self.expr(first)
+            for binop in chain:
+                result = _binary(binop.op, result, self.expr(binop.right))
+            return result
+        # [_v0 := a, _v0 := _v0 + b, ...][-1] evaluates the operands and
+        # applies the operators in the same order without nesting them.
+        # Chains inside the operands use the next name.
+        name = f"_v{self._chain_depth}"
+        self._chain_depth += 1
+        values = [self.expr(first)]
+        for binop in chain:
+            values.append(_binary(binop.op, _name(name), self.expr(binop.right)))
+        self._chain_depth -= 1
+        steps = [
+            ast.NamedExpr(target=ast.Name(id=name, ctx=ast.Store()), value=value)
+            for value in values
+        ]
+        return ast.Subscript(
+            value=ast.List(elts=steps, ctx=ast.Load()),
+            slice=ast.Constant(-1),
+            ctx=ast.Load(),
+        )
+
+    def _unaryop(self, node: syntax.UnaryOp) -> ast.expr:
+        operand = self.expr(node.operand)
+        if node.op == "not":
+            return _method(operand, "logic_not")
+        return ast.UnaryOp(op=ast.USub(), operand=operand)
+
+    def _name(self, node: syntax.Name) -> ast.expr:
+        return _method(_name("scope"), "get", ast.Constant(node.name))
+
+    def _attribute(self, node: syntax.Attribute) -> ast.expr:
+        # Assumes that obj evaluates to an object.
+        return _method(self.expr(node.obj), "get", ast.Constant(node.name))
+
+    def _assign(self, node: syntax.Assign) -> ast.expr:
+        target = node.target
+        if isinstance(target, syntax.Attribute):
+            obj = self.expr(target.obj)
+        else:
+            obj = _name("scope")
+        # Arguments are evaluated left to right, so the target object is
+        # resolved before the value, as in LucaParser.
+        return _call(
+            _name("_store"), obj, ast.Constant(target.name), self.expr(node.value)
+        )
+
+
+def transpile(tree: syntax.Block) -> ast.Module:
+    return Transpiler().transpile(tree)
+
+
+def compile_tree(tree: syntax.Block) -> types.CodeType:
+    return compile(transpile(tree), FILENAME, "exec")
+
+
+def load(code: types.CodeType) -> Callable[[LucaObject], LucaValue]:
+    """Run a compiled module and return its program(scope) function."""
+    namespace = dict(_NAMESPACE)
+    exec(code, namespace)
+    return namespace["program"]
+
+
+@functools.lru_cache(maxsize=256)
+def compile_source(source: str) -> types.CodeType | None:
+    """Compile a program, returning None if it is empty.
+    Raises SyntaxError if it can't be parsed.
+
+    Code objects are cached by source text.
+    """
+    tree = syntax.parse_source(source)
+    if tree is None:
+        return None
+    return compile_tree(tree)
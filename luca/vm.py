@@ -0,0 +1,266 @@
+"""Bytecode compiler and stack-based virtual machine for Luca.
+
+A program is compiled from its syntax tree to a Code object: a flat list of
+(opcode, argument) integer pairs, a constant pool, and a table of names. The
+VirtualMachine runs Code objects with a value stack and a stack of scopes,
+giving the same results as LucaParser.
+"""
+
+from . import syntax
+from .luca import BINARY_OPS, NULL, UNARY_OPS, LucaObject, LucaValue
+
+# Opcodes. Every instruction takes one integer argument, which is ignored by
+# the opcodes that don't need it.
+LOAD_CONST = 0  # push consts[arg]
+LOAD_NAME = 1  # push the value of names[arg] in the current scope
+LOAD_ATTR = 2  # replace the object on top of the stack with obj.get(names[arg])
+STORE_NAME = 3  # set names[arg] in the current scope to the top of the stack
+STORE_ATTR = 4  # pop value and obj, set names[arg] on obj, push value
+POP_TOP = 5  # discard the top of the stack
+# Binary and unary operators, numbered consecutively. Each pops its operands
+# and pushes the result.
+BINARY_ADD = 6
+BINARY_SUB = 7
+BINARY_MUL = 8
+BINARY_DIV = 9
+BINARY_MOD = 10
+BINARY_AND = 11
+BINARY_OR = 12
+BINARY_EQ = 13
+UNARY_NEG = 14
+UNARY_NOT = 15
+PRINT = 16  # pop and print a value, push null
+PUSH_SCOPE = 17  # enter a new scope nested in the current one
+POP_SCOPE = 18  # leave the current scope and push it as an object
+RETURN_VALUE = 19  # stop, returning the top of the stack
+
+OPNAMES = {
+    value: name
+    for name, value in list(globals().items())
+    if name.isupper() and isinstance(value, int)
+}
+
+_BINARY_OPCODES = {
+    "+": BINARY_ADD,
+    "-": BINARY_SUB,
+    "*": BINARY_MUL,
+    "/": BINARY_DIV,
+    "%": BINARY_MOD,
+    "and": BINARY_AND,
+    "or": BINARY_OR,
+    "==": BINARY_EQ,
+}
+
+_UNARY_OPCODES = {
+    "-": UNARY_NEG,
+    "not": UNARY_NOT,
+}
+
+# The operators of the opcodes from BINARY_ADD and UNARY_NEG, by offset
+_BINARY_NAMES = tuple(sorted(_BINARY_OPCODES, key=_BINARY_OPCODES.get))
+_UNARY_NAMES = tuple(sorted(_UNARY_OPCODES, key=_UNARY_OPCODES.get))
+
+
+class Code:
+    """A compiled Luca program."""
+
+    __slots__ = ("code", "consts", "names")
+
+    def __init__(self, code: list[int], consts: tuple, names: tuple):
+        self.code = code
+        self.consts = consts
+        self.names = names
+
+    def disassemble(self) -> str:
+        lines = []
+        for pc in range(0, len(self.code), 2):
+            op, arg = self.code[pc], self.code[pc + 1]
+            line = f"{pc:>6} {OPNAMES[op]:<14} {arg}"
+            if op == LOAD_CONST:
+                line += f" ({self.consts[arg]})"
+            elif op in (LOAD_NAME, LOAD_ATTR, STORE_NAME, STORE_ATTR):
+                line += f" ({self.names[arg]})"
+            lines.append(line)
+        return "\n".join(lines)
+
+
+class Compiler:
+    """Compiles a syntax tree to a Code object."""
+
+    def __init__(self):
+        self.code = []
+        self.consts = []
+        self.names = []
+        self._const_index = {}
+        self._name_index = {}
+        self._dispatch = {
+            syntax.Block: self._block,
+            syntax.Scope: self._scope,
+            syntax.Print: self._print,
+            syntax.Constant: self._constant,
+            syntax.BinOp: self._binop,
+            syntax.UnaryOp: self._unaryop,
+            syntax.Name: self._name,
+            syntax.Attribute: self._attribute,
+            syntax.Assign: self._assign,
+        }
+
+    def compile(self, tree: syntax.Block) -> Code:
+        self.visit(tree)
+        self.emit(RETURN_VALUE)
+        return Code(self.code, tuple(self.consts), tuple(self.names))
+
+    def emit(self, op: int, arg: int = 0):
+        self.code.append(op)
+        self.code.append(arg)
+
+    def const(self, value: LucaValue) -> int:
+        # Values are keyed by identity, since LucaValue equality doesn't
+        # distinguish e.g. 1 from 1.0.
+        key = id(value)
+        if key not in self._const_index:
+            self._const_index[key] = len(self.consts)
+            self.consts.append(value)
+        return self._const_index[key]
+
+    def name(self, name: str) -> int:
+        if name not in self._name_index:
+            self._name_index[name] = len(self.names)
+            self.names.append(name)
+        return self._name_index[name]
+
+    def visit(self, node: syntax.Node):
+        self._dispatch[type(node)](node)
+
+    def _statements(self, statements: tuple):
+        for n, stmt in enumerate(statements):
+            if n:
+                self.emit(POP_TOP)
+            self.visit(stmt)
+
+    def _block(self, node: syntax.Block):
+        self._statements(node.statements)
+
+    def _scope(self, node: syntax.Scope):
+        self.emit(PUSH_SCOPE)
+        if node.statements:
+            self._statements(node.statements)
+            self.emit(POP_TOP)
+        self.emit(POP_SCOPE)
+
+    def _print(self, node: syntax.Print):
+        self.visit(node.expr)
+        self.emit(PRINT)
+
+    def _constant(self, node: syntax.Constant):
+        self.emit(LOAD_CONST, self.const(node.value))
+
+    def _binop(self, node: syntax.BinOp):
+        first, chain = syntax.binop_chain(node)
+        self.visit(first)
+        for binop in chain:
+            self.visit(binop.right)
+            self.emit(_BINARY_OPCODES[binop.op])
+
+    def _unaryop(self, node: syntax.UnaryOp):
+        self.visit(node.operand)
+        self.emit(_UNARY_OPCODES[node.op])
+
+    def _name(self, node: syntax.Name):
+        self.emit(LOAD_NAME, self.name(node.name))
+
+    def _attribute(self, node: syntax.Attribute):
+        self.visit(node.obj)
+        self.emit(LOAD_ATTR, self.name(node.name))
+
+    def _assign(self, node: syntax.Assign):
+        target = node.target
+        if isinstance(target, syntax.Attribute):
+            # The target object is resolved before the value, as in LucaParser.
+            self.visit(target.obj)
+            self.visit(node.value)
+            self.emit(STORE_ATTR, self.name(target.name))
+        else:
+            self.visit(node.value)
+            self.emit(STORE_NAME, self.name(target.name))
+
+
+def compile_tree(tree: syntax.Block) -> Code:
+    return Compiler().compile(tree)
+
+
+def compile_source(source: str) -> Code | None:
+    """Compile a program, returning None if it is empty.
+    Raises SyntaxError if it can't be parsed."""
+    tree = syntax.parse_source(source)
+    if tree is None:
+        return None
+    return compile_tree(tree)
+
+
+class VirtualMachine:
+    """Runs Code objects against a scope that persists between runs."""
+
+    def __init__(self, scope: LucaObject | None = None):
+        self.scope_stack = [LucaObject() if scope is None else scope]
+
+    def get(self, name: str) -> LucaValue:
+        return self.scope_stack[-1].get(name)
+
+    def run(self, code: Code) -> LucaValue:
+        instructions = code.code
+        consts = code.consts
+        names = code.names
+        scopes = self.scope_stack
+        base = len(scopes)
+        scope = scopes[-1]
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        pc = 0
+        try:
+            while True:
+                op = instructions[pc]
+                arg = instructions[pc + 1]
+                pc += 2
+                if op == LOAD_CONST:
+                    push(consts[arg])
+                elif op == LOAD_NAME:
+                    push(scope.get(names[arg]))
+                elif op == POP_TOP:
+                    pop()
+                elif op == STORE_NAME:
+                    scope.set(names[arg], stack[-1])
+                elif op == LOAD_ATTR:
+                    stack[-1] = stack[-1].get(names[arg])
+                elif BINARY_ADD <= op <= BINARY_EQ:
+                    right = pop()
+                    left = stack[-1]
+                    name = _BINARY_NAMES[op - BINARY_ADD]
+                    stack[-1] = BINARY_OPS[name, left.__class__, right.__class__](
+                        left, right
+                    )
+                elif UNARY_NEG <= op <= UNARY_NOT:
+                    operand = stack[-1]
+                    name = _UNARY_NAMES[op - UNARY_NEG]
+                    stack[-1] = UNARY_OPS[name, operand.__class__](operand)
+                elif op == PUSH_SCOPE:
+                    scope = LucaObject(scope)
+                    scopes.append(scope)
+                elif op == POP_SCOPE:
+                    push(scopes.pop())
+                    scope = scopes[-1]
+                elif op == STORE_ATTR:
+                    value = pop()
+                    stack[-1].set(names[arg], value)
+                    stack[-1] = value
+                elif op == PRINT:
+                    print(str(stack[-1]))
+                    stack[-1] = NULL
+                elif op == RETURN_VALUE:
+                    return pop()
+                else:
+                    raise RuntimeError(f"Unknown opcode {op}")
+        finally:
+            # Leave the scope stack as it was if the program failed.
+            del scopes[base:]
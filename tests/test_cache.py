@@ -0,0 +1,69 @@
+import pytest
+from luca import cache, luca
+
+
+def test_cache_hits_and_misses():
+    programs = cache.ProgramCache()
+    program = programs.compile("a = 1 + 2")
+    assert programs.compile("a = 1 + 2") is program
+    assert programs.compile("a = 1 + 3") is not program
+    info = programs.cache_info()
+    assert (info.hits, info.misses, info.evictions, info.entries) == (1, 2, 0, 2)
+
+
+def test_cache_evicts_least_recently_used():
+    programs = cache.ProgramCache(max_entries=2)
+    first = programs.compile("1")
+    programs.compile("2")
+    programs.compile("1")
+    programs.compile("3")
+    assert programs.cache_info().evictions == 1
+    assert programs.compile("1") is first
+    assert programs.cache_info().misses == 3
+    programs.compile("2")
+    assert programs.cache_info().misses == 4
+
+
+def test_cache_byte_budget():
+    size = cache.estimate_size(cache.Program.from_source("1"))
+    programs = cache.ProgramCache(max_bytes=2 * size)
+    for source in "123":
+        programs.compile(source)
+    info = programs.cache_info()
+    assert info.entries == 2 and info.bytes == 2 * size and info.evictions == 1
+    programs.configure(max_bytes=size)
+    assert len(programs) == 1
+    # Programs larger than the whole budget aren't kept.
+    programs.compile("1 + 2 + 3")
+    assert programs.cache_info().entries == 1
+
+
+def test_cache_does_not_keep_syntax_errors():
+    programs = cache.ProgramCache()
+    for _ in range(2):
+        with pytest.raises(SyntaxError):
+            programs.compile("a = ")
+        with pytest.raises(SyntaxError):
+            programs.compile("a = = 1\nb = 2")
+    info = programs.cache_info()
+    assert (info.misses, info.entries) == (4, 0)
+
+
+def test_clear():
+    programs = cache.ProgramCache()
+    programs.compile("1")
+    programs.compile("1")
+    programs.clear()
+    assert programs.cache_info()[:5] == (0, 0, 0, 0, 0)
+
+
+def test_luca_reuses_compiled_programs(monkeypatch):
+    interpreter = luca.Luca()
+    interpreter("a = 1\nb = a + 1")
+
+    def fail(*args):
+        raise AssertionError("tokenized a cached program")
+
+    monkeypatch.setattr(luca.LucaLexer, "tokenize", fail)
+    interpreter("a = 1\nb = a + 1")
+    assert interpreter.scope.get("b") == luca.LucaNumber(2)
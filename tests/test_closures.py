@@ -0,0 +1,21 @@
+import io
+
+from luca import closures, luca
+
+
+def test_closures_store_block_names_in_slots():
+    program = closures.compile_source("a = { b = 1\nc = b + 1\nb = 3 }")
+    scope = luca.LucaObject()
+    program(scope)
+    a = scope.get("a")
+    assert a.layout == {"b": 0, "c": 1}
+    assert a.slots == [luca.LucaNumber(3), luca.LucaNumber(2)]
+    assert a.names == {}
+
+
+def test_main_closure_engine(monkeypatch, capsys):
+    import luca as package
+
+    monkeypatch.setattr("sys.stdin", io.StringIO("a = {b = 2}\nprint(a.b * 3)\n"))
+    package.main(["--engine=closure"])
+    assert capsys.readouterr().out == "6\n"
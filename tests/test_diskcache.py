@@ -0,0 +1,127 @@
+import os
+import pickle
+
+import pytest
+from luca import diskcache, luca
+
+
+@pytest.fixture
+def script(tmp_path):
+    path = tmp_path / "script.luca"
+    path.write_text("a = { b = 2 }\na.b * 3")
+    return path
+
+
+def forbid_parsing(monkeypatch):
+    def fail(*args):
+        raise AssertionError("parsed a cached script")
+
+    monkeypatch.setattr(luca.LucaLexer, "tokenize", fail)
+
+
+def test_cache_path(tmp_path):
+    path = str(tmp_path / "x.luca")
+    assert diskcache.cache_path(path) == str(tmp_path / "__lucacache__" / "x.luca.lc")
+    prefixed = diskcache.cache_path(path, cache_dir="/cache")
+    assert prefixed == "/cache" + path + ".lc"
+
+
+@pytest.mark.parametrize("check", ["mtime", "hash"])
+def test_load_uses_cache(script, monkeypatch, check):
+    program = diskcache.load(str(script), check=check)
+    assert program.run() == luca.LucaNumber(6)
+    assert os.path.exists(diskcache.cache_path(str(script)))
+
+    forbid_parsing(monkeypatch)
+    cached = diskcache.load(str(script), check=check)
+    assert cached == program
+    assert cached.run() == luca.LucaNumber(6)
+
+
+@pytest.mark.parametrize("check", ["mtime", "hash"])
+def test_load_rebuilds_changed_scripts(script, check):
+    diskcache.load(str(script), check=check)
+    script.write_text("a = { b = 2 }\na.b * 4")
+    # Make sure the change is seen even if the mtime didn't move.
+    stat = script.stat()
+    os.utime(script, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert diskcache.load(str(script), check=check).run() == luca.LucaNumber(8)
+
+
+def test_compile_file_does_not_cache_syntax_errors(script):
+    script.write_text("a = = 1\nb = 2")
+    with pytest.raises(SyntaxError):
+        luca.Luca.compile_file(str(script))
+    assert not os.path.exists(diskcache.cache_path(str(script)))
+
+
+def test_load_ignores_bad_cache_files(script, tmp_path):
+    filename = diskcache.cache_path(str(script), cache_dir=str(tmp_path / "c"))
+    os.makedirs(os.path.dirname(filename))
+    for contents in [b"", b"LUCA", b"garbage" * 10]:
+        with open(filename, "wb") as f:
+            f.write(contents)
+        program = diskcache.load(str(script), cache_dir=str(tmp_path / "c"))
+        assert program.run() == luca.LucaNumber(6)
+
+
+def test_compile_file_deep_tree(script, monkeypatch):
+    from test_syntax import DEEP_PROGRAM, DEEP_RESULT
+
+    script.write_text(DEEP_PROGRAM)
+    assert luca.Luca.compile_file(str(script)).run() == DEEP_RESULT
+    forbid_parsing(monkeypatch)
+    assert luca.Luca.compile_file(str(script)).run() == DEEP_RESULT
+
+
+def test_load_runs_trees_too_deep_to_cache(script, monkeypatch):
+    def dump(*args, **kwargs):
+        raise RecursionError("maximum recursion depth exceeded while pickling")
+
+    monkeypatch.setattr(diskcache.pickle, "dump", dump)
+    assert diskcache.load(str(script)).run() == luca.LucaNumber(6)
+    filename = diskcache.cache_path(str(script))
+    assert os.listdir(os.path.dirname(filename)) == []
+
+
+@pytest.mark.parametrize("check", ["mtime", "hash"])
+def test_load_checks_header_before_unpickling(script, monkeypatch, check):
+    diskcache.load(str(script), check=check)
+    script.write_text("a = { b = 2 }\na.b * 4")
+    stat = script.stat()
+    os.utime(script, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    def loads(data):
+        raise AssertionError("unpickled a stale cache file")
+
+    monkeypatch.setattr(diskcache.pickle, "loads", loads)
+    assert diskcache.load(str(script), check=check).run() == luca.LucaNumber(8)
+
+
+def test_load_ignores_corrupt_trees(script):
+    diskcache.load(str(script))
+    filename = diskcache.cache_path(str(script))
+    with open(filename, "rb") as f:
+        header = f.read(diskcache._HEADER.size)
+    for body in [b"", b"garbage", pickle.dumps(luca.LucaNumber(1))]:
+        with open(filename, "wb") as f:
+            f.write(header + body)
+        assert diskcache.load(str(script)).run() == luca.LucaNumber(6)
+
+
+def test_load_ignores_other_versions(script, monkeypatch):
+    diskcache.load(str(script))
+    monkeypatch.setattr(diskcache, "FORMAT_VERSION", diskcache.FORMAT_VERSION + 1)
+    calls = []
+    tokenize = luca.LucaLexer.tokenize
+    monkeypatch.setattr(
+        luca.LucaLexer, "tokenize", lambda *args: calls.append(1) or tokenize(*args)
+    )
+    diskcache.load(str(script))
+    assert calls
+
+
+def test_compile_file(script, monkeypatch):
+    luca.Luca.compile_file(str(script))
+    forbid_parsing(monkeypatch)
+    assert luca.Luca.compile_file(str(script)).run() == luca.LucaNumber(6)
@@ -1,5 +1,8 @@
 import pytest
-from luca import luca
+import pathlib
+import subprocess
+import sys
+from luca import luca, sly
 
 
 def test_lex_no_stdout(capfd):
@@ -172,6 +175,539 @@ def test_lex_print_statement():
     assert tokens == ["PRINT", "STRING"]
 
 
+def _generic_tokens(lexer, text):
+    return [
+        (t.type, t.value, t.lineno, t.index, t.end)
+        for t in sly.Lexer.tokenize(lexer, text)
+    ]
+
+
+def _tokens(lexer, text):
+    return [(t.type, t.value, t.lineno, t.index, t.end) for t in lexer.tokenize(text)]
+
+
+def test_lex_specialized_matches_generic():
+    from test_syntax import PROGRAMS
+
+    lexer = luca.LucaLexer()
+    assert luca.LucaLexer.tokenize.specialized
+    assert "def tokenize" in luca.LucaLexer._tokenize_source
+    edge_cases = [
+        "",
+        "   ",
+        "a = 1  \t ",
+        "a # comment\n# another\nb",
+        "true truely false_ null nullable print printer",
+        ".5 + 5. - 1.25",
+        'x = "a\\"b" + "" + "\\\\"',
+        "a==b!=c=d",
+        "\n\n  \t\n",
+    ]
+    for text in PROGRAMS + edge_cases:
+        assert _tokens(lexer, text) == _generic_tokens(lexer, text), text
+
+
+def test_lex_specialized_error_matches_generic():
+    lexer = luca.LucaLexer()
+    for text in ["a = 1 & 2", "   @", "a = é"]:
+        with pytest.raises(sly.lex.LexError) as generic:
+            _generic_tokens(lexer, text)
+        with pytest.raises(sly.lex.LexError) as specialized:
+            _tokens(lexer, text)
+        assert specialized.value.error_index == generic.value.error_index
+        assert specialized.value.text == generic.value.text
+
+
+def test_lex_specialized_lexer_features():
+    class Lexer(sly.Lexer):
+        tokens = {NAME, NUMBER, IF, ELSE, LE}
+        literals = {"<", "+"}
+        ignore = " "
+        ignore_comment = r"//.*"
+        specialize = True
+
+        IF = r"if\b"
+        LE = r"<="
+
+        @_(r"\n+")
+        def ignore_newline(self, t):
+            self.lineno += len(t.value)
+
+        @_(r"\d+")
+        def NUMBER(self, t):
+            t.value = int(t.value)
+            return t
+
+        NAME = r"\w+"
+        NAME["else"] = ELSE
+
+        def error(self, t):
+            self.index += 1
+            t.value = t.value[0]
+            return t
+
+    text = "if x <= 10 // c\n\nelse y < 2 + é3 $ iffy"
+    lexer = Lexer()
+    assert _tokens(lexer, text) == _generic_tokens(lexer, text)
+    assert [t[0] for t in _tokens(lexer, text)] == [
+        "IF",
+        "NAME",
+        "LE",
+        "NUMBER",
+        "ELSE",
+        "NAME",
+        "<",
+        "NUMBER",
+        "+",
+        "NAME",
+        "ERROR",
+        "NAME",
+    ]
+    assert lexer.lineno == 3
+
+
+def test_lex_tokenize_batch():
+    from test_syntax import PROGRAMS
+
+    lexer = luca.LucaLexer()
+    for text in PROGRAMS + ['a = "x\\"y" # c\n.5 and not true', "  \t"]:
+        batch = lexer.tokenize_batch(text)
+        assert batch.types.typecode == "B"
+        assert batch.start.typecode == batch.end.typecode == "l"
+        expected = [(t.type, t.value, t.index, t.end) for t in lexer.tokenize(text)]
+        tokens = [batch.token(n) for n in range(len(batch))]
+        assert [(t.type, t.value, t.index, t.end) for t in tokens] == expected
+        assert [batch.type(n) for n in range(len(batch))] == [t[0] for t in expected]
+        assert [batch.value(n) for n in range(len(batch))] == [t[1] for t in expected]
+    with pytest.raises(sly.lex.LexError) as error:
+        lexer.tokenize_batch("a = 1 & 2")
+    assert error.value.error_index == 6
+
+
+def test_lex_tokenize_batch_lexer_features():
+    class Lexer(sly.Lexer):
+        tokens = {NAME, NUMBER}
+        ignore = " "
+
+        @_(r"\n+")
+        def ignore_newline(self, t):
+            self.lineno += len(t.value)
+
+        @_(r"\d+")
+        def NUMBER(self, t):
+            t.value = int(t.value)
+            return t
+
+        NAME = r"[a-z]+"
+
+        def error(self, t):
+            self.index += 1
+            t.value = t.value[0]
+            return t
+
+    batch = Lexer().tokenize_batch("ab 12\n$cd")
+    assert batch.type_names[-1] == "ERROR"
+    assert [batch.type(n) for n in range(len(batch))] == [
+        "NAME",
+        "NUMBER",
+        "ERROR",
+        "NAME",
+    ]
+    assert list(batch.start) == [0, 3, 6, 7]
+    assert list(batch.end) == [2, 5, 7, 9]
+    assert batch.value(1) == 12
+
+
+def _batch_fields(batch):
+    return list(batch.types), list(batch.start), list(batch.end)
+
+
+def test_lex_relex():
+    lexer = luca.LucaLexer()
+    text = "a = 1\nb = 2\n" * 100
+    batch = lexer.tokenize_batch(text)
+    offset = text.index("b = 2", 300)
+
+    new, delta = lexer.relex(batch, offset, 1, "bee + c")
+    expected = lexer.tokenize_batch(new.text)
+    assert new.text == text[:offset] + "bee + c" + text[offset + 1 :]
+    assert _batch_fields(new) == _batch_fields(expected)
+    # Only the edited line, and the newline before it, are tokenized again.
+    assert delta == (batch.start.index(offset) - 1, 2, 4, 6)
+
+    # An edit in a string that spans lines restarts at the string.
+    text = 'a = "x\ny" + b\nc = 1\n'
+    batch = lexer.tokenize_batch(text)
+    new, delta = lexer.relex(batch, text.index("y"), 0, "z")
+    assert new.value(2) == luca.LucaString("x\nzy")
+    assert delta == (2, 1, 1, 1)
+
+
+def test_lex_relex_custom_error_type():
+    class Lexer(sly.Lexer):
+        tokens = {NAME}
+        ignore = " \n"
+        NAME = r"[a-z]+"
+
+        def error(self, t):
+            t.type = "BAD"
+            t.value = t.value[0]
+            self.index += 1
+            return t
+
+    lexer = Lexer()
+    text = "ab cd\nef\n"
+    batch = lexer.tokenize_batch(text)
+    new, delta = lexer.relex(batch, text.index("cd"), 0, "$")
+    assert _batch_fields(new) == _batch_fields(lexer.tokenize_batch(new.text))
+    [error] = [t for t in lexer.tokenize(new.text) if t.type == "BAD"]
+    assert new.type(1) == "ERROR"
+    assert (new.start[1], new.end[1]) == (error.index, error.end)
+    assert new.value(1) == error.value == "$"
+
+
+def test_lex_relex_random_edits():
+    import random
+
+    rng = random.Random(0)
+    lexer = luca.LucaLexer()
+    pieces = ["a", "1", ".", '"', "\\", "\n", " ", "=", "+", "#", "true", "x = 1\n"]
+    batch = lexer.tokenize_batch('a = "x"\nb = a + 1 # c\n{ c = 2.5 }\n' * 5)
+    for _ in range(500):
+        text = batch.text
+        offset = rng.randrange(len(text) + 1)
+        deleted = min(rng.randrange(5), len(text) - offset)
+        inserted = "".join(rng.choice(pieces) for _ in range(rng.randrange(4)))
+        new_text = text[:offset] + inserted + text[offset + deleted :]
+        try:
+            expected = lexer.tokenize_batch(new_text)
+        except sly.lex.LexError:
+            continue
+        new, delta = lexer.relex(batch, offset, deleted, inserted)
+        assert _batch_fields(new) == _batch_fields(expected), (text, offset)
+        assert len(new) == len(batch) - delta.removed + delta.added
+        batch = new
+
+
+def test_lex_tokenize_stream():
+    import io
+
+    from test_syntax import PROGRAMS
+
+    text = "\n".join(PROGRAMS) + '\ns = "é\nè" # ü\nt = 1'
+    lexer = luca.LucaLexer()
+    expected = _tokens(lexer, text)
+    for chunk_size in [1, 2, 7, 64, 1 << 20]:
+        for source in [io.StringIO(text), io.BytesIO(text.encode())]:
+            tokens = lexer.tokenize_stream(source, chunk_size)
+            assert [
+                (t.type, t.value, t.lineno, t.index, t.end) for t in tokens
+            ] == expected, (chunk_size, source)
+
+
+def test_lex_tokenize_stream_error():
+    import io
+
+    text = 'a = "x\ny"\nb = 1 & 2\n'
+    for chunk_size in [1, 5, 100]:
+        with pytest.raises(sly.lex.LexError) as error:
+            list(luca.LucaLexer().tokenize_stream(io.StringIO(text), chunk_size))
+        assert error.value.error_index == text.index("&")
+        assert str(error.value) == f"Illegal character '&' at index {text.index('&')}"
+
+
+def test_lex_tokenize_stream_unterminated_string():
+    import io
+
+    class Source(io.StringIO):
+        reads = 0
+
+        def read(self, size):
+            self.reads += 1
+            return super().read(size)
+
+    text = 'a = 1\nb = "x\n' + "y = 1\n" * 1000
+    for chunk_size in [1, 5, 64]:
+        with pytest.raises(sly.lex.LexError) as error:
+            list(luca.LucaLexer().tokenize_stream(io.StringIO(text), chunk_size))
+        assert error.value.error_index == text.index('"')
+    # The error is reported once the string is longer than max_token,
+    # without reading the rest of the input.
+    source = Source(text)
+    with pytest.raises(sly.lex.LexError):
+        list(luca.LucaLexer().tokenize_stream(source, 8, max_token=100))
+    assert source.reads < 50
+    # A character that can't start a token is an error whatever follows.
+    source = Source("a = 1\n@" + "x = 1\n" * 1000)
+    with pytest.raises(sly.lex.LexError):
+        list(luca.LucaLexer().tokenize_stream(source, 8))
+    assert source.reads <= 2
+
+
+def test_lex_interns_literals():
+    text = '5000 + 5000 + 1.5 + 1.5\n"x" + "x" + "y"\ntrue and true or false'
+    values = [
+        t.value
+        for t in luca.LucaLexer().tokenize(text)
+        if t.type in ("NUMBER", "STRING", "BOOLEAN")
+    ]
+    one, one_again, half, half_again, x, x_again, y, true, true_again, false = values
+    assert one is one_again and type(one.raw_value) is int
+    assert half is half_again and type(half.raw_value) is float
+    assert x is x_again and x is not y
+    assert true is true_again is luca.TRUE
+    assert false is luca.FALSE
+    # Each lexer has its own pool, and so does each text a lexer tokenizes.
+    other = next(luca.LucaLexer().tokenize("5000")).value
+    assert other == one and other is not one
+    lexer = luca.LucaLexer()
+    first = [t.value for t in lexer.tokenize("5000 + 5000")]
+    pool = lexer.constants
+    second = next(lexer.tokenize("5000")).value
+    assert lexer.constants is not pool and len(lexer.constants.numbers) == 1
+    assert second == first[0] and second is not first[0]
+    lexer.tokenize_batch("1 2 3").value(0)
+    assert list(lexer.constants.numbers) == ["1"]
+
+
+def test_lex_lazy_values():
+    calls = []
+
+    class Lexer(sly.Lexer):
+        tokens = {NAME, NUMBER, KEYWORD}
+        ignore = " "
+
+        @_(r"\d+")
+        def NUMBER(self, t):
+            calls.append(t.value)
+            t.value = int(t.value)
+            return t
+
+        NAME = r"\w+"
+        NAME["let"] = KEYWORD
+
+    for specialize in [False, True]:
+        Lexer.specialize = specialize
+        Lexer.lazy_values = {"NUMBER", "KEYWORD"}
+        Lexer._build()
+        calls.clear()
+        tokens = list(Lexer().tokenize("let x 12 345"))
+        assert [type(t) for t in tokens] == [
+            sly.LazyToken,
+            sly.lex.Token,
+            sly.LazyToken,
+            sly.LazyToken,
+        ]
+        assert calls == []
+        assert tokens[3].value == 345
+        assert tokens[3].value == 345
+        assert calls == ["345"]
+        assert tokens[0].value == "let"
+        tokens[2].value = "twelve"
+        assert tokens[2].value == "twelve"
+        assert calls == ["345"]
+
+
+def test_lex_lazy_values_decode_in_their_state():
+    class Hex(sly.Lexer):
+        tokens = {NUMBER}
+        lazy_values = {"NUMBER"}
+        ignore = " "
+
+        @_(r"[0-9a-f]+")
+        def NUMBER(self, t):
+            t.value = int(t.value, 16)
+            return t
+
+    class Lexer(sly.Lexer):
+        tokens = {NUMBER, HEX}
+        lazy_values = {"NUMBER"}
+        ignore = " "
+
+        @_(r"hex")
+        def HEX(self, t):
+            self.begin(Hex)
+            return t
+
+        @_(r"\d+")
+        def NUMBER(self, t):
+            t.value = int(t.value)
+            return t
+
+    lexer = Lexer()
+    tokens = list(lexer.tokenize("10 hex 10"))
+    assert type(lexer) is Hex
+    assert [t.value for t in tokens] == [10, "hex", 16]
+
+
+def test_lex_lazy_values_ignored():
+    with pytest.raises(sly.lex.LexerBuildError):
+
+        class Lexer(sly.Lexer):
+            tokens = {NAME}
+            lazy_values = {"COMMENT"}
+            ignore_COMMENT = r"\#.*"
+            NAME = r"\w+"
+
+
+def test_lex_error_context():
+    text = "a = 1 & " + "x" * 10000
+    lexer = luca.LucaLexer()
+    for tokens in [lexer.tokenize, lambda text: sly.Lexer.tokenize(lexer, text)]:
+        with pytest.raises(sly.lex.LexError) as error:
+            list(tokens(text))
+        assert error.value.error_index == text.index("&")
+        assert error.value.text == text[text.index("&") :][: lexer.error_context]
+
+
+@pytest.mark.parametrize("engine", ["parser", "vm", "closure", "python"])
+def test_main_exits_on_recovered_syntax_error(monkeypatch, capsys, engine):
+    import io
+    import luca as package
+
+    monkeypatch.setattr("sys.stdin", io.StringIO("print(1)\na = = 1\nprint(2)\n"))
+    with pytest.raises(SystemExit, match="index 13"):
+        package.main([f"--engine={engine}"])
+
+
+@pytest.mark.parametrize("engine", ["parser", "vm", "closure", "python"])
+@pytest.mark.parametrize(
+    "program,message",
+    [
+        ("print(1)\na = 1 $ 2\n", "luca: Illegal character '$' at index 15"),
+        ("print(1)\n1/0\n", "luca: Cannot divide by zero."),
+        ('print(1)\n"a" - "b"\n', "luca: Cannot perform LucaType.STRING - "),
+        ("print(1)\na\n", "luca: a is not in scope."),
+    ],
+)
+def test_main_exits_on_lex_and_runtime_errors(monkeypatch, engine, program, message):
+    import io
+    import luca as package
+
+    monkeypatch.setattr("sys.stdin", io.StringIO(program))
+    with pytest.raises(SystemExit) as exit:
+        package.main([f"--engine={engine}"])
+    assert exit.value.code.startswith(message)
+
+
+@pytest.mark.parametrize("engine", ["parser", "vm", "closure", "python"])
+def test_main_deep_tree(monkeypatch, capsys, engine):
+    import io
+    import luca as package
+
+    program = "print(1" + " + 1" * 2000 + ")\n"
+    monkeypatch.setattr("sys.stdin", io.StringIO(program))
+    package.main([f"--engine={engine}"])
+    assert capsys.readouterr().out == "2001\n"
+
+
+def test_main_parser_engine_multiline_block(monkeypatch, capsys):
+    import io
+    import luca as package
+
+    program = 'a = {\n  b = 2\n  c = b * 3\n}\nprint(a.c)\nprint("x\ny")\n'
+    monkeypatch.setattr("sys.stdin", io.StringIO(program))
+    package.main([])
+    assert capsys.readouterr().out == "6\nx\ny\n"
+
+
+def test_token_list():
+    text = 'a = 1\nb = "x" + a # c\na'
+    tokens = list(luca.LucaLexer().tokenize(text))
+    compact = sly.TokenList(luca.LucaLexer().tokenize(text))
+
+    def fields(tokens):
+        return [(t.type, t.value, t.lineno, t.index, t.end) for t in tokens]
+
+    assert len(compact) == len(tokens)
+    assert fields(compact) == fields(tokens)
+    assert fields([compact[0], compact[-1]]) == fields([tokens[0], tokens[-1]])
+    assert fields(compact[2:5]) == fields(tokens[2:5])
+    with pytest.raises(IndexError):
+        compact[len(tokens)]
+    # Equal string values are stored once.
+    assert compact.values[0] is compact.values[-1]
+    compact.append(tokens[0])
+    assert fields(compact[-1:]) == fields(tokens[:1])
+
+
+def test_parse_token_list():
+    from test_syntax import PROGRAMS
+
+    for program in PROGRAMS:
+        expected = luca.LucaParser().parse(luca.LucaLexer().tokenize(program))
+        tokens = sly.TokenList(luca.LucaLexer().tokenize(program))
+        assert luca.LucaParser().parse(tokens) == expected, program
+
+
+def test_value_singletons():
+    assert luca.LucaNull() is luca.NULL
+    assert luca.LucaBool(True) is luca.TRUE
+    assert luca.LucaBool(False) is luca.FALSE
+    assert luca.TRUE.logic_and(luca.FALSE) is luca.FALSE
+    assert luca.LucaNumber(1).logic_eq(luca.LucaNumber(1)) is luca.TRUE
+    assert luca.LucaNumber(-5) is luca.LucaNumber(-5)
+    assert luca.LucaNumber(1024) is luca.LucaNumber(1000) + luca.LucaNumber(24)
+    assert luca.LucaNumber(1025) is not luca.LucaNumber(1025)
+    assert luca.LucaNumber(1.0) is not luca.LucaNumber(1)
+    assert str(luca.LucaNumber(1.0)) == "1.0"
+
+
+def test_values_are_immutable():
+    import pickle
+
+    for value in [luca.NULL, luca.TRUE, luca.LucaNumber(3), luca.LucaString("x")]:
+        with pytest.raises(AttributeError):
+            value.raw_value = 4
+        with pytest.raises(AttributeError):
+            value.other = 4
+        assert not hasattr(value, "__dict__")
+        assert pickle.loads(pickle.dumps(value)) == value
+    assert pickle.loads(pickle.dumps(luca.NULL)) is luca.NULL
+    assert pickle.loads(pickle.dumps(luca.FALSE)) is luca.FALSE
+
+    obj = luca.LucaObject()
+    obj.set("a", luca.LucaNumber(2000))
+    copy = pickle.loads(pickle.dumps(obj))
+    assert copy.raw_value is None
+    assert copy.get("a") == luca.LucaNumber(2000)
+
+
+def test_operator_tables():
+    with pytest.raises(
+        TypeError, match=r"Cannot perform LucaType.BOOLEAN \+ LucaType.BOOLEAN"
+    ):
+        luca.TRUE + luca.TRUE
+    with pytest.raises(
+        TypeError, match="Cannot perform LucaType.NUMBER and LucaType.BOOLEAN"
+    ):
+        luca.LucaNumber(1).logic_and(luca.TRUE)
+    with pytest.raises(TypeError, match="Cannot perform - LucaType.STRING"):
+        -luca.LucaString("a")
+    # Subclasses use the implementation for their base classes.
+    frame = luca.LucaFrame(luca.LucaObject(), {})
+    assert frame.logic_eq(luca.LucaObject()) is luca.TRUE
+    assert str(luca.LucaString("a") + frame) == "a{}(LucaType.OBJECT)"
+
+    class LucaPair(luca.LucaValue):
+        __slots__ = ()
+        luca_type = "PAIR"
+
+        def __new__(cls, value):
+            return luca._new_value(cls, value)
+
+    pair = LucaPair((1, 2))
+    with pytest.raises(TypeError, match=r"Cannot perform PAIR \+ PAIR"):
+        pair + pair
+    luca.BINARY_OPS["+", LucaPair, LucaPair] = lambda a, b: LucaPair(
+        a.raw_value + b.raw_value
+    )
+    assert (pair + pair).raw_value == (1, 2, 1, 2)
+    assert str(luca.LucaString("p") + pair) == "p(1, 2)(PAIR)"
+    with pytest.raises(TypeError, match=r"Cannot perform PAIR \+ LucaType.NUMBER"):
+        pair + luca.LucaNumber(1)
+
+
 def test_parse_empty_program():
     tokens = luca.LucaLexer().tokenize("")
     luca.LucaParser().parse(tokens)
@@ -621,3 +1157,219 @@ def test_parse_set_nested_value_disallowed():
     tokens = luca.LucaLexer().tokenize(program)
     with pytest.raises(ValueError):
         luca.LucaParser().parse(tokens)
+
+
+@pytest.fixture
+def built_parser(tmp_path, monkeypatch):
+    # LucaParser loads its tables from luca/parsetab.py, so build the grammar
+    # explicitly for tests that need it, without the user's table cache.
+    monkeypatch.setattr(luca.LucaParser, "tablecache", str(tmp_path / "tables"))
+    luca.LucaParser._build_tables()
+    return luca.LucaParser
+
+
+def test_parser_table_cache_round_trip(tmp_path, built_parser):
+    grammar = built_parser._grammar
+    lrtable = built_parser._lrtable
+    cachefile = str(tmp_path / "tables.json")
+    assert sly.yacc.write_table_cache(cachefile, grammar, lrtable)
+    loaded = sly.yacc.read_table_cache(cachefile, grammar)
+    assert loaded.lr_action == lrtable.lr_action
+    assert loaded.lr_goto == lrtable.lr_goto
+    assert loaded.defaulted_states == lrtable.defaulted_states
+    assert str(loaded) == str(lrtable)
+
+
+def test_parser_table_cache_rejects_stale_signature(tmp_path, built_parser):
+    grammar = built_parser._grammar
+    cachefile = tmp_path / "tables.json"
+    sly.yacc.write_table_cache(str(cachefile), grammar, built_parser._lrtable)
+    cachefile.write_text(
+        cachefile.read_text().replace(grammar.signature(), "0" * 64)
+    )
+    assert sly.yacc.read_table_cache(str(cachefile), grammar) is None
+
+
+def test_parser_table_cache_missing_file(tmp_path, built_parser):
+    grammar = built_parser._grammar
+    assert sly.yacc.read_table_cache(str(tmp_path / "nope.json"), grammar) is None
+
+
+def test_parser_table_module_is_current():
+    from luca import parsetab
+
+    luca.LucaParser._load_tables()
+    # If this fails, regenerate the tables as described in LucaParser.
+    assert parsetab.signature == luca.LucaParser._spec_signature
+
+
+def test_parser_table_module_matches_built_tables(tmp_path, built_parser):
+    tabfile = tmp_path / "parsetab_test.py"
+    sly.yacc.write_table_module(built_parser, str(tabfile))
+    namespace = {}
+    exec(tabfile.read_text(), namespace)
+    assert namespace["signature"] == built_parser._spec_signature
+    loaded = sly.yacc.LRTable.from_data(
+        built_parser._productions, namespace["tables"]
+    )
+    assert loaded.lr_action == built_parser._lrtable.lr_action
+    assert loaded.lr_goto == built_parser._lrtable.lr_goto
+    assert loaded.defaulted_states == built_parser._lrtable.defaulted_states
+
+
+def test_parser_dense_tables_match_lr_tables(built_parser):
+    lrtable = built_parser._lrtable
+    dense = sly.yacc.DenseLRTable(lrtable, built_parser._productions)
+    for state, actions in lrtable.lr_action.items():
+        for term in dense.terminal_ids:
+            assert dense.get_action(state, term) == actions.get(term)
+        assert dense.get_action(state, "NOT_A_TOKEN") is None
+        assert dense.defaulted[state] == lrtable.defaulted_states.get(state, 0)
+    for p in built_parser._productions[1:]:
+        for state, gotos in lrtable.lr_goto.items():
+            if p.name in gotos:
+                assert dense.goto[dense.goto_offset[p.number] + state] == gotos[p.name]
+
+
+def test_import_does_not_build_parser(tmp_path):
+    script = (
+        "import os, luca.luca as l\n"
+        "assert l.LucaParser._dense is None\n"
+        "assert os.listdir() == []\n"
+    )
+    env = {"PYTHONPATH": str(pathlib.Path(luca.__file__).parents[1])}
+    subprocess.run([sys.executable, "-c", script], cwd=tmp_path, env=env, check=True)
+
+
+def test_parser_dump_debug(tmp_path, monkeypatch):
+    monkeypatch.setattr(luca.LucaParser, "tablecache", str(tmp_path / "tables"))
+    debugfile = tmp_path / "parser.out"
+    luca.LucaParser.dump_debug(str(debugfile))
+    text = debugfile.read_text()
+    assert text.startswith("Grammar:")
+    assert "shift/reduce conflict" in text
+
+
+def test_parser_position_table_is_per_parse():
+    from luca import syntax
+
+    parser = syntax.LucaAstParser()
+    parser.position_table = True
+    lexer = luca.LucaLexer()
+    tree = parser.parse(lexer.tokenize("a = 1\nb = a + 2"))
+    assign = tree.statements[1]
+    assert parser.line_position(assign) == 1
+    assert parser.index_position(assign) == assign.span == (6, 15)
+    size = len(parser.positions)
+    for _ in range(10):
+        parser.parse(lexer.tokenize("a = 1\nb = a + 2"))
+        assert len(parser.positions) == size
+    with pytest.raises(KeyError):
+        parser.line_position(assign)
+
+
+def test_position_table_holds_its_values():
+    table = sly.yacc.PositionTable()
+    table.record(object(), 1, 0, 3)
+    # Had the table not kept the first object alive, this one could reuse its
+    # id() and be given its position.
+    with pytest.raises(KeyError):
+        table.line_position(object())
+    value = object()
+    table.record(value, None, 4, None)
+    table.record(value, 2, 4, 6)
+    assert len(table) == 2
+    assert table.line_position(value) == 2
+    assert table.index_position(value) == (4, 6)
+
+
+def test_parser_positions_are_per_thread():
+    import threading
+    from luca import syntax
+
+    parser = syntax.LucaAstParser()
+    parser.position_table = True
+    barrier = threading.Barrier(2)
+    failures = []
+
+    def run(program):
+        for _ in range(20):
+            tree = parser.parse(luca.LucaLexer().tokenize(program))
+            barrier.wait()
+            stmt = tree.statements[-1]
+            if parser.index_position(stmt) != stmt.span:
+                failures.append(program)
+            barrier.wait()
+
+    threads = [
+        threading.Thread(target=run, args=(program,))
+        for program in ["a = 1", "b = 2\nc = b + 3"]
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not failures
+    assert parser.positions is None
+
+    ctx = parser.parse_context(luca.LucaLexer().tokenize("a = 1\nb = a"))
+    stmt = ctx.result.statements[1]
+    assert ctx.line_position(stmt) == 1
+    assert parser.positions is None
+    for name in ("tokens", "statestack", "symstack"):
+        assert name not in vars(ctx)
+
+
+def test_parse_leaves_parser_unchanged():
+    from luca import syntax
+
+    parser = syntax.LucaAstParser()
+    before = dict(vars(parser))
+    parser.parse(luca.LucaLexer().tokenize("a = 1"))
+    assert vars(parser) == before
+    assert parser.positions is None
+
+
+def test_parser_tracking_off():
+    parser = luca.LucaParser()
+    assert parser.parse(luca.LucaLexer().tokenize("1 + 2")) == luca.LucaNumber(3)
+    assert parser.positions is None
+    with pytest.raises(KeyError):
+        parser.index_position(parser.current_scope())
+
+
+def test_parser_keeps_no_parse_state():
+    parser = luca.LucaParser()
+    parser.parse(luca.LucaLexer().tokenize("a = { b = 1 }"))
+    for name in ("tokens", "statestack", "symstack", "state", "production"):
+        assert name not in vars(parser)
+    assert len(parser.scope_stack) == 1
+    assert parser.get("a").get("b") == luca.LucaNumber(1)
+
+
+def test_parser_shared_between_threads():
+    import threading
+    from luca import syntax
+    from luca.evaluator import Evaluator
+
+    parser = syntax.LucaAstParser()
+    evaluator = luca.LucaParser()
+    program = "x = {\n y = { z = 1 + 2 * 3 }\n w = y.z - 1\n}\nx.w"
+    failures = []
+
+    def run():
+        for _ in range(50):
+            tree = parser.parse(luca.LucaLexer().tokenize(program))
+            if Evaluator().evaluate(tree) != luca.LucaNumber(6):
+                failures.append(tree)
+            value = evaluator.parse(luca.LucaLexer().tokenize(program))
+            if value != luca.LucaNumber(6):
+                failures.append(value)
+
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not failures
+    assert len(evaluator.scope_stack) == 1
@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+from luca import luca
+from test_syntax import DEEP_PROGRAM, DEEP_RESULT
+
+
+def test_compile_raises_on_syntax_error():
+    with pytest.raises(SyntaxError):
+        luca.Luca.compile("a = ")
+    with pytest.raises(SyntaxError):
+        luca.Luca.compile("")
+
+
+def test_luca_runs_deep_tree():
+    assert luca.Luca()(DEEP_PROGRAM) == DEEP_RESULT
+
+
+def test_run_with_globals():
+    program = luca.Luca.compile("b = a + 1")
+    scope = luca.LucaObject()
+    scope.set("a", luca.LucaNumber(1))
+    assert program.run(scope) == luca.LucaNumber(2)
+    assert scope.get("b") == luca.LucaNumber(2)
+
+    names = {"a": luca.LucaNumber(5)}
+    assert program.run(names) == luca.LucaNumber(6)
+    assert names == {"a": luca.LucaNumber(5)}
+
+
+def test_program_is_immutable_and_hashable():
+    program = luca.Luca.compile("1 + 2")
+    with pytest.raises(AttributeError):
+        program.source = "3"
+    with pytest.raises(AttributeError):
+        del program.tree
+    assert program == luca.Luca.compile("1 + 2")
+    assert len({program, luca.Luca.compile("1 + 2")}) == 1
+
+
+def test_program_runs_in_many_threads():
+    program = luca.Luca.compile("b = { c = a * 2\nd = c + 1 }\nb.d")
+    results = []
+
+    def run(n):
+        for _ in range(200):
+            value = program.run({"a": luca.LucaNumber(n)})
+            results.append(value == luca.LucaNumber(n * 2 + 1))
+
+    threads = [threading.Thread(target=run, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 1600 and all(results)
+
+
+def test_luca_keeps_scope_between_calls(capsys):
+    interpreter = luca.Luca()
+    interpreter("a = 1")
+    assert interpreter("print(a + 1)") == luca.LucaNull()
+    assert capsys.readouterr().out == "2\n"
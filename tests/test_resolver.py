@@ -0,0 +1,83 @@
+import sys
+
+from luca import closures, luca, resolver, syntax
+from test_syntax import parse
+
+
+def names(program):
+    tree = parse(program)
+    resolution = resolver.resolve(tree)
+    found = []
+
+    def visit(node):
+        if node in resolution.names:
+            found.append((type(node).__name__, resolution.names[node]))
+        if isinstance(node, (syntax.Block, syntax.Scope)):
+            for stmt in node.statements:
+                visit(stmt)
+        elif isinstance(node, syntax.Assign):
+            visit(node.value)
+        elif isinstance(node, syntax.BinOp):
+            visit(node.left)
+            visit(node.right)
+        elif isinstance(node, syntax.Print):
+            visit(node.expr)
+
+    visit(tree)
+    return found
+
+
+def test_top_level_names_are_dynamic():
+    assert names("a = 1\nb = a") == [
+        ("Assign", (0, None)),
+        ("Assign", (0, None)),
+        ("Name", (0, None)),
+    ]
+
+
+def test_block_names_get_slots_in_assignment_order():
+    assert names("{ b = 1\na = 2\nb = a + b }") == [
+        ("Assign", (0, 0)),
+        ("Assign", (0, 1)),
+        ("Assign", (0, 0)),
+        ("Name", (0, 1)),
+        ("Name", (0, 0)),
+    ]
+
+
+def test_read_before_assign_resolves_outwards():
+    assert names("{ a = 1\n{ b = a\na = b } }") == [
+        ("Assign", (0, 0)),
+        ("Assign", (0, 0)),
+        ("Name", (1, 0)),
+        ("Assign", (0, 1)),
+        ("Name", (0, 0)),
+    ]
+
+
+def test_unassigned_names_walk_to_the_top_level():
+    assert names("{ { a } }") == [("Name", (2, None))]
+
+
+def test_layouts():
+    tree = parse("{ b = 1\na = 2\nb = 3 }")
+    resolution = resolver.resolve(tree)
+    assert resolution.layouts[tree.statements[0]] == {"b": 0, "a": 1}
+
+
+def test_frame_prints_like_an_object():
+    program = closures.compile_source("a = { c = 1\nb = 2 }")
+    scope = luca.LucaObject()
+    program(scope)
+    a = scope.get("a")
+    assert isinstance(a, luca.LucaFrame)
+    a.set("d", luca.LucaNumber(3))
+    assert str(a) == "{c:1,b:2,d:3}(LucaType.OBJECT)"
+
+
+def test_deep_lookup_does_not_recurse():
+    scope = luca.LucaObject()
+    scope.set("a", luca.LucaNumber(1))
+    for _ in range(sys.getrecursionlimit() + 10):
+        scope = luca.LucaObject(scope)
+    assert scope.get("a") == luca.LucaNumber(1)
@@ -0,0 +1,220 @@
+import pytest
+from luca import closures, luca, syntax, transpile, vm
+from luca.evaluator import Evaluator
+
+PROGRAMS = [
+    "(1+4/2-5*-6)%(12-2)",
+    '"a"+"b"',
+    '"a"+false',
+    "1==1 and 2==2 and 3==4",
+    "1==2 or 2==3 or 3==3",
+    "not true",
+    "null == null",
+    "print(not true)",
+    'print("hello"+"world")',
+    "a = b = 2",
+    """
+
+      13
+
+    """,
+    """
+        a = 1
+        b = a + 1
+        c = a + b
+    """,
+    """
+        a = 1
+        {
+            a = 2
+            print(a)
+        }
+        print(a)
+    """,
+    """
+        a = {
+            b = 1
+            c = 2
+        }
+        print(a)
+        a.c
+    """,
+    """
+        a = 1
+        b = {}
+        b.a
+    """,
+    """
+        a = {
+            b = 1
+        }
+        c = {
+            d = 1
+        }
+        a.c.a.c.a.c.d == a.a.a.a.a.a.a.a.a.b
+    """,
+    """
+        a = { c = 1 }
+        a.b = 2
+        a.b + a.c
+    """,
+    """
+        a = 1
+        b = {
+            c = a
+            a = a + 1
+            d = { e = a * 10 }
+        }
+        b.c = 5
+        b.f = 6
+        print(b)
+        b.d.e + a
+    """,
+]
+
+ERROR_PROGRAMS = [
+    ('"a"-"b"', TypeError),
+    ("true and 1.0", TypeError),
+    ("1 or true", TypeError),
+    ("-true", TypeError),
+    ('not "a"', TypeError),
+    ("1/0", ValueError),
+    ("a", ValueError),
+    ("a = {}\na.b.c = 1", ValueError),
+]
+
+# sly recovers from this error and parses the statements around it.
+RECOVERED_SYNTAX_ERROR = "print(1)\na = = 1\nprint(2)\n"
+
+# A chain of 2000 binary operators, with a long chain in its last operand.
+# Each is a tree far deeper than Python's recursion limit, which the passes
+# over syntax trees fold over in a loop.
+DEEP_PROGRAM = (
+    "x = 0\ny = 1" + " + (x = x + 1) * 2 - 1" * 1000 + " + (" + "1 + " * 500 + "x)\ny"
+)
+DEEP_RESULT = luca.LucaNumber(1 + 1000**2 + 500 + 1000)
+
+
+def parse(program):
+    return syntax.LucaAstParser().parse(luca.LucaLexer().tokenize(program))
+
+
+def evaluator(source):
+    tree = syntax.parse_source(source)
+    return lambda scope: Evaluator(scope).evaluate(tree)
+
+
+def virtual_machine(source):
+    code = vm.compile_source(source)
+    return lambda scope: vm.VirtualMachine(scope).run(code)
+
+
+def python(source):
+    return transpile.load(transpile.compile_source(source))
+
+
+# Every engine compiles source into a function that runs it against a scope,
+# and must give each program the semantics LucaParser gives it.
+ENGINES = {
+    "evaluator": evaluator,
+    "vm": virtual_machine,
+    "closure": closures.compile_source,
+    "python": python,
+    "program": lambda source: luca.Luca.compile(source).run,
+}
+
+engines = pytest.mark.parametrize("engine", ENGINES.values(), ids=list(ENGINES))
+
+
+def test_ast_parser_shares_tables_with_luca_parser():
+    luca.LucaParser._load_tables()
+    syntax.LucaAstParser._load_tables()
+    assert (
+        syntax.LucaAstParser._spec_signature == luca.LucaParser._spec_signature
+    )
+
+
+def test_parse_builds_tree():
+    tree = parse("a = 1 + -b.c")
+    assert tree.statements[0].span == (0, 12)
+    assign = tree.statements[0]
+    assert isinstance(assign, syntax.Assign)
+    assert assign.target.name == "a"
+    assert assign.value.op == "+"
+    assert assign.value.left.value == luca.LucaNumber(1)
+    assert assign.value.right.op == "-"
+    assert assign.value.right.operand.name == "c"
+    assert assign.value.right.operand.obj.name == "b"
+    assert assign.value.right.operand.span == (9, 12)
+
+
+def test_parse_program_raises_on_recovered_syntax_error():
+    with pytest.raises(SyntaxError, match="index 13"):
+        syntax.parse_program(luca.LucaLexer().tokenize(RECOVERED_SYNTAX_ERROR))
+    assert syntax.parse_program(luca.LucaLexer().tokenize("")) is None
+
+
+@pytest.mark.parametrize(
+    "make", [lambda n: "(" * n + "1" + ")" * n, lambda n: "-" * n + "1"]
+)
+def test_parse_limits_nesting(make):
+    assert Evaluator().evaluate(parse(make(150))) == luca.LucaNumber(1)
+    with pytest.raises(SyntaxError, match="limit of 200 parser stack entries"):
+        parse(make(300))
+
+
+def test_nodes_are_slotted():
+    tree = parse("1 + 2")
+    assert not hasattr(tree.statements[0], "__dict__")
+
+
+@engines
+@pytest.mark.parametrize("program", PROGRAMS)
+def test_engine_matches_luca_parser(engine, program, capfd):
+    expected = luca.LucaParser().parse(luca.LucaLexer().tokenize(program))
+    expected_out, _ = capfd.readouterr()
+    result = engine(program)(luca.LucaObject())
+    out, _ = capfd.readouterr()
+    assert result == expected
+    assert out == expected_out
+
+
+@engines
+@pytest.mark.parametrize("program,error", ERROR_PROGRAMS)
+def test_engine_errors_match_luca_parser(engine, program, error):
+    with pytest.raises(error):
+        luca.LucaParser().parse(luca.LucaLexer().tokenize(program))
+    run = engine(program)
+    with pytest.raises(error):
+        run(luca.LucaObject())
+
+
+@engines
+def test_engine_raises_on_recovered_syntax_error(engine):
+    with pytest.raises(SyntaxError, match="index 13"):
+        engine(RECOVERED_SYNTAX_ERROR)
+
+
+@engines
+def test_engine_keeps_scope_between_runs(engine):
+    run = engine("a = a + 1")
+    scope = luca.LucaObject()
+    scope.set("a", luca.LucaNumber(0))
+    for _ in range(3):
+        run(scope)
+    assert scope.get("a") == luca.LucaNumber(3)
+
+
+@engines
+def test_engine_deep_tree(engine):
+    assert engine(DEEP_PROGRAM)(luca.LucaObject()) == DEEP_RESULT
+
+
+def test_luca_parser_deep_tree():
+    tokens = luca.LucaLexer().tokenize(DEEP_PROGRAM)
+    assert luca.LucaParser().parse(tokens) == DEEP_RESULT
+
+
+@pytest.mark.parametrize("module", [vm, closures, transpile])
+def test_compile_source_returns_none_for_empty_program(module):
+    assert module.compile_source("") is None
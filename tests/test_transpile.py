@@ -0,0 +1,67 @@
+import ast
+import io
+
+import pytest
+from luca import luca, transpile
+from test_syntax import parse
+
+
+def run(program):
+    return transpile.load(transpile.compile_source(program))(luca.LucaObject())
+
+
+def test_transpile_type_error_message():
+    with pytest.raises(
+        TypeError, match="Cannot perform LucaType.BOOLEAN and LucaType.NUMBER"
+    ):
+        run("true and 1.0")
+
+
+def test_transpile_generates_scope_functions():
+    module = transpile.transpile(parse("a = { b = 1 }"))
+    assert ast.unparse(module).splitlines() == [
+        "_c0 = LucaNumber(1)",
+        "",
+        "def _scope0(parent):",
+        "    scope = LucaObject(parent)",
+        "    _store(scope, 'b', _c0)",
+        "    return scope",
+        "",
+        "def program(scope):",
+        "    return _store(scope, 'a', _scope0(scope))",
+    ]
+
+
+def test_transpile_shares_constants():
+    module = transpile.transpile(parse('a = 1 + 1\nb = "x" + "x"\nc = true or null'))
+    assert ast.unparse(module).splitlines() == [
+        "_c0 = LucaNumber(1)",
+        "_c1 = LucaString('x')",
+        "",
+        "def program(scope):",
+        "    _store(scope, 'a', _c0 + _c0)",
+        "    _store(scope, 'b', _c1 + _c1)",
+        "    return _store(scope, 'c', TRUE.logic_or(NULL))",
+    ]
+
+
+def test_transpile_flattens_long_chains():
+    short = "1" + " + 1" * transpile._MAX_NESTED_CHAIN
+    assert ":=" not in ast.unparse(transpile.transpile(parse(short)))
+    nested = short + " - (2 * 2" + " + 2" * 200 + ")"
+    source = ast.unparse(transpile.transpile(parse(nested)))
+    assert source.count("_v0 :=") == transpile._MAX_NESTED_CHAIN + 2
+    assert source.count("_v1 :=") == 202
+    assert source.count("[-1]") == 2
+
+
+def test_transpile_caches_code_objects():
+    assert transpile.compile_source("1 + 2") is transpile.compile_source("1 + 2")
+
+
+def test_main_python_engine(monkeypatch, capsys):
+    import luca as package
+
+    monkeypatch.setattr("sys.stdin", io.StringIO('a = "x"\nprint(a + 3)\n'))
+    package.main(["--engine=python"])
+    assert capsys.readouterr().out == "x3\n"
@@ -0,0 +1,37 @@
+import pytest
+from luca import luca, vm
+from test_syntax import ERROR_PROGRAMS
+
+
+@pytest.mark.parametrize("program,error", ERROR_PROGRAMS)
+def test_vm_unwinds_scopes_on_error(program, error):
+    code = vm.compile_source(program)
+    machine = vm.VirtualMachine()
+    with pytest.raises(error):
+        machine.run(code)
+    assert len(machine.scope_stack) == 1
+
+
+def test_vm_constant_pool_and_names():
+    code = vm.compile_source("a = 1\nb = a + 2\nb.c")
+    assert code.names == ("a", "b", "c")
+    assert code.consts == (luca.LucaNumber(1), luca.LucaNumber(2))
+    assert code.code[-2:] == [vm.RETURN_VALUE, 0]
+
+
+def test_vm_disassemble():
+    text = vm.compile_source("print(x)").disassemble()
+    assert text.splitlines() == [
+        "     0 LOAD_NAME      0 (x)",
+        "     2 PRINT          0",
+        "     4 RETURN_VALUE   0",
+    ]
+
+
+def test_main_vm_engine(monkeypatch, capsys):
+    import io
+    import luca as package
+
+    monkeypatch.setattr("sys.stdin", io.StringIO("a = 2\nprint(a * 3)\n"))
+    package.main(["--engine=vm"])
+    assert capsys.readouterr().out == "6\n"